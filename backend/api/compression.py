@@ -0,0 +1,135 @@
+"""
+Response compression negotiated with Accept-Encoding
+
+Brotli is preferred when the client accepts it and the optional `brotli`
+package is installed, gzip otherwise. Only complete bodies above a minimum
+size are compressed; streamed responses (more_body) pass through untouched,
+so event streams are never buffered.
+"""
+import gzip
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Optional dependency, gzip only without it
+    brotli = None
+
+# Bodies smaller than this are not worth the CPU and the extra header
+DEFAULT_MINIMUM_SIZE = 500
+
+# Quality levels tuned for per-request compression rather than ratio
+BROTLI_QUALITY = 4
+GZIP_LEVEL = 6
+
+
+def supported_encodings() -> List[str]:
+    """Get the encodings the server can produce, preferred first"""
+    return (["br"] if brotli is not None else []) + ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Choose the response encoding from an Accept-Encoding header
+
+    Args:
+        accept_encoding (str): Header value, e.g. "gzip, deflate, br;q=0.9"
+
+    Returns:
+        Optional[str]: "br", "gzip" or None for an uncompressed response
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    candidates = [(accepted.get(encoding, wildcard), encoding)
+                  for encoding in supported_encodings()]
+    # Ties keep the server preference (brotli first)
+    quality, encoding = max(candidates, key=lambda c: c[0])
+    return encoding if quality > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a response body with a negotiated encoding"""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def with_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Add Accept-Encoding to the Vary header of a response"""
+    for i, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            if b"accept-encoding" not in value.lower() and value.strip() != b"*":
+                headers[i] = (name, value + b", Accept-Encoding")
+            return headers
+    return headers + [(b"vary", b"Accept-Encoding")]
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip
+    """
+
+    def __init__(self, app, minimum_size: int = DEFAULT_MINIMUM_SIZE):
+        """
+        Args:
+            app: ASGI application
+            minimum_size (int): Smallest body size in bytes to compress
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = negotiate_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether the
+                # response is complete
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            # The representation depends on Accept-Encoding even when it is
+            # sent uncompressed, so shared caches must key on it
+            response_headers = with_vary(list(start.get("headers", [])))
+            body = message.get("body", b"")
+            already_encoded = any(name.lower() == b"content-encoding"
+                                  for name, _ in response_headers)
+            if (encoding is None or message.get("more_body") or already_encoded
+                    or len(body) < self.minimum_size):
+                await send({**start, "headers": response_headers})
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            response_headers = [(name, value) for name, value in response_headers
+                                if name.lower() != b"content-length"]
+            response_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+            ]
+            await send({**start, "headers": response_headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,148 @@
+"""
+Server-sent events for scrape progress and data changes
+
+Clients subscribe to GET /events and refetch a date only when a "data"
+event says it changed, instead of polling the movie endpoints. Events are
+kept in a short history so a reconnecting client (Last-Event-ID) gets what
+it missed, or a "reset" event once that is gone or too long to replay. A
+subscriber too slow to keep up is disconnected rather than buffered
+without bound; it reconnects and replays from its last ID.
+"""
+import asyncio
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Seconds between keep-alive comments, so proxies keep idle streams open
+HEARTBEAT_SECONDS = 15.0
+
+# Queued in place of events for a subscriber that fell behind
+_OVERFLOW = object()
+
+Publisher = Callable[[str, Dict[str, Any]], None]
+
+
+@dataclass
+class Event:
+    """A published event"""
+    id: int
+    name: str
+    data: Dict[str, Any]
+
+    def encode(self) -> bytes:
+        """Render the event in the text/event-stream format"""
+        payload = json.dumps(self.data, default=str)
+        return f"id: {self.id}\nevent: {self.name}\ndata: {payload}\n\n".encode()
+
+
+class EventBus:
+    """
+    In-process fan-out of events to SSE subscribers
+
+    publish() must be called from the event loop thread.
+    """
+
+    def __init__(self, history: int = 200, queue_size: int = 100):
+        """
+        Args:
+            history (int): Number of past events kept for reconnecting clients
+            queue_size (int): Events buffered per subscriber before it is
+                              disconnected
+        """
+        self.queue_size = queue_size
+        self._history: Deque[Event] = deque(maxlen=history)
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._next_id = 1
+
+    @property
+    def subscribers(self) -> int:
+        """Number of connected subscribers"""
+        return len(self._subscribers)
+
+    def publish(self, name: str, data: Dict[str, Any]) -> Event:
+        """
+        Send an event to every subscriber
+
+        Args:
+            name (str): Event name, e.g. "scrape" or "data"
+            data (Dict[str, Any]): JSON-serializable payload
+
+        Returns:
+            Event: Published event
+        """
+        event = Event(self._next_id, name, data)
+        self._next_id += 1
+        self._history.append(event)
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                queue.get_nowait()  # Room for the marker, the stream ends anyway
+                queue.put_nowait(_OVERFLOW)
+                self._subscribers.discard(queue)
+        return event
+
+    def publisher(self, **fields: Any) -> Publisher:
+        """Get a publish function adding fields (e.g. a job ID) to every payload"""
+        def publish(name: str, data: Dict[str, Any]) -> None:
+            self.publish(name, {**fields, **data})
+        return publish
+
+    async def subscribe(self, last_event_id: Optional[int] = None) -> AsyncIterator[Optional[Event]]:
+        """
+        Iterate over published events
+
+        Yields None after HEARTBEAT_SECONDS without events, for keep-alives.
+
+        Args:
+            last_event_id (int, optional): ID of the last event the client
+                                           received, to replay the ones after it
+
+        Yields:
+            Optional[Event]: Next event, None for a heartbeat
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if last_event_id is not None:
+            oldest = self._history[0].id if self._history else self._next_id
+            missed = [event for event in self._history if event.id > last_event_id]
+            if (last_event_id < oldest - 1 or last_event_id >= self._next_id
+                    or len(missed) > self.queue_size):
+                # Missed events are gone, do not fit in the buffer or the
+                # server restarted: the client must refetch everything it shows
+                queue.put_nowait(Event(self._next_id - 1, "reset", {}))
+            else:
+                for event in missed:
+                    queue.put_nowait(event)
+        self._subscribers.add(queue)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event is _OVERFLOW:
+                    logger.info("Disconnecting an event subscriber that fell behind")
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+    async def stream(self, last_event_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Render the events of a subscription as a text/event-stream body
+
+        Args:
+            last_event_id (int, optional): See subscribe()
+
+        Yields:
+            bytes: Encoded events and keep-alive comments
+        """
+        # Tells EventSource how long to wait before reconnecting
+        yield b"retry: 5000\n\n"
+        async for event in self.subscribe(last_event_id):
+            yield b": ping\n\n" if event is None else event.encode()
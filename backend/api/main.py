@@ -1,20 +1,43 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-import uvicorn
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+import sys
+import uuid
+from dataclasses import replace
 from datetime import datetime, timedelta
 
 # Import models and services
+# The scraper machinery (Selenium, webdriver_manager, scraper modules) is only
+# imported by the scrape endpoints, keeping the read-only path fast to start
 from models.supabase import init_database
-from models.movie import Movie
-from models.repository import MovieRepository, TheaterRepository
-from scraper.scraper_service import ScraperService
-from datetime import datetime
+from models.repository import (FreshnessRepository, MovieRepository, ScrapeRunRepository,
+                               TheaterRepository)
+from models.fields import ALL, MovieFields, parse_movie_fields, parse_theater_fields
+from api.compression import CompressionMiddleware
+from api.events import EventBus
+from api.metrics import RequestMetricsMiddleware
+from api.profiling import ProfilingMiddleware
+from api.timing import ServerTimingMiddleware
+from api.refresh import RefreshCoordinator
+from api.showtime_index import ShowtimeIndex, cinema_day_now
+from scraper.times import parse_minute
+from monitoring import metrics
+from monitoring.loop_lag import LoopLagMonitor
+
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
 
 app = FastAPI(
     title="Movie Observer API",
     description="API for retrieving movie showtimes and language information",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # Setup CORS to allow frontend to connect
@@ -27,13 +50,150 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Brotli or gzip, negotiated with Accept-Encoding
+app.add_middleware(CompressionMiddleware)
+
+# Repository calls per request, in a Server-Timing header
+app.add_middleware(
+    ServerTimingMiddleware,
+    warn_db_calls=int(os.getenv("REQUEST_DB_CALLS_WARN", "10")),
+)
+
+# Opt-in: profiles a share of the requests into API_PROFILE_DIR
+if os.getenv("API_PROFILE_DIR") and float(os.getenv("API_PROFILE_SAMPLE_RATE", "0")) > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        directory=os.getenv("API_PROFILE_DIR"),
+        sample_rate=float(os.getenv("API_PROFILE_SAMPLE_RATE")),
+        profiler=os.getenv("API_PROFILER", "sample"),
+    )
+
+# Outermost, so request latency includes compression
+app.add_middleware(RequestMetricsMiddleware, routes=app.routes)
+
+
+# Longest range of /movies?from=&to=, in days
+MOVIES_RANGE_MAX_DAYS = int(os.getenv("MOVIES_RANGE_MAX_DAYS", "14"))
+
+# Sorted showtimes per date behind /showtimes/upcoming
+showtime_index = ShowtimeIndex(
+    MovieRepository.get_showtimes_for_date,
+    ttl_seconds=float(os.getenv("SHOWTIME_INDEX_TTL_SECONDS", "300")),
+    max_dates=int(os.getenv("SHOWTIME_INDEX_MAX_DATES", "14")),
+)
+
+
+# Scrape progress and data changes streamed to clients by /events
+event_bus = EventBus()
+
+# Logs the stack of code blocking the event loop for longer than this
+EVENT_LOOP_STALL_MS = float(os.getenv("EVENT_LOOP_STALL_MS", "100"))
+loop_lag_monitor = LoopLagMonitor(EVENT_LOOP_STALL_MS / 1000) if EVENT_LOOP_STALL_MS > 0 else None
+
+
+def job_progress(job: str) -> Callable[[str, Dict[str, Any]], None]:
+    """
+    Get the progress callback of a scrape job run by the API
+
+    Events are tagged with the job ID, and dates whose data changed are
+    dropped from the upcoming showtimes index.
+    """
+    publish = event_bus.publisher(job=job)
+
+    def progress(name: str, data: Dict[str, Any]) -> None:
+        if name == "data":
+            showtime_index.invalidate(data["date"])
+        publish(name, data)
+
+    return progress
+
+
+async def scrape_date(date: str) -> None:
+    """Refresh a date read through the API while it is stale"""
+    from scraper.scraper_service import ScraperService
+
+    # Not forced: the scrapers' refresh intervals still apply
+    service = ScraperService(progress=job_progress(f"refresh-{uuid.uuid4().hex[:8]}"))
+    await service.scrape_all_cinemas(date)
+
+
+# Stale or missing dates are served as stored and refreshed in the background
+refresh_coordinator = RefreshCoordinator(
+    FreshnessRepository.get_refreshed_at,
+    scrape_date,
+    stale_after=float(os.getenv("DATA_STALE_AFTER_MINUTES", "360")) * 60,
+    retry_after=float(os.getenv("ON_DEMAND_SCRAPE_RETRY_MINUTES", "10")) * 60,
+    days_ahead=int(os.getenv("ON_DEMAND_SCRAPE_DAYS_AHEAD", "14")),
+)
+
+
+async def check_freshness(dates: List[str]) -> dict:
+    """
+    Get the freshness headers of the dates of a read, refreshing stale dates
+
+    Freshness is advisory: the read is served even if the check fails.
+    """
+    try:
+        states = await refresh_coordinator.check(dates)
+    except Exception as e:
+        print(f"Error checking freshness of {dates}: {e}")
+        return {}
+    if not states:
+        return {}
+    if len(dates) == 1:
+        return {"X-Data-Freshness": states[dates[0]]}
+    return {"X-Data-Freshness": ", ".join(f"{date}={state}" for date, state in states.items())}
+
+
+def clamp_refresh_window() -> None:
+    """Stop refreshing on demand dates beyond every scraper's days_ahead"""
+    from scraper.registry import get_registry
+
+    horizon = get_registry().horizon()
+    if horizon is not None and horizon < refresh_coordinator.days_ahead:
+        refresh_coordinator.days_ahead = horizon
+
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
+    """Initialize database and start watching the event loop on startup"""
+    if loop_lag_monitor is not None:
+        loop_lag_monitor.start()
+    try:
+        await asyncio.to_thread(clamp_refresh_window)
+    except Exception as e:
+        print(f"Error loading the scrapers' horizon: {e}")
     await init_database()
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the browsers pooled by the scrapers of /scrape runs, stop monitoring"""
+    # Scrapers are only created once a scrape endpoint was used
+    await refresh_coordinator.close()
+    registry = sys.modules.get("scraper.registry")
+    if registry is not None:
+        await asyncio.to_thread(registry.close_registry)
+    if loop_lag_monitor is not None:
+        loop_lag_monitor.stop()
+
+
+def movie_fields(fields: Optional[str]) -> MovieFields:
+    """Parse the fields parameter of a movie endpoint, 400 for unknown fields"""
+    try:
+        return parse_movie_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def theater_fields(fields: Optional[str]) -> str:
+    """Parse the fields parameter of a theater endpoint, 400 for unknown fields"""
+    try:
+        return parse_theater_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.get("/")
 async def root():
     """API root endpoint"""
@@ -41,99 +201,187 @@ async def root():
 
 
 @app.get("/movies")
-async def get_all_movies():
-    """Get all movies from database"""
-    try:
-        movies = await MovieRepository.get_all_movies()
-
-        # Get showtimes for each movie
-        for movie in movies:
-            showtimes_data = await MovieRepository.get_movie_with_showtimes(movie["id"])
-            if showtimes_data:
-                movie["showtimes"] = showtimes_data.get("showtimes", [])
-            else:
-                movie["showtimes"] = []
+async def get_all_movies(
+    fields: Optional[str] = None,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+):
+    """
+    Get all movies from database, optionally only some fields, e.g.
+    fields=title,image_url,showtimes.time,showtimes.theater
+
+    With from=YYYY-MM-DD&to=YYYY-MM-DD, get the movies of each date of the
+    range instead, grouped by date
+    """
+    projection = movie_fields(fields)
+    if start or end:
+        return await movies_in_range(start, end, projection)
 
-        return movies
+    try:
+        movies = await MovieRepository.get_movies_with_showtimes(fields=projection)
+        return ORJSONResponse(movies)
     except Exception as e:
         print(f"Error fetching movies: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/movies/{date}")
-async def get_movies_by_date(date: str):
-    """Get movies for a specific date"""
+async def movies_in_range(start: Optional[str], end: Optional[str],
+                          projection: MovieFields) -> ORJSONResponse:
+    """Movies of every date from start to end, in one query (week view)"""
     try:
-        movies = await MovieRepository.get_all_movies(date)
+        first = datetime.strptime(start or "", "%Y-%m-%d")
+        last = datetime.strptime(end or "", "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="from and to must both be dates in format YYYY-MM-DD")
+    days = (last - first).days + 1
+    if days < 1 or days > MOVIES_RANGE_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The range must span 1 to {MOVIES_RANGE_MAX_DAYS} days")
 
-        # Get showtimes for each movie
-        for movie in movies:
-            showtimes_data = await MovieRepository.get_movie_with_showtimes(movie["id"])
-            if showtimes_data:
-                movie["showtimes"] = showtimes_data.get("showtimes", [])
-            else:
-                movie["showtimes"] = []
+    dates = [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+    headers = await check_freshness(dates)
+    try:
+        return ORJSONResponse(
+            await MovieRepository.get_movies_for_range(start, end, projection),
+            headers=headers)
+    except Exception as e:
+        print(f"Error fetching movies from {start} to {end}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        return movies
+
+@app.get("/movies/{date}")
+async def get_movies_by_date(date: str, fields: Optional[str] = None):
+    """Get movies for a specific date, optionally only some fields (see /movies)"""
+    projection = movie_fields(fields)
+    headers = await check_freshness([date])
+    try:
+        movies = await MovieRepository.get_movies_with_showtimes(date, projection)
+        return ORJSONResponse(movies, headers=headers)
     except Exception as e:
         print(f"Error fetching movies for date {date}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/movies/original/{date}")
-async def get_original_language_movies(date: str):
-    """Get original language movies for a specific date"""
+async def get_original_language_movies(date: str, fields: Optional[str] = None):
+    """Get original language movies for a specific date, optionally only some fields"""
+    projection = movie_fields(fields)
+    requested = projection.showtimes
+    # The filter needs the language of every showtime, requested or not
+    if requested != ALL:
+        projection = replace(projection, showtimes=tuple(dict.fromkeys(
+            (requested or ()) + ("is_original_language",))))
+
+    headers = await check_freshness([date])
     try:
-        # Get all movies for the given date
-        movies = await MovieRepository.get_all_movies(date)
+        movies = await MovieRepository.get_movies_with_showtimes(date, projection)
 
         # Filter movies to include only those with original language showtimes
         result = []
         for movie in movies:
-            movie_with_showtimes = await MovieRepository.get_movie_with_showtimes(movie["id"])
-            if movie_with_showtimes:
-                # Filter showtimes to include only original language
-                original_showtimes = [
-                    s for s in movie_with_showtimes.get("showtimes", [])
-                    if s.get("is_original_language")
-                ]
-
-                if original_showtimes:  # Only include movies with original language showtimes
+            original_showtimes = [
+                s for s in movie.pop("showtimes", [])
+                if s.get("is_original_language")
+            ]
+
+            if original_showtimes:  # Only include movies with original language showtimes
+                if requested is not None:
+                    if requested != ALL and "is_original_language" not in requested:
+                        for showtime in original_showtimes:
+                            del showtime["is_original_language"]
                     movie["showtimes"] = original_showtimes
-                    result.append(movie)
+                result.append(movie)
 
-        return result
+        return ORJSONResponse(result, headers=headers)
     except Exception as e:
         print(f"Error fetching original language movies for date {date}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/showtimes/upcoming")
+async def get_upcoming_showtimes(
+    date: Optional[str] = None,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    original: Optional[bool] = None,
+):
+    """
+    Get the showtimes starting between two times (HH:MM) of a date, by
+    default today from now to two hours from now, optionally only original
+    language (original=true) or dubbed (original=false) ones
+    """
+    today, now_minute = cinema_day_now()
+    if not date:
+        date = today
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {date}")
+
+    start_minute = parse_minute(start) if start else (now_minute if date == today else 0)
+    if start_minute is None:
+        raise HTTPException(status_code=400, detail=f"Invalid time: {start}")
+    end_minute = parse_minute(end) if end else start_minute + 120
+    if end_minute is None:
+        raise HTTPException(status_code=400, detail=f"Invalid time: {end}")
+
+    try:
+        return ORJSONResponse(
+            await showtime_index.window(date, start_minute, end_minute, original))
+    except Exception as e:
+        print(f"Error fetching upcoming showtimes for {date}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/theaters")
-async def get_theaters():
-    """Get all theaters"""
+async def get_theaters(fields: Optional[str] = None):
+    """Get all theaters, optionally only some fields, e.g. fields=name,city"""
+    columns = theater_fields(fields)
     try:
-        theaters = await TheaterRepository.get_all_theaters()
-        return theaters
+        theaters = await TheaterRepository.get_all_theaters(columns)
+        return ORJSONResponse(theaters)
     except Exception as e:
         print(f"Error fetching theaters: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/theaters/{theater_id}")
-async def get_theater(theater_id: int):
-    """Get theater by ID"""
+async def get_theater(theater_id: int, fields: Optional[str] = None):
+    """Get theater by ID, optionally only some fields"""
+    columns = theater_fields(fields)
     try:
-        theater = await TheaterRepository.get_theater(theater_id)
+        theater = await TheaterRepository.get_theater(theater_id, columns)
 
         if not theater:
             raise HTTPException(status_code=404, detail="Theater not found")
 
-        return theater
+        return ORJSONResponse(theater)
     except Exception as e:
         print(f"Error fetching theater {theater_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/theaters/{theater_id}/showtimes")
+async def get_theater_showtimes(theater_id: int, date: Optional[str] = None,
+                                fields: Optional[str] = None):
+    """
+    Get the movies showing at a theater on a date (default today) with their
+    showtimes, optionally only some fields (see /movies)
+    """
+    if not date:
+        date = datetime.now().strftime("%Y-%m-%d")
+    projection = movie_fields(fields)
+
+    try:
+        return ORJSONResponse(
+            await TheaterRepository.get_theater_showtimes(theater_id, date, projection))
+    except Exception as e:
+        print(f"Error fetching showtimes for theater {theater_id} on {date}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/scrape")
 async def trigger_scrape(background_tasks: BackgroundTasks, date: Optional[str] = None):
     """Trigger a scrape for a specific date or today"""
@@ -141,17 +389,23 @@ async def trigger_scrape(background_tasks: BackgroundTasks, date: Optional[str]
         date = datetime.now().strftime("%Y-%m-%d")
 
     try:
+        from scraper.scraper_service import ScraperService
+
         # Initialize the scraper service
-        scraper_service = ScraperService()
+        job = uuid.uuid4().hex[:12]
+        scraper_service = ScraperService(progress=job_progress(job))
         
-        # Run in background to avoid long response time
-        background_tasks.add_task(scraper_service.scrape_all_cinemas, date)
+        # Run in background to avoid long response time; an explicit trigger
+        # ignores the scrapers' refresh intervals
+        background_tasks.add_task(scraper_service.scrape_all_cinemas, date, force=True)
         
         # Return success message
         return {
             "status": "success",
             "message": f"Scraping started for date {date}",
-            "details": "The scraper is running in the background. Check server logs for results."
+            "job": job,
+            "details": "The scraper is running in the background. Follow its progress on "
+                       "/events (\"scrape\" events with this job ID)."
         }
     except Exception as e:
         print(f"Error starting scrape for date {date}: {str(e)}")
@@ -162,15 +416,78 @@ async def trigger_scrape(background_tasks: BackgroundTasks, date: Optional[str]
 
 
 @app.post("/scrape/schedule")
-async def schedule_scrape(background_tasks: BackgroundTasks, days: int = 7):
-    """Schedule scraping for multiple days ahead"""
-    scraper_service = ScraperService()
+async def schedule_scrape(background_tasks: BackgroundTasks, days: int = 7, resume: bool = False,
+                          budget_minutes: Optional[float] = None):
+    """
+    Schedule scraping for multiple days ahead, optionally resuming an
+    interrupted run or stopping after a time budget (nearest dates first)
+    """
+    from scraper.scraper_service import ScraperService
+
+    job = uuid.uuid4().hex[:12]
+    scraper_service = ScraperService(progress=job_progress(job))
 
     # Run in background
-    background_tasks.add_task(scraper_service.schedule_daily_scraping, days)
+    background_tasks.add_task(
+        scraper_service.schedule_daily_scraping, days, resume,
+        budget_seconds=budget_minutes * 60 if budget_minutes else None, force=True)
+
+    return {"message": f"Scheduled scraping for {days} days ahead", "job": job}
+
 
-    return {"message": f"Scheduled scraping for {days} days ahead"}
+@app.get("/scrape/runs")
+async def get_scrape_runs(limit: int = 20):
+    """Get the summaries of the latest scrape runs, newest first"""
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+
+    try:
+        return ORJSONResponse(await ScrapeRunRepository.list_runs(limit))
+    except Exception as e:
+        print(f"Error fetching scrape runs: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/scrape/runs/{run_id}")
+async def get_scrape_run(run_id: int):
+    """Get the report of a scrape run: timings per stage, pages and errors per scraper and unit"""
+    try:
+        run = await ScrapeRunRepository.get_run(run_id)
+    except Exception as e:
+        print(f"Error fetching scrape run {run_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not run:
+        raise HTTPException(status_code=404, detail="Scrape run not found")
+    return ORJSONResponse(run)
+
+
+@app.get("/events")
+async def events(request: Request):
+    """
+    Stream scrape progress ("scrape") and changed dates ("data") as
+    server-sent events; reconnecting clients send Last-Event-ID
+    """
+    try:
+        last_event_id = int(request.headers["last-event-id"])
+    except (KeyError, ValueError):
+        last_event_id = None
+
+    return StreamingResponse(
+        event_bus.stream(last_event_id),
+        media_type="text/event-stream",
+        # No caching, and no buffering by reverse proxies (nginx)
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Scrape, storage and API metrics in the Prometheus text format"""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
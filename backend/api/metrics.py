@@ -0,0 +1,68 @@
+"""
+API request latency per route, exposed by GET /metrics
+
+Requests are labelled with the route template (/movies/{date}) rather than
+the path, so the number of series stays bounded; paths that match no route
+share the "unmatched" label.
+"""
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from monitoring.metrics import HTTP_REQUEST_SECONDS
+
+UNMATCHED = "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware observing the latency of each HTTP request
+    """
+
+    def __init__(self, app: Callable, routes: List[Any]):
+        """
+        Args:
+            app (Callable): ASGI application
+            routes (List[Any]): Routes of the application (app.routes), read
+                                when requests come in so later routes count
+        """
+        self.app = app
+        self.routes = routes
+        self._templates: Dict[Any, str] = {}
+
+    def route_template(self, scope: dict) -> str:
+        """Get the path template of the route that handled a request"""
+        # Set on the scope by the router once a route matched
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED
+        template = self._templates.get(endpoint)
+        if template is None:
+            template = next((route.path for route in self.routes
+                             if getattr(route, "endpoint", None) is endpoint), UNMATCHED)
+            self._templates[endpoint] = template
+        return template
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status: Optional[int] = None
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=self.route_template(scope),
+                # No response started: the app raised
+                status=status or 500,
+            )
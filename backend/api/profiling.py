@@ -0,0 +1,50 @@
+"""
+Sampled profiling of API requests
+
+With API_PROFILE_DIR set and API_PROFILE_SAMPLE_RATE above 0, that share
+of requests is profiled and written to the directory, one artifact per
+request named after its method and path (see monitoring/profiling.py).
+At most one request is profiled at a time, so profiles of concurrent
+requests do not mix.
+"""
+import random
+import threading
+from typing import Callable
+
+from monitoring.profiling import profile
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling a random sample of HTTP requests
+    """
+
+    def __init__(self, app: Callable, directory: str, sample_rate: float,
+                 profiler: str = "sample"):
+        """
+        Args:
+            app (Callable): ASGI application
+            directory (str): Directory receiving the profiles
+            sample_rate (float): Share of requests profiled, 0 to 1
+            profiler (str): "sample" or "cprofile"
+        """
+        self.app = app
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.profiler = profiler
+        self._busy = False
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if (scope["type"] != "http" or self._busy or not self.directory
+                or random.random() >= self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        try:
+            # The sampler only looks at the event loop thread, which runs the request
+            with profile(self.directory, f"request-{scope['method']}-{scope['path']}",
+                         self.profiler, thread_ids=[threading.get_ident()]):
+                await self.app(scope, receive, send)
+        finally:
+            self._busy = False
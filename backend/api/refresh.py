@@ -0,0 +1,142 @@
+"""
+Stale-while-revalidate scraping of the dates read through the API
+
+Reads never wait for a scrape. A date scraped less than `stale_after`
+seconds ago is fresh and served as is; a stale or never scraped date is
+served as stored while a background refresh of it runs. Refreshes are
+de-duplicated per date and a date is not retried for `retry_after` seconds
+after a refresh ended, so a burst of reads of a date nobody can scrape
+(e.g. beyond the sites' horizon) does not turn into a burst of scrapes.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+FRESH = "fresh"
+STALE = "stale"
+MISSING = "missing"
+
+# Last scrape time (UTC) of each date that was ever scraped
+FreshnessLoader = Callable[[List[str]], Awaitable[Dict[str, datetime]]]
+Refresher = Callable[[str], Awaitable[Any]]
+
+
+class RefreshCoordinator:
+    """
+    Per-date freshness checks and de-duplicated background refreshes
+    """
+
+    def __init__(self, loader: FreshnessLoader, refresher: Refresher,
+                 stale_after: float = 6 * 3600, retry_after: float = 600,
+                 days_ahead: int = 14):
+        """
+        Args:
+            loader (FreshnessLoader): Coroutine function loading the last
+                                      scrape time of dates
+            refresher (Refresher): Coroutine function scraping a date
+            stale_after (float): Seconds after which a scraped date is stale
+            retry_after (float): Seconds before a date is refreshed again
+                                 after a refresh ended, successful or not
+            days_ahead (int): Only dates from today to this many days ahead
+                              are refreshed on demand, 0 to disable
+        """
+        self.loader = loader
+        self.refresher = refresher
+        self.stale_after = stale_after
+        self.retry_after = retry_after
+        self.days_ahead = days_ahead
+        # Monotonic time until which a date is known to be fresh
+        self._fresh_until: Dict[str, float] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Monotonic time at which the last refresh of a date ended
+        self._attempted: Dict[str, float] = {}
+
+    def tracked(self, date: str) -> bool:
+        """Whether a date is in the window of dates refreshed on demand"""
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            return False
+        return 0 <= (day - datetime.now().date()).days < self.days_ahead
+
+    async def check(self, dates: List[str]) -> Dict[str, str]:
+        """
+        Get the freshness of dates and refresh the stale ones in the background
+
+        Known fresh dates cost no query; the others are looked up together.
+
+        Args:
+            dates (List[str]): Dates in format YYYY-MM-DD
+
+        Returns:
+            Dict[str, str]: FRESH, STALE or MISSING by date, for the dates
+                            refreshed on demand (see tracked())
+        """
+        now = time.monotonic()
+        states = {date: FRESH for date in dates
+                  if self.tracked(date) and self._fresh_until.get(date, 0) > now}
+        unknown = [date for date in dates if self.tracked(date) and date not in states]
+        if not unknown:
+            return states
+
+        refreshed = await self.loader(unknown)
+        current = datetime.now(timezone.utc)
+        for date in unknown:
+            refreshed_at = refreshed.get(date)
+            age = None if refreshed_at is None else (current - refreshed_at).total_seconds()
+            if age is not None and age < self.stale_after:
+                self._fresh_until[date] = now + self.stale_after - age
+                states[date] = FRESH
+                continue
+            states[date] = MISSING if refreshed_at is None else STALE
+            self.schedule(date)
+        return states
+
+    def schedule(self, date: str) -> bool:
+        """
+        Start a background refresh of a date unless one is running or just ended
+
+        Args:
+            date (str): Date in format YYYY-MM-DD
+
+        Returns:
+            bool: Whether a refresh was started
+        """
+        task = self._tasks.get(date)
+        if task is not None and not task.done():
+            return False
+        ended = self._attempted.get(date)
+        if ended is not None and time.monotonic() - ended < self.retry_after:
+            return False
+
+        self._tasks[date] = asyncio.create_task(self._refresh(date))
+        return True
+
+    async def _refresh(self, date: str) -> None:
+        """Scrape a date, remembering when the attempt ended"""
+        logger.info(f"Refreshing {date} on demand")
+        try:
+            await self.refresher(date)
+        except Exception as e:
+            logger.error(f"Error refreshing {date} on demand: {e}")
+        finally:
+            now = time.monotonic()
+            self._tasks.pop(date, None)
+            self._fresh_until.pop(date, None)
+            self._attempted[date] = now
+            # Forget dates that left the window (e.g. past days)
+            for old in [d for d in self._attempted if not self.tracked(d)]:
+                del self._attempted[old]
+            for old in [d for d in self._fresh_until if not self.tracked(d)]:
+                del self._fresh_until[old]
+
+    async def close(self) -> None:
+        """Cancel the refreshes still running"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
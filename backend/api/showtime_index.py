@@ -0,0 +1,175 @@
+"""
+In-memory time-window index of showtimes
+
+"What starts in the next two hours" is the hottest query of the site. The
+showtimes of a date are loaded once into arrays sorted by start minute, so a
+window is answered by two binary searches plus the matching slice:
+O(log n + k) instead of scanning every movie of the date.
+"""
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from scraper.times import CINEMA_DAY_START_HOUR, MINUTES_PER_DAY
+
+logger = logging.getLogger(__name__)
+
+ShowtimeLoader = Callable[[str], Awaitable[List[Dict[str, Any]]]]
+
+
+class DateShowtimes:
+    """
+    Showtimes of one date sorted by start minute
+
+    Kept three times (all, original language, dubbed), so the language
+    filter is a choice of array rather than a scan of the window.
+    """
+
+    __slots__ = ("_minutes", "_showtimes", "built_at")
+
+    def __init__(self, showtimes: List[Dict[str, Any]]):
+        timed = sorted(
+            (s for s in showtimes if s.get("start_minute") is not None),
+            key=lambda s: (s["start_minute"], s.get("movie", {}).get("title") or ""))
+        self._minutes: Dict[Optional[bool], List[int]] = {}
+        self._showtimes: Dict[Optional[bool], List[Dict[str, Any]]] = {}
+        for original in (None, True, False):
+            selected = [s for s in timed
+                        if original is None or bool(s.get("is_original_language")) == original]
+            self._showtimes[original] = selected
+            self._minutes[original] = [s["start_minute"] for s in selected]
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._minutes[None])
+
+    def window(self, start: int, end: int,
+               original: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        Get the showtimes starting within [start, end)
+
+        Args:
+            start (int): First minute of the window
+            end (int): Minute after the window
+            original (bool, optional): True for original language only,
+                                       False for dubbed only, None for both
+
+        Returns:
+            List[Dict[str, Any]]: Showtimes ordered by start minute
+        """
+        minutes = self._minutes[original]
+        lo = bisect_left(minutes, start)
+        hi = bisect_left(minutes, end, lo)
+        return self._showtimes[original][lo:hi]
+
+
+class ShowtimeIndex:
+    """
+    Per-date cache of DateShowtimes, rebuilt after a TTL
+
+    Expired dates are evicted with their locks, and at most max_dates dates
+    are kept, so arbitrary dates requested by clients cannot grow the cache.
+    """
+
+    def __init__(self, loader: ShowtimeLoader, ttl_seconds: float = 300.0,
+                 max_dates: int = 14):
+        """
+        Args:
+            loader (ShowtimeLoader): Coroutine function loading the showtimes of
+                                     a date, each with 'start_minute' and 'movie'
+            ttl_seconds (float): Seconds before a date is loaded again
+            max_dates (int): Maximum number of dates kept, least recently
+                             loaded ones are evicted first
+        """
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.max_dates = max(1, max_dates)
+        self._dates: Dict[str, DateShowtimes] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get(self, date: str) -> DateShowtimes:
+        """
+        Get the index of a date, loading it when missing or expired
+
+        Concurrent requests for the same date share a single load.
+
+        Args:
+            date (str): Date in format YYYY-MM-DD
+
+        Returns:
+            DateShowtimes: Sorted showtimes of the date
+
+        Raises:
+            ValueError: If the date is not in format YYYY-MM-DD
+        """
+        datetime.strptime(date, "%Y-%m-%d")
+        index = self._dates.get(date)
+        if index is not None and time.monotonic() - index.built_at < self.ttl_seconds:
+            return index
+
+        lock = self._locks.setdefault(date, asyncio.Lock())
+        async with lock:
+            index = self._dates.get(date)
+            if index is None or time.monotonic() - index.built_at >= self.ttl_seconds:
+                index = DateShowtimes(await self.loader(date))
+                self._dates[date] = index
+                logger.info(f"Indexed {len(index)} showtimes for {date}")
+                self._evict()
+        return index
+
+    def _evict(self) -> None:
+        """Drop expired dates and the oldest ones beyond max_dates, with their locks"""
+        now = time.monotonic()
+        for date, index in list(self._dates.items()):
+            if now - index.built_at >= self.ttl_seconds:
+                del self._dates[date]
+        while len(self._dates) > self.max_dates:
+            del self._dates[min(self._dates, key=lambda d: self._dates[d].built_at)]
+        # Locks held by a load in progress stay, the load still needs them
+        for date, lock in list(self._locks.items()):
+            if date not in self._dates and not lock.locked():
+                del self._locks[date]
+
+    def invalidate(self, date: Optional[str] = None) -> None:
+        """Drop the index of a date, or of every date"""
+        if date is None:
+            self._dates.clear()
+        else:
+            self._dates.pop(date, None)
+
+    async def window(self, date: str, start: int, end: int,
+                     original: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        Get the showtimes of a date starting within [start, end)
+
+        Args:
+            date (str): Date in format YYYY-MM-DD
+            start (int): First minute of the window
+            end (int): Minute after the window
+            original (bool, optional): Language filter, see DateShowtimes.window
+
+        Returns:
+            List[Dict[str, Any]]: Showtimes ordered by start minute
+        """
+        return (await self.get(date)).window(start, end, original)
+
+
+def cinema_day_now() -> Tuple[str, int]:
+    """
+    Get the current cinema day and minute
+
+    Before the cinema day starts (05:00), it is still the previous day's
+    programme, at a minute past 1440.
+
+    Returns:
+        Tuple[str, int]: Date in format YYYY-MM-DD and minute of the cinema day
+    """
+    now = datetime.now()
+    minute = now.hour * 60 + now.minute
+    if now.hour < CINEMA_DAY_START_HOUR:
+        now -= timedelta(days=1)
+        minute += MINUTES_PER_DAY
+    return now.strftime("%Y-%m-%d"), minute
@@ -0,0 +1,67 @@
+"""
+Server-Timing header with the repository calls made by each request
+
+Every response carries `Server-Timing: db;dur=12.3;desc="4 calls",
+total;dur=20.1` (milliseconds), visible in the browser's network panel.
+Requests making more than `warn_db_calls` calls are logged, which is how
+N+1 query patterns in the endpoints show up.
+"""
+import logging
+import time
+from typing import Callable
+
+from monitoring.accounting import CallStats, track_db_calls
+
+logger = logging.getLogger(__name__)
+
+
+def server_timing(stats: CallStats, total_seconds: float) -> str:
+    """
+    Render a Server-Timing header value
+
+    Args:
+        stats (CallStats): Repository calls of the request
+        total_seconds (float): Time until the response started
+
+    Returns:
+        str: Header value
+    """
+    return (f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} calls", '
+            f"total;dur={total_seconds * 1000:.1f}")
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware accounting the repository calls of each HTTP request
+    """
+
+    def __init__(self, app: Callable, warn_db_calls: int = 0):
+        """
+        Args:
+            app (Callable): ASGI application
+            warn_db_calls (int): Log requests making more repository calls
+                                 than this, 0 to disable
+        """
+        self.app = app
+        self.warn_db_calls = warn_db_calls
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        with track_db_calls() as stats:
+            async def send_wrapper(message: dict) -> None:
+                if message["type"] == "http.response.start":
+                    # Calls made while a streamed body is produced are not included
+                    value = server_timing(stats, time.perf_counter() - started)
+                    message = {**message, "headers": [
+                        *message.get("headers", []), (b"server-timing", value.encode())]}
+                    if self.warn_db_calls and stats.count > self.warn_db_calls:
+                        logger.warning(
+                            f"{scope['method']} {scope['path']} made {stats.count} "
+                            f"repository calls ({stats.seconds * 1000:.0f} ms)")
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
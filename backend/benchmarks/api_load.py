@@ -0,0 +1,344 @@
+"""
+API load test against an in-memory repository backend
+
+Seeds the in-memory database of models/memory.py with synthetic theaters,
+movies and showtimes through the repositories' own write path, then drives
+the FastAPI app in-process with concurrent clients requesting
+/movies/{date}, /movies/original/{date} and /theaters, near dates more
+often than far ones, and reports requests per second with p50/p95/p99
+latency overall and per route.
+
+Requests go through the whole ASGI stack (middleware, routing,
+serialization, compression) but not through an HTTP server, so the numbers
+compare changes to the application rather than deployments. The database
+answers instantly unless `--db-latency-ms` simulates the round trip; since
+the repositories call the database from the event loop, that latency is
+also a measure of how much the loop is blocked.
+
+Usage (from the backend directory):
+    python -m benchmarks.api_load
+    python -m benchmarks.api_load --theaters 20 --days 14 --concurrency 50 --duration 30
+    python -m benchmarks.api_load --rate 200 --db-latency-ms 5
+    python -m benchmarks.api_load --mix movies=1,original=0,theaters=0
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models.memory import MemoryClient
+from models.repository import FreshnessRepository, MovieRepository
+from models.supabase import set_client
+from scraper.records import MovieRecord, ShowtimeRecord
+
+# Relative weight of each route in the traffic
+DEFAULT_MIX = {"movies": 6, "original": 3, "theaters": 1}
+ROUTES = {
+    "movies": "/movies/{date}",
+    "original": "/movies/original/{date}",
+    "theaters": "/theaters",
+}
+CITIES = ["Milano", "Roma", "Torino", "Bologna", "Firenze", "Napoli"]
+GENRES = ["Drama", "Comedy", "Thriller", "Animation", "Sci-Fi", "Horror", "Documentary"]
+# Header of browser requests; responses are compressed as in production
+BROWSER_HEADERS = [(b"accept", b"application/json"), (b"accept-encoding", b"gzip, deflate, br")]
+
+
+def make_dates(days: int) -> List[str]:
+    today = datetime.now()
+    return [(today + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+
+
+def synthetic_movies(date: str, theaters: int, movies: int,
+                     rng: random.Random) -> List[Dict[str, Any]]:
+    """
+    Build the scraped movies of a date, as the scrapers yield them
+
+    Args:
+        date (str): Date in format YYYY-MM-DD
+        theaters (int): Number of theaters
+        movies (int): Movies per theater, among a pool of twice as many films
+        rng (random.Random): Random source
+
+    Returns:
+        List[Dict[str, Any]]: One movie per theater showing it, with showtimes
+    """
+    scraped = []
+    for n in range(1, theaters + 1):
+        name = f"Cinema {n}"
+        ref = {"source": "bench", "external_id": f"cinema-{n}", "name": name,
+               "city": CITIES[n % len(CITIES)], "address": f"Via Roma {n}", "website": None}
+        for film in rng.sample(range(1, movies * 2 + 1), movies):
+            minutes = sorted(rng.sample(range(14 * 60, 23 * 60, 15), rng.randint(3, 6)))
+            scraped.append(MovieRecord(
+                title=f"Film {film}",
+                original_title=f"Original Film {film}",
+                date=date,
+                image_url=f"https://images.example.com/posters/{film}.jpg",
+                description=" ".join(rng.choice(GENRES).lower() for _ in range(40)),
+                duration=80 + film % 90,
+                genres=[GENRES[film % len(GENRES)], GENRES[(film * 3) % len(GENRES)]],
+                showtimes=[ShowtimeRecord(
+                    time=f"{minute // 60:02d}:{minute % 60:02d}",
+                    theater=name,
+                    room=f"Sala {rng.randint(1, 10)}",
+                    is_original_language=rng.random() < 0.2,
+                    is_3d=rng.random() < 0.1,
+                    booking_url=f"https://tickets.example.com/{n}/{film}/{minute}",
+                    theater_ref=ref,
+                ) for minute in minutes],
+            ).to_dict())
+    return scraped
+
+
+def seed_database(client: MemoryClient, dates: List[str], theaters: int, movies: int,
+                  seed: int = 1) -> None:
+    """
+    Store synthetic data through the repositories, and mark the dates fresh
+
+    Fresh dates keep reads from starting scrapes of the real sites.
+
+    Args:
+        client (MemoryClient): Database to seed, installed as the client
+        dates (List[str]): Dates in format YYYY-MM-DD
+        theaters (int): Number of theaters
+        movies (int): Movies per theater and date
+        seed (int): Random seed, for comparable runs
+    """
+    set_client(client)
+    rng = random.Random(seed)
+    for date in dates:
+        MovieRepository._insert_or_update_movies(synthetic_movies(date, theaters, movies, rng))
+    asyncio.run(FreshnessRepository.mark_refreshed(dates))
+
+
+async def asgi_get(app: Callable, path: str,
+                   headers: Optional[List[Tuple[bytes, bytes]]] = None) -> Tuple[int, int]:
+    """
+    Run a GET request through an ASGI app
+
+    Returns:
+        Tuple[int, int]: Status and size of the response body
+    """
+    path, _, query = path.partition("?")
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+    status = 0
+    size = 0
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+             "query_string": query.encode(), "root_path": "", "server": ("loadtest", 80),
+             "client": ("127.0.0.1", 50000), "headers": [(b"host", b"loadtest"), *(headers or [])]}
+    await app(scope, receive, send)
+    return status, size
+
+
+class Traffic:
+    """
+    Random requests following a route mix, near dates more likely
+
+    The date of a request is drawn with weight 1/(days from today + 1), as
+    most visitors look at today and the next days.
+    """
+
+    def __init__(self, dates: List[str], mix: Dict[str, float], seed: int = 1):
+        self.dates = dates
+        self.routes = [route for route, weight in mix.items() if weight > 0]
+        self.route_weights = [mix[route] for route in self.routes]
+        self.date_weights = [1 / (i + 1) for i in range(len(dates))]
+        self.rng = random.Random(seed)
+
+    def next(self) -> Tuple[str, str]:
+        """Get the route name and path of the next request"""
+        route = self.rng.choices(self.routes, self.route_weights)[0]
+        date = self.rng.choices(self.dates, self.date_weights)[0]
+        return route, ROUTES[route].format(date=date)
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    """p50, p95 and p99 of latencies"""
+    if len(latencies) < 2:
+        value = latencies[0] if latencies else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+async def run_load(app: Callable, traffic: Traffic, concurrency: int = 20,
+                   duration: Optional[float] = None, requests: Optional[int] = None,
+                   warmup: int = 0, rate: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Send requests until the duration or the number of requests is reached
+
+    By default `concurrency` clients each send their next request as soon
+    as the previous one is answered (closed loop). With a `rate`, requests
+    arrive at random like independent visitors, whether or not earlier ones
+    were answered (open loop), and latency counts from the planned arrival,
+    so time spent waiting for a blocked event loop is not left out.
+
+    Args:
+        app (Callable): ASGI application
+        traffic (Traffic): Request generator
+        concurrency (int): Number of clients of the closed loop
+        duration (float, optional): Seconds to send requests for
+        requests (int, optional): Number of requests to send
+        warmup (int): Requests sent before measuring, e.g. to fill caches
+        rate (float, optional): Mean requests per second of the open loop
+
+    Returns:
+        Dict[str, Any]: "seconds" measured, and "results" with a
+                        (route, status, size, latency) tuple per request
+
+    Raises:
+        ValueError: If neither a duration nor a request count is given
+    """
+    if duration is None and requests is None:
+        raise ValueError("Give a duration or a number of requests")
+
+    for _ in range(warmup):
+        await asgi_get(app, traffic.next()[1], BROWSER_HEADERS)
+
+    results: List[Tuple[str, int, int, float]] = []
+    started = time.perf_counter()
+    deadline = started + duration if duration is not None else None
+    sent = 0
+
+    def more() -> bool:
+        return ((requests is None or sent < requests)
+                and (deadline is None or time.perf_counter() < deadline))
+
+    async def send(route: str, path: str, issued: float) -> None:
+        try:
+            status, size = await asgi_get(app, path, BROWSER_HEADERS)
+        except Exception:
+            status, size = 0, 0
+        results.append((route, status, size, time.perf_counter() - issued))
+
+    if rate is None:
+        async def client() -> None:
+            nonlocal sent
+            while more():
+                sent += 1
+                await send(*traffic.next(), time.perf_counter())
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+    else:
+        tasks = []
+        issued = started
+        while more():
+            sent += 1
+            issued += traffic.rng.expovariate(rate)
+            await asyncio.sleep(max(0.0, issued - time.perf_counter()))
+            tasks.append(asyncio.create_task(send(*traffic.next(), issued)))
+        await asyncio.gather(*tasks)
+
+    return {"seconds": time.perf_counter() - started, "results": results}
+
+
+def summarize(results: List[Tuple[str, int, int, float]], seconds: float) -> Dict[str, Dict[str, Any]]:
+    """
+    Throughput and latency overall ("all") and per route
+
+    Returns:
+        Dict[str, Dict[str, Any]]: requests, errors (status 0 or 5xx),
+                                   rps, bytes and latency percentiles (ms)
+    """
+    groups: Dict[str, List[Tuple[str, int, int, float]]] = {"all": results}
+    for result in results:
+        groups.setdefault(result[0], []).append(result)
+
+    summary = {}
+    for name, group in groups.items():
+        latencies = [latency * 1000 for *_, latency in group]
+        summary[name] = {
+            "requests": len(group),
+            "errors": sum(1 for _, status, _, _ in group if status == 0 or status >= 500),
+            "rps": len(group) / seconds if seconds else 0.0,
+            "bytes": statistics.mean(size for _, _, size, _ in group) if group else 0,
+            **percentiles(latencies),
+        }
+    return summary
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse a route mix like "movies=6,original=3,theaters=1" """
+    mix = dict(DEFAULT_MIX)
+    for part in value.split(","):
+        if part.strip():
+            route, _, weight = part.partition("=")
+            if route.strip() not in ROUTES:
+                raise argparse.ArgumentTypeError(
+                    f"unknown route {route.strip()!r}, expected one of {', '.join(ROUTES)}")
+            mix[route.strip()] = float(weight)
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError("the mix needs a route with a positive weight")
+    return mix
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--theaters", type=int, default=10)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--movies", type=int, default=15, help="Movies per theater and day")
+    parser.add_argument("--concurrency", type=int, default=20, help="Clients of the closed loop")
+    parser.add_argument("--rate", type=float,
+                        help="Open loop: mean requests per second, instead of clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests instead")
+    parser.add_argument("--warmup", type=int, default=50, help="Requests before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Route weights, e.g. movies=6,original=3,theaters=1")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0,
+                        help="Simulated round trip of each database query")
+    args = parser.parse_args()
+
+    dates = make_dates(args.days)
+    client = MemoryClient()
+    started = time.perf_counter()
+    seed_database(client, dates, args.theaters, args.movies)
+    client.latency = args.db_latency_ms / 1000
+    print(f"Seeded {len(client.tables['theaters'])} theaters, {len(client.tables['movies'])} "
+          f"movies and {len(client.tables['showtimes'])} showtimes over {len(dates)} days "
+          f"in {time.perf_counter() - started:.1f} s")
+
+    # Imported once the database is in place; main sets up logging and the app
+    from api.main import app
+
+    traffic = Traffic(dates, args.mix)
+    outcome = asyncio.run(run_load(
+        app, traffic, args.concurrency,
+        duration=None if args.requests else args.duration,
+        requests=args.requests, warmup=args.warmup, rate=args.rate))
+
+    summary = summarize(outcome["results"], outcome["seconds"])
+    load = f"{args.rate:g} req/s offered" if args.rate else f"concurrency {args.concurrency}"
+    print(f"{summary['all']['requests']} requests in {outcome['seconds']:.1f} s, "
+          f"{load}, db latency {args.db_latency_ms:g} ms")
+    print(f"  {'route':<10} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'avg KB':>7}")
+    for name in ["all", *[route for route in ROUTES if route in summary]]:
+        row = summary[name]
+        print(f"  {name:<10} {row['requests']:>8} {row['errors']:>6} {row['rps']:>8.1f} "
+              f"{row['p50']:>8.2f} {row['p95']:>8.2f} {row['p99']:>8.2f} {row['bytes'] / 1024:>7.1f}")
+
+    return 0 if summary["all"]["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
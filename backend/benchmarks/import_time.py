@@ -0,0 +1,108 @@
+"""
+Import-time benchmark for the API cold start
+
+Imports a module in fresh interpreters with ``python -X importtime`` and
+reports the median wall time plus the slowest top-level dependencies. It
+also checks that none of the scraper machinery is loaded on the read path.
+
+Usage (from the backend directory):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module api.main --runs 10 --max-ms 800
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported until a scrape is triggered
+FORBIDDEN_MODULES = [
+    "selenium",
+    "webdriver_manager",
+    "bs4",
+    "scraper.scraper_service",
+    "scraper.uci_cinemas_scraper",
+    "scraper.spaziocinema_scraper",
+]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+PROBE = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = (time.perf_counter() - start) * 1000\n"
+    "print(json.dumps({{'ms': elapsed, 'modules': sorted(sys.modules)}}))\n"
+)
+
+
+def measure_once(module: str) -> Tuple[float, List[str], Dict[str, int]]:
+    """
+    Import a module in a fresh interpreter
+
+    Returns:
+        Tuple[float, List[str], Dict[str, int]]: Wall time in ms, loaded
+        modules and cumulative import time in µs per third-party or
+        project package
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+
+    packages: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Only direct imports of the probed module (one level of indent)
+        if match and len(match.group(3)) == 3:
+            name = match.group(4).split(".")[0]
+            if name in sys.stdlib_module_names:
+                continue
+            packages[name] = packages.get(name, 0) + int(match.group(2))
+
+    return probe["ms"], probe["modules"], packages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="api.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Fail if the median import time exceeds this budget")
+    args = parser.parse_args()
+
+    timings = []
+    modules: List[str] = []
+    packages: Dict[str, int] = {}
+    for _ in range(args.runs):
+        ms, modules, packages = measure_once(args.module)
+        timings.append(ms)
+
+    median = statistics.median(timings)
+    print(f"import {args.module}: median {median:.1f} ms "
+          f"(min {min(timings):.1f}, max {max(timings):.1f}, runs {args.runs})")
+
+    print("Slowest direct dependencies:")
+    for name, us in sorted(packages.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {name:<30} {us / 1000:8.1f} ms")
+
+    loaded = [name for name in FORBIDDEN_MODULES if name in modules]
+    if loaded:
+        print(f"FAIL: scraper machinery imported eagerly: {', '.join(loaded)}")
+        return 1
+
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"FAIL: median {median:.1f} ms exceeds budget of {args.max_ms} ms")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,475 @@
+"""
+Offline end-to-end scrape benchmark against a replay server
+
+Serves the pages of the UCI and Spazio Cinema sites from a local HTTP
+server, points the scrapers at it and runs a full ScraperService scrape
+(listing, rendering, parsing, film enrichment and storage) into the
+in-memory database of models/memory.py instead of Supabase. Reports the
+wall time of the run, pages per second, peak RSS and the time per stage.
+
+The pages are synthetic by default, generated at the requested scale
+(cinemas per site x days). `--record DIR` saves them with a manifest and
+`--pages DIR` replays a recording instead, e.g. pages saved from the real
+sites with the same layout (see build_site for the URLs).
+
+No browser is needed: the scrapers' WebDriver is replaced by ReplayDriver,
+which loads pages over HTTP and follows the `data-href` of the clicked UCI
+calendar day. `--browser` keeps the configured Chrome/Firefox driver, the
+calendar days then navigate through their onclick handler.
+
+Usage (from the backend directory):
+    python -m benchmarks.scrape_replay
+    python -m benchmarks.scrape_replay --cinemas 10 --days 7 --concurrency 4
+    python -m benchmarks.scrape_replay --cinemas 3 --days 2 --record replay-pages
+    python -m benchmarks.scrape_replay --pages replay-pages
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from models.memory import MemoryClient
+from models.supabase import set_client
+from monitoring.metrics import SCRAPE_PAGES
+from scraper.checkpoint import CheckpointStore
+from scraper.enrichment import EnrichmentCache, Enricher
+from scraper.registry import ScraperConfig, ScraperRegistry
+from scraper.report import STAGES
+from scraper.scraper_service import ScraperService
+
+SCRAPERS = ("uci", "spaziocinema")
+GENRES = ["Drammatico", "Commedia", "Thriller", "Animazione", "Fantascienza", "Horror"]
+
+# Markup repeated to bring pages to a realistic weight (menus, footers, scripts)
+FILLER = '<li class="nav-item"><a href="/promo/{i}">Offerta {i}</a><span>Dettagli</span></li>'
+
+
+def _page(body: str, page_kb: int) -> str:
+    filler = "".join(FILLER.format(i=i) for i in range(page_kb * 1024 // len(FILLER)))
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"></head><body>"
+            f"<nav><ul>{filler}</ul></nav>{body}</body></html>")
+
+
+def _showtimes(rng: random.Random) -> List[str]:
+    minutes = sorted(rng.sample(range(15 * 60, 23 * 60, 15), rng.randint(2, 5)))
+    return [f"{minute // 60:02d}:{minute % 60:02d}" for minute in minutes]
+
+
+def _film_page(film: int, rng: random.Random, page_kb: int) -> str:
+    genres = rng.sample(GENRES, 2)
+    return _page(
+        f'<div class="film"><h1>Film {film}</h1>'
+        f'<span class="original-title">Original Film {film}</span>'
+        f'<span class="duration">{rng.randint(85, 170)} min</span>'
+        + "".join(f'<span class="genre">{genre}</span>' for genre in genres)
+        + f'<span class="director">Regista {film}</span>'
+        f'<span class="year">{rng.randint(1990, 2024)}</span></div>', page_kb)
+
+
+def build_site(cinemas: int, dates: List[str], movies: int = 12,
+               page_kb: int = 40, seed: int = 1) -> Dict[str, str]:
+    """
+    Generate the pages of both sites
+
+    URLs are relative to the replay server:
+    - /uci/cinema: the cinema list, linking /uci/cinema/uci-cinemas-<n>
+    - /uci/cinema/uci-cinemas-<n>: the first date's movies and the calendar,
+      whose days load /uci/cinema/uci-cinemas-<n>?date=<YYYY-MM-DD>
+    - /spaziocinema/city-<n>/programmazione?data=<dd-mm-YYYY>: a city's movies
+    - /uci/film/film-<n>, /spaziocinema/film/film-<n>: film pages
+
+    Args:
+        cinemas (int): UCI cinemas, and Spazio Cinema cities
+        dates (List[str]): Dates in format YYYY-MM-DD
+        movies (int): Movies per cinema and date, among a pool of twice as
+                      many films so cinemas share films
+        page_kb (int): Approximate size of each page
+        seed (int): Random seed, for comparable runs
+
+    Returns:
+        Dict[str, str]: HTML by path and query
+    """
+    rng = random.Random(seed)
+    films = range(1, movies * 2 + 1)
+    pages: Dict[str, str] = {}
+
+    links = "".join(f'<li><a href="/cinema/uci-cinemas-{n}">UCI Cinema {n}</a></li>'
+                    for n in range(1, cinemas + 1))
+    pages["/uci/cinema"] = _page(f'<ul class="cinema-list">{links}</ul>', page_kb)
+
+    for n in range(1, cinemas + 1):
+        path = f"/uci/cinema/uci-cinemas-{n}"
+        calendar = "".join(
+            f'<button class="calendar-day" data-href="{path}?date={date}" '
+            f'onclick="location.href=this.dataset.href">{int(date[-2:])}</button>'
+            for date in dates)
+        for date in dates:
+            containers = []
+            for film in sorted(rng.sample(films, movies)):
+                times = "".join(f'<a href="/booking/{n}/{film}/{time_text}">{time_text}</a>'
+                                for time_text in _showtimes(rng))
+                tag = '<span class="language-tag">V.O.</span>' if rng.random() < 0.15 else ""
+                containers.append(
+                    f'<div class="movie-container"><a href="/film/film-{film}">'
+                    f'<h3 class="movie-title">Film {film}</h3></a>'
+                    f'<p class="movie-description">Trama del film {film}.</p>'
+                    f'<img src="https://img.example.com/film-{film}.jpg">{tag}'
+                    f'<div class="showtimes">{times}</div></div>')
+            body = f'<div class="calendar-container">{calendar}</div>{"".join(containers)}'
+            pages[f"{path}?date={date}"] = _page(body, page_kb)
+        # Without a date the page shows the first one, as the site shows today
+        pages[path] = pages[f"{path}?date={dates[0]}"]
+
+        city = f"city-{n}"
+        for date in dates:
+            cards = []
+            for film in sorted(rng.sample(films, movies)):
+                times = "".join(
+                    f'<span class="time"><a href="/booking/{city}/{film}">{time_text}'
+                    f'{" V.O." if rng.random() < 0.15 else ""}</a></span>'
+                    for time_text in _showtimes(rng))
+                cards.append(
+                    f'<div class="movie-card"><h2 class="movie-title">'
+                    f'<a href="/film/film-{film}">Film {film}</a></h2>'
+                    f'<p class="movie-synopsis">Trama del film {film}.</p>'
+                    f'<img src="/img/film-{film}.jpg">'
+                    f'<span class="movie-duration">{rng.randint(85, 170)} min</span>'
+                    f'<span class="movie-genre">{", ".join(rng.sample(GENRES, 2))}</span>'
+                    f'<div class="movie-times">{times}</div></div>')
+            day = datetime.strptime(date, "%Y-%m-%d").strftime("%d-%m-%Y")
+            pages[f"/spaziocinema/{city}/programmazione?data={day}"] = _page(
+                f'<div class="movie-list">{"".join(cards)}</div>', page_kb)
+
+    for film in films:
+        pages[f"/uci/film/film-{film}"] = _film_page(film, rng, page_kb)
+        pages[f"/spaziocinema/film/film-{film}"] = _film_page(film, rng, page_kb)
+    return pages
+
+
+def save_site(directory: str, pages: Dict[str, str], dates: List[str], cities: List[str]) -> None:
+    """Write pages and their manifest.json to a directory, for load_site"""
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for i, (path, html) in enumerate(sorted(pages.items())):
+        files[path] = f"page-{i:05d}.html"
+        with open(os.path.join(directory, files[path]), "w", encoding="utf-8") as f:
+            f.write(html)
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"dates": dates, "cities": cities, "pages": files}, f, indent=2)
+
+
+def load_site(directory: str) -> Dict[str, Any]:
+    """
+    Read a recording written by save_site
+
+    Returns:
+        Dict[str, Any]: "dates" and "cities" of the recording, and "pages"
+                        with the HTML by path and query
+    """
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    pages = {}
+    for path, name in manifest["pages"].items():
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            pages[path] = f.read()
+    return {"dates": manifest["dates"], "cities": manifest["cities"], "pages": pages}
+
+
+class ReplayServer:
+    """
+    Threaded HTTP server answering GET requests from a dict of pages
+    """
+
+    def __init__(self, pages: Dict[str, str]):
+        self.pages = {path: html.encode("utf-8") for path, html in pages.items()}
+        self.requests = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                body = server.pages.get(self.path)
+                self.send_response(200 if body is not None else 404)
+                body = body if body is not None else b"Not found"
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class ReplayElement:
+    """Element found by ReplayDriver, with the WebElement attributes the scrapers use"""
+
+    def __init__(self, driver: "ReplayDriver", tag):
+        self._driver = driver
+        self._tag = tag
+
+    @property
+    def text(self) -> str:
+        return self._tag.get_text()
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        return self._tag.get(name)
+
+    def click(self) -> None:
+        """Navigate like the calendar days and links of the replayed pages"""
+        href = self._tag.get("data-href") or self._tag.get("href")
+        if href:
+            self._driver.get(urljoin(self._driver.current_url, href))
+
+
+class ReplayDriver:
+    """
+    WebDriver stand-in loading pages over HTTP without running their scripts
+
+    Implements what the scrapers and WebDriverWait call: get, page_source,
+    find_element(s) by CSS selector, click and the timeout setters.
+    """
+
+    def __init__(self):
+        self.current_url = ""
+        self.page_source = ""
+        self._soup: Optional[BeautifulSoup] = None
+        self._timeout = 30.0
+
+    def set_page_load_timeout(self, seconds: float) -> None:
+        self._timeout = seconds
+
+    def implicitly_wait(self, seconds: float) -> None:
+        pass
+
+    def get(self, url: str) -> None:
+        with urllib.request.urlopen(url, timeout=self._timeout) as response:
+            self.page_source = response.read().decode("utf-8")
+        self.current_url = url
+        self._soup = None
+
+    def _select(self, by: str, value: str) -> list:
+        if by != By.CSS_SELECTOR:
+            raise NotImplementedError(f"ReplayDriver only finds elements by CSS selector, not {by}")
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.page_source, "lxml")
+        return self._soup.select(value)
+
+    def find_element(self, by: str = By.CSS_SELECTOR, value: str = "") -> ReplayElement:
+        found = self._select(by, value)
+        if not found:
+            raise NoSuchElementException(f"No element matches {value}")
+        return ReplayElement(self, found[0])
+
+    def find_elements(self, by: str = By.CSS_SELECTOR, value: str = "") -> List[ReplayElement]:
+        return [ReplayElement(self, tag) for tag in self._select(by, value)]
+
+    def quit(self) -> None:
+        pass
+
+
+def replay_registry(base_url: str, cities: List[str], scrapers=SCRAPERS,
+                    concurrency: int = 2, browser: bool = False) -> ScraperRegistry:
+    """
+    Build a registry of the scrapers pointed at the replay server
+
+    Args:
+        base_url (str): URL of the replay server
+        cities (List[str]): Spazio Cinema cities to scrape
+        scrapers: Names of the scrapers to run, among SCRAPERS
+        concurrency (int): Units scraped in parallel per scraper
+        browser (bool): Keep the configured WebDriver instead of ReplayDriver
+
+    Returns:
+        ScraperRegistry: Registry without rate limits nor refresh intervals
+    """
+    configs = []
+    if "uci" in scrapers:
+        configs.append(ScraperConfig(
+            name="uci", class_path="scraper.uci_cinemas_scraper.UCICinemasScraper",
+            base_url=f"{base_url}/uci", concurrency=concurrency,
+            options={"max_cinemas": None}))
+    if "spaziocinema" in scrapers:
+        configs.append(ScraperConfig(
+            name="spaziocinema", class_path="scraper.spaziocinema_scraper.SpaziocinemaInfoScraper",
+            base_url=f"{base_url}/spaziocinema", concurrency=concurrency,
+            options={"cities": cities}))
+
+    registry = ScraperRegistry(configs)
+    if not browser:
+        for scraper in registry.enabled_scrapers():
+            # The drivers of the scraper's pool are created by this factory
+            scraper._get_selenium_driver = ReplayDriver
+    return registry
+
+
+def pages_loaded() -> Dict[tuple, float]:
+    """Pages loaded so far by (scraper, method, outcome), from the scrape metrics"""
+    return {(labels["scraper"], labels["method"], labels["outcome"]): value
+            for _, labels, value in SCRAPE_PAGES.samples()}
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the process so far, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def run_benchmark(pages: Dict[str, str], dates: List[str], cities: List[str],
+                  scrapers=SCRAPERS, concurrency: int = 2,
+                  browser: bool = False) -> Dict[str, Any]:
+    """
+    Run a full scrape of the dates against the replayed pages
+
+    Args:
+        pages (Dict[str, str]): HTML by path and query (see build_site)
+        dates (List[str]): Dates to scrape, in format YYYY-MM-DD
+        cities (List[str]): Spazio Cinema cities to scrape
+        scrapers: Names of the scrapers to run, among SCRAPERS
+        concurrency (int): Units scraped in parallel per scraper
+        browser (bool): Use the configured WebDriver instead of ReplayDriver
+
+    Returns:
+        Dict[str, Any]: Wall time, pages loaded by (scraper, method,
+                        outcome), requests served, peak RSS, the run's
+                        RunReport and the in-memory database
+    """
+    server = ReplayServer(pages)
+    server.start()
+    database = MemoryClient()
+    set_client(database)
+    registry = replay_registry(server.url, cities, scrapers, concurrency, browser)
+    rss_before = peak_rss_mb()
+    pages_before = pages_loaded()
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            # Fresh checkpoints and film cache, so every film page is fetched
+            service = ScraperService(
+                registry=registry,
+                checkpoints=CheckpointStore(os.path.join(directory, "checkpoints.sqlite")),
+                enricher=Enricher(EnrichmentCache(os.path.join(directory, "enrichment.sqlite"))),
+                profile_dir=None)
+            started = time.perf_counter()
+            result = asyncio.run(service.run(dates, force=True))
+            seconds = time.perf_counter() - started
+    finally:
+        registry.close()
+        server.stop()
+
+    # Unit reports miss the cinema lists and film pages, loaded outside units
+    pages: Dict[tuple, float] = {}
+    for key, value in pages_loaded().items():
+        if value > pages_before.get(key, 0):
+            pages[key] = value - pages_before.get(key, 0)
+
+    return {
+        "seconds": seconds,
+        "requests": server.requests,
+        "pages": pages,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "written": result.written,
+        "report": result.report,
+        "database": database,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cinemas", type=int, default=3,
+                        help="UCI cinemas, and Spazio Cinema cities")
+    parser.add_argument("--days", type=int, default=2)
+    parser.add_argument("--movies", type=int, default=12, help="Movies per cinema and day")
+    parser.add_argument("--page-kb", type=int, default=40, help="Approximate size of each page")
+    parser.add_argument("--concurrency", type=int, default=2, help="Units in parallel per scraper")
+    parser.add_argument("--scrapers", default=",".join(SCRAPERS))
+    parser.add_argument("--record", metavar="DIR", help="Save the generated pages to DIR")
+    parser.add_argument("--pages", metavar="DIR", help="Replay the pages recorded in DIR")
+    parser.add_argument("--browser", action="store_true",
+                        help="Render with the configured WebDriver instead of ReplayDriver")
+    args = parser.parse_args()
+
+    scrapers = [name.strip() for name in args.scrapers.split(",") if name.strip()]
+    unknown = set(scrapers) - set(SCRAPERS)
+    if unknown:
+        parser.error(f"unknown scrapers: {', '.join(sorted(unknown))}")
+    # Calendar days are matched by day of the month
+    if not 1 <= args.days <= 28:
+        parser.error("--days must be between 1 and 28")
+
+    if args.pages:
+        site = load_site(args.pages)
+        pages, dates, cities = site["pages"], site["dates"], site["cities"]
+    else:
+        today = datetime.now()
+        dates = [(today + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(args.days)]
+        cities = [f"city-{n}" for n in range(1, args.cinemas + 1)]
+        pages = build_site(args.cinemas, dates, args.movies, args.page_kb)
+        if args.record:
+            save_site(args.record, pages, dates, cities)
+            print(f"Recorded {len(pages)} pages to {args.record}")
+
+    print(f"{len(pages)} pages ({sum(len(html) for html in pages.values()) / 2 ** 20:.1f} MB), "
+          f"{len(dates)} dates, scrapers: {', '.join(scrapers)}, concurrency {args.concurrency}")
+    outcome = run_benchmark(pages, dates, cities, scrapers, args.concurrency, args.browser)
+
+    report = outcome["report"]
+    totals = report.scrapers()
+    loaded = int(sum(outcome["pages"].values()))
+    failed = int(sum(value for key, value in outcome["pages"].items() if key[2] == "error"))
+    seconds = outcome["seconds"]
+    print(f"Run {report.status}: {len(report.units)} units, {outcome['written']} movies written")
+    print(f"  {'wall time':<14} {seconds:8.2f} s")
+    print(f"  {'pages':<14} {loaded:8d}     ({loaded / seconds:.1f} pages/s, {failed} failed, "
+          f"{outcome['requests']} requests served)")
+    print(f"  {'peak RSS':<14} {outcome['peak_rss_mb']:8.1f} MB  "
+          f"({outcome['rss_before_mb']:.1f} MB before the run)")
+    for name, total in totals.items():
+        stages = ", ".join(f"{stage} {total['stages'][stage]:.2f}" for stage in STAGES)
+        print(f"  {name:<14} {total['units']} units, {total['failed']} failed; "
+              f"busy seconds by stage (batches overlap): {stages}")
+    database = outcome["database"]
+    print("  stored rows:   " + ", ".join(
+        f"{table} {len(rows)}" for table, rows in sorted(database.tables.items())))
+
+    return 0 if report.status == "completed" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
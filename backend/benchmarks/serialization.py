@@ -0,0 +1,133 @@
+"""
+Serialization and compression benchmark for movie listings
+
+Builds a realistic date of movies with nested showtimes and compares the
+default FastAPI path (jsonable_encoder + stdlib json) with orjson, then
+reports the bytes on the wire uncompressed, gzipped and brotli-compressed.
+
+Usage (from the backend directory):
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --movies 100 --runs 50
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from api.compression import compress, supported_encodings
+
+THEATERS = ["UCI Bicocca", "UCI Certosa", "UCI Lissone", "Spazio Cinema Milano",
+            "Anteo Palazzo del Cinema", "Arcobaleno Film Center"]
+GENRES = ["Drama", "Comedy", "Thriller", "Animation", "Sci-Fi", "Horror", "Documentary"]
+
+
+def sample_movies(count: int, date: str = "2024-05-01", seed: int = 1) -> List[Dict[str, Any]]:
+    """
+    Build movies shaped like the /movies/{date} response
+
+    Args:
+        count (int): Number of movies
+        date (str): Date of the listing
+        seed (int): Random seed, for comparable runs
+
+    Returns:
+        List[Dict[str, Any]]: Movies with film metadata and 5-40 showtimes each
+    """
+    rng = random.Random(seed)
+    movies = []
+    for movie_id in range(1, count + 1):
+        showtimes = []
+        for showtime_id in range(rng.randint(5, 40)):
+            minute = rng.randrange(14 * 60, 24 * 60 + 30, 5)
+            showtimes.append({
+                "id": movie_id * 100 + showtime_id,
+                "movie_id": movie_id,
+                "theater_id": rng.randint(1, len(THEATERS)),
+                "time": f"{minute // 60 % 24:02d}:{minute % 60:02d}:00",
+                "time_text": f"{minute // 60 % 24:02d}:{minute % 60:02d}",
+                "start_minute": minute,
+                "theater": rng.choice(THEATERS),
+                "room": f"Sala {rng.randint(1, 12)}",
+                "is_original_language": rng.random() < 0.2,
+                "is_3d": rng.random() < 0.1,
+                "booking_url": f"https://tickets.example.com/{movie_id}/{showtime_id}",
+                "created_at": "2024-05-01T06:00:00.000000+00:00",
+                "updated_at": "2024-05-01T06:00:00.000000+00:00",
+            })
+        movies.append({
+            "id": movie_id,
+            "film_id": movie_id,
+            "title": f"Movie {movie_id}",
+            "date": date,
+            "original_title": f"Original Movie Title {movie_id}",
+            "image_url": f"https://images.example.com/posters/{movie_id}.jpg",
+            "description": " ".join(rng.choice(GENRES).lower() for _ in range(60)),
+            "duration": rng.randint(80, 180),
+            "genres": rng.sample(GENRES, 2),
+            "rating": round(rng.uniform(4, 9), 1),
+            "director": f"Director {movie_id}",
+            "year": rng.randint(1960, 2024),
+            "created_at": "2024-05-01T06:00:00.000000+00:00",
+            "updated_at": "2024-05-01T06:00:00.000000+00:00",
+            "showtimes": showtimes,
+        })
+    return movies
+
+
+def default_render(movies: List[Dict[str, Any]]) -> bytes:
+    """FastAPI's path for an endpoint returning plain dicts"""
+    return JSONResponse(jsonable_encoder(movies)).body
+
+
+def orjson_render(movies: List[Dict[str, Any]]) -> bytes:
+    """Path of the endpoints returning an ORJSONResponse directly"""
+    return ORJSONResponse(movies).body
+
+
+def time_ms(func: Callable[[], Any], runs: int) -> float:
+    """Median wall time of a function in ms"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--movies", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    movies = sample_movies(args.movies)
+    showtimes = sum(len(movie["showtimes"]) for movie in movies)
+    print(f"{args.movies} movies, {showtimes} showtimes, median of {args.runs} runs")
+
+    default_ms = time_ms(lambda: default_render(movies), args.runs)
+    orjson_ms = time_ms(lambda: orjson_render(movies), args.runs)
+    print("Serialization:")
+    print(f"  {'jsonable_encoder + json':<26} {default_ms:8.2f} ms")
+    print(f"  {'orjson':<26} {orjson_ms:8.2f} ms  ({default_ms / orjson_ms:.1f}x faster)")
+
+    body = orjson_render(movies)
+    print("Bytes on the wire:")
+    print(f"  {'identity':<26} {len(body):8d} B")
+    for encoding in supported_encodings():
+        compressed_ms = time_ms(lambda: compress(body, encoding), args.runs)
+        compressed = compress(body, encoding)
+        print(f"  {encoding:<26} {len(compressed):8d} B  "
+              f"({len(compressed) / len(body):.1%}, {compressed_ms:.2f} ms)")
+    if "br" not in supported_encodings():
+        print("  (install brotli to compare br)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Sparse fieldsets for the movie and theater endpoints
+
+A `fields=title,image_url,showtimes.time,showtimes.theater` parameter is
+parsed into a projection rendered as the PostgREST select clause, so
+columns a view does not show are neither read from the database nor sent
+to the client. Without `fields` every column is returned.
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# Columns of the movies rows; the other movie fields come from films
+MOVIE_COLUMNS = ('id', 'title', 'date', 'film_id', 'created_at', 'updated_at')
+
+# Descriptive metadata stored once per film instead of on every dated movie row
+FILM_FIELDS = ('title', 'original_title', 'image_url', 'description',
+               'duration', 'genres', 'rating', 'director', 'year')
+
+SHOWTIME_COLUMNS = ('id', 'movie_id', 'theater_id', 'time', 'time_text', 'start_minute',
+                    'theater', 'room', 'is_original_language', 'is_3d', 'booking_url',
+                    'created_at')
+
+THEATER_COLUMNS = ('id', 'name', 'address', 'city', 'website', 'phone', 'features',
+                   'source', 'external_id', 'created_at', 'updated_at')
+
+ALL = ('*',)
+
+
+@dataclass(frozen=True)
+class MovieFields:
+    """
+    Projection of a movie response
+
+    Attributes:
+        movie (Tuple[str, ...]): Columns of the movies row, ALL for every one
+        film (Tuple[str, ...]): Film metadata fields flattened into the movie
+        showtimes (Tuple[str, ...], optional): Showtime columns, ALL for every
+                                               one, None to leave showtimes out
+    """
+    movie: Tuple[str, ...] = ALL
+    film: Tuple[str, ...] = FILM_FIELDS
+    showtimes: Optional[Tuple[str, ...]] = ALL
+
+    def movie_select(self, with_showtimes: bool = True) -> str:
+        """
+        Render the select clause of a query on the movies table
+
+        Args:
+            with_showtimes (bool): Embed the showtimes of each movie
+
+        Returns:
+            str: PostgREST select clause
+        """
+        parts = list(self.movie)
+        if self.film:
+            parts.append(f"films({', '.join(self.film)})")
+        if with_showtimes and self.showtimes is not None:
+            parts.append(f"showtimes({', '.join(self.showtimes)})")
+        return ', '.join(parts)
+
+    def showtime_select(self) -> str:
+        """Render the select clause of a query on showtimes embedding their movie"""
+        # Showtimes are the rows of the query, at least their ID is needed
+        columns = self.showtimes if self.showtimes is not None else ('id',)
+        return f"{', '.join(columns)}, movies!inner({self.movie_select(with_showtimes=False)})"
+
+
+ALL_MOVIE_FIELDS = MovieFields()
+
+
+def _split(fields: str) -> Tuple[str, ...]:
+    """Split a comma-separated fields parameter, ignoring blanks and repeats"""
+    names = (name.strip() for name in fields.split(','))
+    return tuple(dict.fromkeys(name for name in names if name))
+
+
+def parse_movie_fields(fields: Optional[str]) -> MovieFields:
+    """
+    Parse the fields parameter of a movie endpoint
+
+    Top-level names select movie and film fields, "showtimes" selects every
+    showtime column and "showtimes.<column>" single ones. Showtimes are left
+    out unless requested. The movie ID is always included.
+
+    Args:
+        fields (str, optional): Comma-separated field names, None for all
+
+    Returns:
+        MovieFields: Projection of the response
+
+    Raises:
+        ValueError: If a field does not exist
+    """
+    if not fields or not fields.strip():
+        return ALL_MOVIE_FIELDS
+
+    movie = ['id']
+    film = []
+    showtimes = None
+    for name in _split(fields):
+        if name == 'showtimes':
+            showtimes = ALL
+        elif name.startswith('showtimes.'):
+            column = name[len('showtimes.'):]
+            if column not in SHOWTIME_COLUMNS:
+                raise ValueError(f"Unknown showtime field: {column}")
+            if showtimes != ALL:
+                showtimes = (showtimes or ()) + (column,)
+        elif name in MOVIE_COLUMNS:
+            if name not in movie:
+                movie.append(name)
+        elif name in FILM_FIELDS:
+            film.append(name)
+        else:
+            raise ValueError(f"Unknown field: {name}")
+
+    return MovieFields(movie=tuple(movie), film=tuple(film), showtimes=showtimes)
+
+
+def parse_theater_fields(fields: Optional[str]) -> str:
+    """
+    Parse the fields parameter of a theater endpoint
+
+    Args:
+        fields (str, optional): Comma-separated field names, None for all
+
+    Returns:
+        str: PostgREST select clause, always including the theater ID
+
+    Raises:
+        ValueError: If a field does not exist
+    """
+    if not fields or not fields.strip():
+        return '*'
+
+    columns = ['id']
+    for name in _split(fields):
+        if name not in THEATER_COLUMNS:
+            raise ValueError(f"Unknown field: {name}")
+        if name not in columns:
+            columns.append(name)
+    return ', '.join(columns)
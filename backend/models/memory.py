@@ -0,0 +1,390 @@
+"""
+In-memory database implementing the part of the Supabase client the repositories use
+
+Lets the scraper and the API run without Supabase, e.g. in the benchmarks:
+
+    from models.memory import MemoryClient
+    from models.supabase import set_client
+
+    set_client(MemoryClient())
+
+Queries follow PostgREST semantics for what the repositories use: column
+projection, resources embedded along FOREIGN_KEYS (`films(title, year)`,
+`movies!inner(*, films(*))`), filters on embedded columns (`movies.date`),
+ordering, limits, single rows and upserts on a conflict target. Inserted
+rows get an `id` and a `created_at`. No other constraint is enforced.
+
+Queries answer in microseconds; a `latency` makes each one block its
+caller like a round trip to the database would, e.g. to compare caching
+changes under realistic conditions.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Foreign key column by (table, referenced table), as in models/migrations.py
+FOREIGN_KEYS = {
+    ("movies", "films"): "film_id",
+    ("showtimes", "movies"): "movie_id",
+    ("showtimes", "theaters"): "theater_id",
+}
+
+
+class QueryError(Exception):
+    """Raised for queries the database cannot answer, like postgrest's APIError"""
+
+
+class QueryResponse:
+    """Result of a query, with the rows in `data` like postgrest's APIResponse"""
+
+    def __init__(self, data: Any):
+        self.data = data
+        self.count = None
+
+
+class Embed:
+    """
+    Resource embedded by a select clause
+
+    Attributes:
+        table (str): Embedded table
+        inner (bool): Drop the rows without a matching embedded row (`!inner`)
+        items (List): Parsed select clause of the embedded rows
+    """
+
+    def __init__(self, table: str, inner: bool, items: List[Any]):
+        self.table = table
+        self.inner = inner
+        self.items = items
+
+
+def _split_top_level(clause: str) -> List[str]:
+    """Split a select clause at the commas outside parentheses"""
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(clause):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(clause[start:i])
+            start = i + 1
+    parts.append(clause[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_select(clause: str) -> List[Any]:
+    """
+    Parse a PostgREST select clause
+
+    Args:
+        clause (str): e.g. "id, title, films(title, year), showtimes(*)"
+
+    Returns:
+        List[Any]: Column names, and an Embed for each embedded resource
+
+    Raises:
+        QueryError: If the parentheses do not match
+    """
+    items: List[Any] = []
+    for part in _split_top_level(clause):
+        if "(" not in part:
+            items.append(part)
+            continue
+        if not part.endswith(")"):
+            raise QueryError(f"Invalid select clause: {clause}")
+        name, inner_clause = part[:-1].split("(", 1)
+        table, _, hint = name.strip().partition("!")
+        items.append(Embed(table, hint == "inner", parse_select(inner_clause)))
+    return items
+
+
+def _sort_key(value: Any) -> Tuple[bool, Any]:
+    """Sort key putting NULLs last, as PostgreSQL does in ascending order"""
+    return (value is None, value if value is not None else 0)
+
+
+class MemoryQuery:
+    """
+    Query builder of MemoryClient, mirroring postgrest's SyncRequestBuilder
+    """
+
+    def __init__(self, client: "MemoryClient", table: str):
+        self.client = client
+        self.table = table
+        self.operation = "select"
+        self.items: List[Any] = ["*"]
+        self.payload: Any = None
+        self.conflict_columns = ["id"]
+        # (column path, predicate) pairs; paths longer than one filter embeds
+        self.filters: List[Tuple[List[str], Callable[[Any], bool]]] = []
+        # Equality filters on the table's columns, answered through indexes
+        self.equals: List[Tuple[str, Any]] = []
+        self.order_by: List[Tuple[str, bool]] = []
+        self.limit_count: Optional[int] = None
+        self.single_row = False
+
+    def select(self, columns: str = "*") -> "MemoryQuery":
+        self.items = parse_select(columns)
+        return self
+
+    def insert(self, rows: Any) -> "MemoryQuery":
+        self.operation, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows: Any, on_conflict: str = "") -> "MemoryQuery":
+        self.operation, self.payload = "upsert", rows
+        if on_conflict:
+            self.conflict_columns = [column.strip() for column in on_conflict.split(",")]
+        return self
+
+    def update(self, values: Dict[str, Any]) -> "MemoryQuery":
+        self.operation, self.payload = "update", values
+        return self
+
+    def delete(self) -> "MemoryQuery":
+        self.operation = "delete"
+        return self
+
+    def _filter(self, column: str, predicate: Callable[[Any], bool]) -> "MemoryQuery":
+        self.filters.append((column.split("."), predicate))
+        return self
+
+    def eq(self, column: str, value: Any) -> "MemoryQuery":
+        if "." not in column:
+            self.equals.append((column, value))
+        return self._filter(column, lambda v: v == value)
+
+    def neq(self, column: str, value: Any) -> "MemoryQuery":
+        return self._filter(column, lambda v: v != value)
+
+    def gt(self, column: str, value: Any) -> "MemoryQuery":
+        return self._filter(column, lambda v: v is not None and v > value)
+
+    def gte(self, column: str, value: Any) -> "MemoryQuery":
+        return self._filter(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column: str, value: Any) -> "MemoryQuery":
+        return self._filter(column, lambda v: v is not None and v < value)
+
+    def lte(self, column: str, value: Any) -> "MemoryQuery":
+        return self._filter(column, lambda v: v is not None and v <= value)
+
+    def in_(self, column: str, values: Iterable[Any]) -> "MemoryQuery":
+        values = set(values)
+        return self._filter(column, lambda v: v in values)
+
+    def order(self, column: str, desc: bool = False) -> "MemoryQuery":
+        self.order_by.append((column, desc))
+        return self
+
+    def limit(self, count: int) -> "MemoryQuery":
+        self.limit_count = count
+        return self
+
+    def single(self) -> "MemoryQuery":
+        self.single_row = True
+        return self
+
+    def execute(self) -> QueryResponse:
+        if self.client.latency:
+            time.sleep(self.client.latency)
+        with self.client.lock:
+            if self.operation == "select":
+                data = self._select()
+            elif self.operation == "insert":
+                data = self.client.insert_rows(self.table, self._payload_rows())
+            elif self.operation == "upsert":
+                data = self.client.upsert_rows(
+                    self.table, self._payload_rows(), self.conflict_columns)
+            elif self.operation == "update":
+                data = self.client.update_rows(self.table, self._matching(), self.payload)
+            else:
+                data = self.client.delete_rows(self.table, self._matching())
+
+        if self.single_row:
+            if len(data) != 1:
+                raise QueryError(
+                    f"JSON object requested, {len(data)} rows returned from {self.table}")
+            data = data[0]
+        return QueryResponse(data)
+
+    def _payload_rows(self) -> List[Dict[str, Any]]:
+        return [self.payload] if isinstance(self.payload, dict) else list(self.payload)
+
+    def _matching(self) -> List[Dict[str, Any]]:
+        """Stored rows matching the filters on the table's own columns"""
+        filters = [(path[0], predicate) for path, predicate in self.filters if len(path) == 1]
+        if self.equals:
+            rows = self.client.lookup(self.table, *self.equals[0])
+        else:
+            rows = self.client.rows(self.table)
+        return [row for row in rows
+                if all(predicate(row.get(column)) for column, predicate in filters)]
+
+    def _select(self) -> List[Dict[str, Any]]:
+        rows = self._matching()
+        for column, desc in reversed(self.order_by):
+            rows = sorted(rows, key=lambda row: _sort_key(row.get(column)), reverse=desc)
+
+        embed_filters = [(path, predicate) for path, predicate in self.filters if len(path) > 1]
+        data = []
+        for row in rows:
+            rendered = self.client.render(self.table, row, self.items, embed_filters)
+            if rendered is not None:
+                data.append(rendered)
+                if self.limit_count is not None and len(data) >= self.limit_count:
+                    break
+        return data
+
+
+class MemoryClient:
+    """
+    In-memory stand-in for the Supabase client, safe to share between threads
+
+    Rows are dicts in per-table lists. Lookups by column go through indexes
+    built on first use and dropped when the table is written, so reads of a
+    seeded database do not scan whole tables.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Args:
+            latency (float): Seconds each query blocks before it is answered
+        """
+        self.latency = latency
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.lock = threading.RLock()
+        self._next_ids: Dict[str, int] = {}
+        self._indexes: Dict[Tuple[str, str], Dict[Any, List[Dict[str, Any]]]] = {}
+
+    def table(self, name: str) -> MemoryQuery:
+        return MemoryQuery(self, name)
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        return self.tables.setdefault(table, [])
+
+    def lookup(self, table: str, column: str, value: Any) -> List[Dict[str, Any]]:
+        """Rows of a table with a column equal to a value, through its index"""
+        index = self._indexes.get((table, column))
+        if index is None:
+            index = {}
+            for row in self.rows(table):
+                try:
+                    index.setdefault(row.get(column), []).append(row)
+                except TypeError:
+                    # Unhashable values (arrays, JSON) are not indexed
+                    return [row for row in self.rows(table) if row.get(column) == value]
+            self._indexes[(table, column)] = index
+        try:
+            return index.get(value, [])
+        except TypeError:
+            return [row for row in self.rows(table) if row.get(column) == value]
+
+    def _invalidate(self, table: str) -> None:
+        for key in [key for key in self._indexes if key[0] == table]:
+            del self._indexes[key]
+
+    def insert_rows(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        stored = self.rows(table)
+        inserted = []
+        for row in rows:
+            row = dict(row)
+            if row.get("id") is None:
+                row["id"] = self._next_ids.get(table, 0) + 1
+            self._next_ids[table] = max(self._next_ids.get(table, 0), row["id"])
+            row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+            stored.append(row)
+            inserted.append(dict(row))
+        self._invalidate(table)
+        return inserted
+
+    def upsert_rows(self, table: str, rows: List[Dict[str, Any]],
+                    conflict_columns: List[str]) -> List[Dict[str, Any]]:
+        existing = {tuple(row.get(column) for column in conflict_columns): row
+                    for row in self.rows(table)}
+        result = []
+        for row in rows:
+            key = tuple(row.get(column) for column in conflict_columns)
+            match = existing.get(key) if None not in key else None
+            if match is not None:
+                match.update(row)
+                result.append(dict(match))
+            else:
+                inserted = self.insert_rows(table, [row])[0]
+                existing[key] = self.rows(table)[-1]
+                result.append(inserted)
+        self._invalidate(table)
+        return result
+
+    def update_rows(self, table: str, rows: List[Dict[str, Any]],
+                    values: Dict[str, Any]) -> List[Dict[str, Any]]:
+        for row in rows:
+            row.update(values)
+        self._invalidate(table)
+        return [dict(row) for row in rows]
+
+    def delete_rows(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        removed = {id(row) for row in rows}
+        self.tables[table] = [row for row in self.rows(table) if id(row) not in removed]
+        self._invalidate(table)
+        return [dict(row) for row in rows]
+
+    def render(self, table: str, row: Dict[str, Any], items: List[Any],
+               filters: List[Tuple[List[str], Callable[[Any], bool]]]) -> Optional[Dict[str, Any]]:
+        """
+        Project a row on a select clause, embedding the related rows
+
+        Args:
+            table (str): Table of the row
+            row (Dict[str, Any]): Stored row
+            items (List[Any]): Parsed select clause (see parse_select)
+            filters (List[tuple]): Filters on the embedded resources, by column path
+
+        Returns:
+            Optional[Dict[str, Any]]: Rendered row, None when an `!inner`
+                                      embed has no matching row
+
+        Raises:
+            QueryError: If an embedded table is not related to the table
+        """
+        rendered: Dict[str, Any] = {}
+        for item in items:
+            if item == "*":
+                rendered.update(row)
+            elif isinstance(item, str):
+                rendered[item] = row.get(item)
+            else:
+                value = self._embed(table, row, item, filters)
+                if item.inner and not value:
+                    return None
+                rendered[item.table] = value
+        return rendered
+
+    def _embed(self, table: str, row: Dict[str, Any], embed: Embed,
+               filters: List[Tuple[List[str], Callable[[Any], bool]]]) -> Any:
+        """Rows of the embedded table related to a row, rendered"""
+        nested = [(path[1:], predicate) for path, predicate in filters if path[0] == embed.table]
+        own = [(path[0], predicate) for path, predicate in nested if len(path) == 1]
+        deeper = [(path, predicate) for path, predicate in nested if len(path) > 1]
+
+        if (table, embed.table) in FOREIGN_KEYS:
+            # Many-to-one: the row references a single embedded row, or null
+            many = False
+            candidates = self.lookup(embed.table, "id", row.get(FOREIGN_KEYS[(table, embed.table)]))
+        elif (embed.table, table) in FOREIGN_KEYS:
+            many = True
+            candidates = self.lookup(embed.table, FOREIGN_KEYS[(embed.table, table)], row.get("id"))
+        else:
+            raise QueryError(f"Could not find a relationship between '{table}' and '{embed.table}'")
+
+        rendered = []
+        for candidate in candidates:
+            if all(predicate(candidate.get(column)) for column, predicate in own):
+                value = self.render(embed.table, candidate, embed.items, deeper)
+                if value is not None:
+                    rendered.append(value)
+        if many:
+            return rendered
+        return rendered[0] if rendered else None
@@ -1,15 +1,19 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 
 class Showtime(BaseModel):
-    time: str
+    time: str  # HH:MM
+    time_text: Optional[str] = None  # Time as shown by the cinema
+    start_minute: Optional[int] = None  # Minutes of the cinema day, see scraper.times
     theater: str
-    room: str
-    is_original_language: bool
+    room: Optional[str] = None
+    is_original_language: bool = False
     is_3d: bool = False
     booking_url: Optional[str] = None
+    # Theater to upsert and link, see BaseScraper.theater_ref
+    theater_ref: Optional[Dict[str, Any]] = None
 
 
 class Movie(BaseModel):
@@ -18,9 +22,13 @@ class Movie(BaseModel):
     date: str
     image_url: Optional[str] = None
     description: Optional[str] = None
-    duration: Optional[str] = None  # In minutes
+    duration: Optional[int] = None  # In minutes
     genres: Optional[List[str]] = None
     rating: Optional[float] = None
+    director: Optional[str] = None
+    year: Optional[int] = None
+    url: Optional[str] = None  # Film page on the cinema website
+    city: Optional[str] = None
     showtimes: List[Showtime]
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,16 +1,134 @@
 """
 Repository module for database operations using Supabase
 """
+import asyncio
+import hashlib
+import json
+from dataclasses import replace
 from typing import List, Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from models.fields import ALL, ALL_MOVIE_FIELDS, FILM_FIELDS, MovieFields
 from models.supabase import get_client
-from models.movie import Movie, Showtime
+from monitoring.metrics import db_call
+from scraper.matching import normalize_title, strip_version_markers
+
+# Movie rows embed their film, so responses keep the flat movie shape
+MOVIE_SELECT = f"*, films({', '.join(FILM_FIELDS)})"
+
+
+def film_key(title: str) -> str:
+    """
+    Get the key identifying a film across dates, cinemas and scrapers
+
+    Spelling variants ("Dune - Parte Due", "DUNE: PARTE DUE (V.O.)") share
+    a key, so every scraper and worker resolves them to the same films row.
+
+    Args:
+        title (str): Movie title as scraped
+
+    Returns:
+        str: Normalized title (see scraper.matching.normalize_title)
+    """
+    return normalize_title(title) or title.strip().lower()
+
+
+def _metadata_hash(film: Dict[str, Any]) -> str:
+    """Hash the metadata fields of a film to detect changes"""
+    payload = json.dumps({f: film.get(f) for f in FILM_FIELDS},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _flatten_film(movie: Dict[str, Any], fields=FILM_FIELDS) -> Dict[str, Any]:
+    """Merge the embedded film metadata (the selected fields) into a movie row"""
+    film = movie.pop('films', None) or {}
+    for field in fields:
+        movie.setdefault(field, film.get(field))
+    return movie
+
+
+class FilmRepository:
+    """Repository for film metadata shared by the movie rows of every date"""
+
+    @staticmethod
+    @db_call
+    async def upsert_films(movies: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Store the metadata of scraped movies once per film
+
+        Stored films are only written when their metadata changed, compared
+        through a hash of the metadata fields. Fields a scrape did not
+        provide keep their stored values, and the stored title stays the
+        film's canonical title whatever spelling a later scrape uses.
+
+        Args:
+            movies (List[Dict[str, Any]]): Scraped movie data
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Film 'id' and canonical 'title' by film key
+        """
+        # supabase-py is blocking, keep the event loop free while it waits
+        return await asyncio.to_thread(FilmRepository._upsert_films, movies)
+
+    @staticmethod
+    def _upsert_films(movies: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Blocking implementation of upsert_films"""
+        if not movies:
+            return {}
+
+        client = get_client()
+        now = datetime.utcnow().isoformat()
+
+        scraped: Dict[str, Dict[str, Any]] = {}
+        for movie in movies:
+            # A new film is titled after the first spelling seen, without markers
+            film = scraped.setdefault(film_key(movie['title']),
+                                      {'title': strip_version_markers(movie['title'])})
+            film.update({f: movie[f] for f in FILM_FIELDS
+                         if f != 'title' and movie.get(f) is not None})
+
+        response = client.table('films').select('*').in_(
+            'key', list(scraped.keys())).execute()
+        stored = {row['key']: row for row in response.data}
+
+        films: Dict[str, Dict[str, Any]] = {}
+        updates = []
+        inserts = []
+        for key, metadata in scraped.items():
+            row = stored.get(key)
+            merged = {f: row.get(f) if row else None for f in FILM_FIELDS}
+            merged.update(metadata)
+            if row is not None:
+                merged['title'] = row['title']
+            digest = _metadata_hash(merged)
+
+            if row is None:
+                inserts.append({**merged, 'key': key, 'metadata_hash': digest,
+                                'updated_at': now})
+                continue
+
+            films[key] = {'id': row['id'], 'title': row['title']}
+            if digest != row.get('metadata_hash'):
+                updates.append({**merged, 'id': row['id'], 'key': key,
+                                'metadata_hash': digest, 'updated_at': now})
+
+        if updates:
+            client.table('films').upsert(updates).execute()
+        if inserts:
+            # Upserted on the unique key: another worker may store the same
+            # new film concurrently
+            for row in client.table('films').upsert(
+                    inserts, on_conflict='key').execute().data:
+                films[row['key']] = {'id': row['id'], 'title': row['title']}
+
+        return films
 
 
 class MovieRepository:
     """Repository for movie-related database operations"""
 
     @staticmethod
+    @db_call
     async def get_all_movies(date: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get all movies for a specific date
@@ -22,15 +140,77 @@ class MovieRepository:
             List[Dict[str, Any]]: List of movies
         """
         client = get_client()
-        query = client.table('movies').select('*')
+        query = client.table('movies').select(MOVIE_SELECT)
 
         if date:
             query = query.eq('date', date)
 
         response = query.order('title').execute()
-        return response.data
+        return [_flatten_film(movie) for movie in response.data]
 
     @staticmethod
+    @db_call
+    async def get_movies_with_showtimes(date: Optional[str] = None,
+                                        fields: MovieFields = ALL_MOVIE_FIELDS
+                                        ) -> List[Dict[str, Any]]:
+        """
+        Get the movies of a date with their showtimes, in one query
+
+        Showtimes are embedded in the movie rows, and only the columns of
+        the projection are read.
+
+        Args:
+            date (str, optional): Date in format YYYY-MM-DD. If None, all movies.
+            fields (MovieFields): Projection of the response (see models.fields)
+
+        Returns:
+            List[Dict[str, Any]]: Movies ordered by title, with 'showtimes'
+                                  when the projection includes them
+        """
+        client = get_client()
+        query = client.table('movies').select(fields.movie_select())
+
+        if date:
+            query = query.eq('date', date)
+
+        response = query.order('title').execute()
+        return [_flatten_film(movie, fields.film) for movie in response.data]
+
+    @staticmethod
+    @db_call
+    async def get_movies_for_range(start: str, end: str,
+                                   fields: MovieFields = ALL_MOVIE_FIELDS
+                                   ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get the movies of a date range with their showtimes, in one query
+
+        Args:
+            start (str): First date in format YYYY-MM-DD
+            end (str): Last date in format YYYY-MM-DD, included
+            fields (MovieFields): Projection of the response (see models.fields);
+                                  the date is always included
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: Movies ordered by title, by date,
+                                             with every date of the range
+        """
+        if fields.movie != ALL and 'date' not in fields.movie:
+            fields = replace(fields, movie=fields.movie + ('date',))
+
+        client = get_client()
+        response = client.table('movies').select(fields.movie_select()).gte(
+            'date', start).lte('date', end).order('date').order('title').execute()
+
+        first = datetime.strptime(start, '%Y-%m-%d')
+        days = (datetime.strptime(end, '%Y-%m-%d') - first).days + 1
+        by_date: Dict[str, List[Dict[str, Any]]] = {
+            (first + timedelta(days=i)).strftime('%Y-%m-%d'): [] for i in range(days)}
+        for movie in response.data:
+            by_date[movie['date']].append(_flatten_film(movie, fields.film))
+        return by_date
+
+    @staticmethod
+    @db_call
     async def get_movie_with_showtimes(movie_id: int) -> Dict[str, Any]:
         """
         Get a movie by ID including its showtimes
@@ -45,12 +225,12 @@ class MovieRepository:
 
         # Get movie details
         movie_response = client.table('movies').select(
-            '*').eq('id', movie_id).single().execute()
+            MOVIE_SELECT).eq('id', movie_id).single().execute()
 
         if not movie_response.data:
             return None
 
-        movie = movie_response.data
+        movie = _flatten_film(movie_response.data)
 
         # Get showtimes for this movie
         showtimes_response = client.table('showtimes').select(
@@ -60,6 +240,7 @@ class MovieRepository:
         return movie
 
     @staticmethod
+    @db_call
     async def insert_or_update_movie(movie: Dict[str, Any]) -> Dict[str, Any]:
         """
         Insert a new movie or update existing one
@@ -70,49 +251,152 @@ class MovieRepository:
         Returns:
             Dict[str, Any]: Created or updated movie
         """
-        client = get_client()
+        saved = await MovieRepository.insert_or_update_movies([movie])
+        return saved[0] if saved else None
 
-        # Check if movie exists
-        response = client.table('movies').select('id').eq(
-            'title', movie['title']).eq('date', movie['date']).execute()
+    @staticmethod
+    @db_call
+    async def insert_or_update_movies(movies: List[Dict[str, Any]],
+                                      replaced: Optional[Dict[tuple, set]] = None
+                                      ) -> List[Dict[str, Any]]:
+        """
+        Insert or update a batch of movies and replace their showtimes
 
-        if response.data:
-            # Update existing movie
-            movie_id = response.data[0]['id']
+        Metadata goes to the films table and is only rewritten when it
+        changed. Movie rows are the dated screenings of a film, so rows that
+        already exist need no write at all. Uses a constant number of
+        queries per date and theater in the batch. Showtimes are only
+        replaced for the theaters present in the batch.
 
-            # Remove showtimes from movie for update
-            showtimes = movie.pop('showtimes', [])
+        Args:
+            movies (List[Dict[str, Any]]): Movie data, each with a 'showtimes' list
+            replaced (Dict[tuple, set], optional): Showtimes already stored by
+                earlier batches of the same run, by (movie ID, theater). Those
+                are added to instead of replaced (see MovieWriter).
 
-            # Update movie
-            update_response = client.table('movies').update({
-                **movie,
-                'updated_at': datetime.utcnow().isoformat()
-            }).eq('id', movie_id).execute()
+        Returns:
+            List[Dict[str, Any]]: Stored movie rows (id, title, date, film_id)
+        """
+        # Runs in a worker thread: supabase-py calls block, and scrape
+        # producers need the event loop to keep queueing while a batch is stored
+        return await asyncio.to_thread(
+            MovieRepository._insert_or_update_movies, movies, replaced)
 
-            # Handle showtimes separately
-            await MovieRepository.update_showtimes(movie_id, showtimes)
+    @staticmethod
+    def _insert_or_update_movies(movies: List[Dict[str, Any]],
+                                 replaced: Optional[Dict[tuple, set]] = None
+                                 ) -> List[Dict[str, Any]]:
+        """Blocking implementation of insert_or_update_movies"""
+        if not movies:
+            return []
 
-            return update_response.data[0] if update_response.data else None
-        else:
-            # Insert new movie
-            # Remove showtimes from movie for insert
-            showtimes = movie.pop('showtimes', [])
+        client = get_client()
+        now = datetime.utcnow().isoformat()
+        films = FilmRepository._upsert_films(movies)
+
+        # Group the batch by date so existing rows can be looked up in one
+        # query. Movie rows are titled after their film, so spelling variants
+        # of a film on a date share one row and their showtimes.
+        by_date: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for movie in movies:
+            film = films[film_key(movie['title'])]
+            batch = by_date.setdefault(movie['date'], {})
+            entry = batch.setdefault(
+                film['title'], {'film_id': film['id'], 'showtimes': []})
+            entry['showtimes'].extend(movie.get('showtimes', []))
+
+        saved = []
+        showtimes_by_title: Dict[tuple, List[Dict[str, Any]]] = {}
+
+        for date, batch in by_date.items():
+            response = client.table('movies').select('id, title, date, film_id').eq(
+                'date', date).in_('title', list(batch.keys())).execute()
+            existing = {row['title']: row for row in response.data}
+
+            inserts = []
+            for title, movie in batch.items():
+                showtimes_by_title[(date, title)] = movie.get('showtimes', [])
+                if title in existing:
+                    saved.append(existing[title])
+                else:
+                    inserts.append({'title': title, 'date': date,
+                                    'film_id': movie['film_id'],
+                                    'updated_at': now})
+
+            if inserts:
+                saved.extend(client.table('movies').upsert(
+                    inserts, on_conflict='date,title').execute().data)
+
+        theater_ids = TheaterRepository._upsert_theaters([
+            s['theater_ref'] for showtimes in showtimes_by_title.values()
+            for s in showtimes if s.get('theater_ref')])
+
+        # Replace showtimes per theater, so movies stored by units covering
+        # other theaters (earlier in the run or in an interrupted run) keep
+        # theirs. Within a run, only the first batch of a movie and theater
+        # replaces; later batches add the showtimes not stored yet.
+        if replaced is None:
+            replaced = {}
+        showtimes_data = []
+        movie_ids_by_theater: Dict[Optional[str], set] = {}
+        for row in saved:
+            for s in showtimes_by_title.get((row['date'], row['title']), []):
+                scope = (row['id'], s.get('theater'))
+                if scope not in replaced:
+                    replaced[scope] = set()
+                    movie_ids_by_theater.setdefault(
+                        s.get('theater'), set()).add(row['id'])
+                identity = (str(s.get('time')), s.get('room'),
+                            bool(s.get('is_original_language')), bool(s.get('is_3d')))
+                if identity in replaced[scope]:
+                    continue
+                replaced[scope].add(identity)
+
+                showtime = {k: v for k, v in s.items() if k != 'theater_ref'}
+                ref = s.get('theater_ref')
+                if ref:
+                    showtime['theater_id'] = theater_ids.get(
+                        (ref['source'], ref['external_id']))
+                showtimes_data.append({**showtime, 'movie_id': row['id']})
+
+        for theater, movie_ids in movie_ids_by_theater.items():
+            query = client.table('showtimes').delete().in_(
+                'movie_id', list(movie_ids))
+            if theater is not None:
+                query = query.eq('theater', theater)
+            query.execute()
+
+        if showtimes_data:
+            client.table('showtimes').insert(showtimes_data).execute()
+
+        return saved
 
-            # Insert movie
-            insert_response = client.table('movies').insert({
-                **movie,
-                'created_at': datetime.utcnow().isoformat(),
-                'updated_at': datetime.utcnow().isoformat()
-            }).execute()
+    @staticmethod
+    @db_call
+    async def get_showtimes_for_date(date: str) -> List[Dict[str, Any]]:
+        """
+        Get every showtime of a date with its movie, in one query
+
+        Args:
+            date (str): Date in format YYYY-MM-DD
 
-            if insert_response.data:
-                movie_id = insert_response.data[0]['id']
-                # Handle showtimes separately
-                await MovieRepository.update_showtimes(movie_id, showtimes)
+        Returns:
+            List[Dict[str, Any]]: Showtimes ordered by start minute, each
+                                  with its flattened movie under 'movie'
+        """
+        client = get_client()
+        response = client.table('showtimes').select(
+            f"*, movies!inner({MOVIE_SELECT})").eq(
+            'movies.date', date).order('start_minute').execute()
 
-            return insert_response.data[0] if insert_response.data else None
+        showtimes = []
+        for showtime in response.data:
+            showtime['movie'] = _flatten_film(showtime.pop('movies'))
+            showtimes.append(showtime)
+        return showtimes
 
     @staticmethod
+    @db_call
     async def update_showtimes(movie_id: int, showtimes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Update showtimes for a movie
@@ -139,38 +423,269 @@ class MovieRepository:
         return []
 
 
+class MovieWriter:
+    """
+    Batch writer storing the movies of one scrape run
+
+    A film's showtimes at a theater can be split over several batches (batch
+    size, flush interval, or spelling variants merged into one film). The
+    first batch of the run replaces the stored showtimes; later batches add
+    to them instead of wiping what the earlier ones stored.
+    """
+
+    def __init__(self):
+        self._replaced: Dict[tuple, set] = {}
+
+    def reset(self) -> None:
+        """Start a new run: the next batch of each movie replaces its showtimes"""
+        self._replaced = {}
+
+    async def __call__(self, movies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await MovieRepository.insert_or_update_movies(movies, self._replaced)
+
+
+class FreshnessRepository:
+    """Repository for the per-date record of when showtimes were last scraped"""
+
+    @staticmethod
+    @db_call
+    async def get_refreshed_at(dates: List[str]) -> Dict[str, datetime]:
+        """
+        Get when the showtimes of dates were last scraped, in one query
+
+        Args:
+            dates (List[str]): Dates in format YYYY-MM-DD
+
+        Returns:
+            Dict[str, datetime]: Time of the last successful scrape (UTC) by
+                                 date, dates never scraped left out
+        """
+        client = get_client()
+        response = client.table('date_freshness').select(
+            'date, refreshed_at').in_('date', dates).execute()
+
+        refreshed = {}
+        for row in response.data:
+            refreshed_at = datetime.fromisoformat(row['refreshed_at'])
+            if refreshed_at.tzinfo is None:
+                refreshed_at = refreshed_at.replace(tzinfo=timezone.utc)
+            refreshed[row['date']] = refreshed_at
+        return refreshed
+
+    @staticmethod
+    @db_call
+    async def mark_refreshed(dates: List[str]) -> None:
+        """
+        Record that the showtimes of dates were just scraped
+
+        Args:
+            dates (List[str]): Dates in format YYYY-MM-DD
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [{'date': date, 'refreshed_at': now} for date in dates]
+
+        def upsert():
+            get_client().table('date_freshness').upsert(rows, on_conflict='date').execute()
+
+        if rows:
+            await asyncio.to_thread(upsert)
+
+
+class ScrapeRunRepository:
+    """Repository for the reports of scrape runs (see scraper.report)"""
+
+    # Columns of the run listing, the full report is only read per run
+    SUMMARY_COLUMNS = 'id, started_at, finished_at, dates, status, seconds, written, pages, errors'
+
+    @staticmethod
+    @db_call
+    async def save_run(run: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store the report of a finished run
+
+        Args:
+            run (Dict[str, Any]): scrape_runs row (see RunReport.to_row)
+
+        Returns:
+            Dict[str, Any]: Stored row, with its ID
+        """
+        def insert():
+            return get_client().table('scrape_runs').insert(run).execute().data
+
+        rows = await asyncio.to_thread(insert)
+        return rows[0] if rows else None
+
+    @staticmethod
+    @db_call
+    async def list_runs(limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Get the summaries of the latest runs, newest first
+
+        Args:
+            limit (int): Maximum number of runs
+
+        Returns:
+            List[Dict[str, Any]]: Runs without their per-scraper and per-unit report
+        """
+        client = get_client()
+        response = client.table('scrape_runs').select(
+            ScrapeRunRepository.SUMMARY_COLUMNS).order(
+            'started_at', desc=True).limit(limit).execute()
+        return response.data
+
+    @staticmethod
+    @db_call
+    async def get_run(run_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get the full report of a run
+
+        Args:
+            run_id (int): Run ID
+
+        Returns:
+            Optional[Dict[str, Any]]: Run with its report, None if not found
+        """
+        client = get_client()
+        response = client.table('scrape_runs').select('*').eq('id', run_id).execute()
+        return response.data[0] if response.data else None
+
+
 class TheaterRepository:
     """Repository for theater-related database operations"""
 
     @staticmethod
-    async def get_all_theaters() -> List[Dict[str, Any]]:
+    @db_call
+    async def get_all_theaters(columns: str = '*') -> List[Dict[str, Any]]:
         """
         Get all theaters
 
+        Args:
+            columns (str): Select clause (see models.fields.parse_theater_fields)
+
         Returns:
             List[Dict[str, Any]]: List of theaters
         """
         client = get_client()
-        response = client.table('theaters').select('*').order('name').execute()
+        response = client.table('theaters').select(columns).order('name').execute()
         return response.data
 
     @staticmethod
-    async def get_theater(theater_id: int) -> Dict[str, Any]:
+    @db_call
+    async def get_theater(theater_id: int, columns: str = '*') -> Dict[str, Any]:
         """
         Get a theater by ID
 
         Args:
             theater_id (int): Theater ID
+            columns (str): Select clause (see models.fields.parse_theater_fields)
 
         Returns:
             Dict[str, Any]: Theater data
         """
         client = get_client()
         response = client.table('theaters').select(
-            '*').eq('id', theater_id).single().execute()
+            columns).eq('id', theater_id).single().execute()
         return response.data
 
     @staticmethod
+    @db_call
+    async def get_theater_showtimes(theater_id: int, date: str,
+                                    fields: MovieFields = ALL_MOVIE_FIELDS
+                                    ) -> List[Dict[str, Any]]:
+        """
+        Get the movies showing at a theater on a date with their showtimes there
+
+        Answered by a single query on the showtimes of the theater, joined
+        with their movies and films.
+
+        Args:
+            theater_id (int): Theater ID
+            date (str): Date in format YYYY-MM-DD
+            fields (MovieFields): Projection of the response (see models.fields)
+
+        Returns:
+            List[Dict[str, Any]]: Movies ordered by title, each with the
+                                  theater's showtimes in cinema-day order
+                                  (shows past midnight last)
+        """
+        client = get_client()
+        response = client.table('showtimes').select(fields.showtime_select()).eq(
+            'theater_id', theater_id).eq('movies.date', date).order('start_minute').execute()
+
+        movies: Dict[int, Dict[str, Any]] = {}
+        for showtime in response.data:
+            movie = showtime.pop('movies')
+            if movie['id'] not in movies:
+                movies[movie['id']] = _flatten_film(movie, fields.film)
+                if fields.showtimes is not None:
+                    movies[movie['id']]['showtimes'] = []
+            if fields.showtimes is not None:
+                movies[movie['id']]['showtimes'].append(showtime)
+
+        return sorted(movies.values(), key=lambda movie: movie.get('title') or '')
+
+    @staticmethod
+    @db_call
+    async def upsert_theaters(theaters: List[Dict[str, Any]]) -> Dict[tuple, int]:
+        """
+        Insert or update a batch of scraped theaters
+
+        Theaters are keyed by (source, external_id). Stored theaters are only
+        written when a scraped field differs, so unchanged theaters cost a
+        single lookup query per source.
+
+        Args:
+            theaters (List[Dict[str, Any]]): Theater data, as built by
+                                             BaseScraper.theater_ref
+
+        Returns:
+            Dict[tuple, int]: Theater IDs by (source, external_id)
+        """
+        return await asyncio.to_thread(TheaterRepository._upsert_theaters, theaters)
+
+    @staticmethod
+    def _upsert_theaters(theaters: List[Dict[str, Any]]) -> Dict[tuple, int]:
+        """Blocking implementation of upsert_theaters"""
+        by_source: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for theater in theaters:
+            by_source.setdefault(theater['source'], {})[theater['external_id']] = theater
+
+        if not by_source:
+            return {}
+
+        client = get_client()
+        now = datetime.utcnow().isoformat()
+        theater_ids: Dict[tuple, int] = {}
+
+        for source, batch in by_source.items():
+            response = client.table('theaters').select('*').eq('source', source).in_(
+                'external_id', list(batch.keys())).execute()
+            stored = {row['external_id']: row for row in response.data}
+
+            updates = []
+            inserts = []
+            for external_id, theater in batch.items():
+                row = stored.get(external_id)
+                fields = {k: v for k, v in theater.items() if v is not None}
+                if row is None:
+                    inserts.append({**theater, 'updated_at': now})
+                    continue
+
+                theater_ids[(source, external_id)] = row['id']
+                if any(row.get(k) != v for k, v in fields.items()):
+                    updates.append({**row, **fields, 'updated_at': now})
+
+            if updates:
+                client.table('theaters').upsert(updates).execute()
+            if inserts:
+                for row in client.table('theaters').upsert(
+                        inserts, on_conflict='source,external_id').execute().data:
+                    theater_ids[(source, row['external_id'])] = row['id']
+
+        return theater_ids
+
+    @staticmethod
+    @db_call
     async def insert_or_update_theater(theater: Dict[str, Any]) -> Dict[str, Any]:
         """
         Insert a new theater or update existing one
@@ -1,8 +1,9 @@
-from supabase import create_client, Client
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 import os
 from dotenv import load_dotenv
 
+from models.migrations import MIGRATIONS, latest_version, migration_sql
+
 # Load environment variables
 load_dotenv()
 
@@ -10,11 +11,14 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 # Initialize Supabase client
-_client: Optional[Client] = None
+_client: Optional["Client"] = None
 
 
-def get_client() -> Client:
+def get_client() -> "Client":
     """
     Get or create Supabase client instance
     Returns:
@@ -25,70 +29,60 @@ def get_client() -> Client:
         if not SUPABASE_URL or not SUPABASE_KEY:
             raise ValueError(
                 "SUPABASE_URL and SUPABASE_KEY environment variables must be set")
+        # Imported on first use: the supabase SDK is heavy to import
+        from supabase import create_client
         _client = create_client(SUPABASE_URL, SUPABASE_KEY)
     return _client
 
 
-# SQL for creating tables
-CREATE_MOVIES_TABLE = """
-CREATE TABLE IF NOT EXISTS movies (
-    id SERIAL PRIMARY KEY,
-    title TEXT NOT NULL,
-    original_title TEXT,
-    date DATE NOT NULL,
-    image_url TEXT,
-    description TEXT,
-    duration INTEGER,
-    genres TEXT[],
-    rating FLOAT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
-"""
-
-CREATE_SHOWTIMES_TABLE = """
-CREATE TABLE IF NOT EXISTS showtimes (
-    id SERIAL PRIMARY KEY,
-    movie_id INTEGER REFERENCES movies(id) ON DELETE CASCADE,
-    time TIME NOT NULL,
-    theater TEXT NOT NULL,
-    room TEXT,
-    is_original_language BOOLEAN DEFAULT false,
-    is_3d BOOLEAN DEFAULT false,
-    booking_url TEXT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
-"""
-
-CREATE_THEATERS_TABLE = """
-CREATE TABLE IF NOT EXISTS theaters (
-    id SERIAL PRIMARY KEY,
-    name TEXT NOT NULL,
-    address TEXT,
-    city TEXT NOT NULL,
-    website TEXT,
-    phone TEXT,
-    features TEXT[],
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
-"""
+def set_client(client) -> None:
+    """
+    Use another database client than Supabase, e.g. models.memory.MemoryClient
+
+    Args:
+        client: Object with the query builder interface of the Supabase client
+    """
+    global _client
+    _client = client
 
 
 async def init_database():
-    """Initialize database tables"""
+    """
+    Check that the database schema is up to date
+
+    The Supabase client cannot run DDL, so pending migrations are printed
+    for the SQL editor; alternatively run `python -m models.migrations`
+    with the database connection string in DATABASE_URL.
+    """
     client = get_client()
 
     try:
-        # Test connection by accessing movies table
-        response = client.table('movies').select('id').limit(1).execute()
-        print("Database tables already exist")
+        response = client.table('schema_migrations').select('version').execute()
+        applied = {row['version'] for row in response.data}
     except Exception as e:
-        print(f"Error accessing tables: {e}")
-        print("Creating tables via Supabase dashboard is required.")
-        print("Please copy the following SQL and run it in the Supabase SQL editor:")
-        print("\n--- SQL to create tables ---")
-        print(CREATE_MOVIES_TABLE)
-        print(CREATE_SHOWTIMES_TABLE)
-        print(CREATE_THEATERS_TABLE)
-        print("----------------------------")
+        print(f"Error accessing schema_migrations: {e}")
+        applied = set()
+
+    pending = [migration for migration in MIGRATIONS if migration.version not in applied]
+    if not pending:
+        print(f"Database schema is up to date (version {max(applied, default=0)})")
+        return
+
+    print(f"Database schema is missing versions {', '.join(str(m.version) for m in pending)}, "
+          f"latest is {latest_version()}")
+    print("Run `python -m models.migrations` with DATABASE_URL set, or copy the")
+    print("following SQL and run it in the Supabase SQL editor:")
+    print("\n--- SQL to migrate the schema ---")
+    print(migration_sql(versions={migration.version for migration in pending}))
+    print("-- Record the applied versions")
+    for migration in pending:
+        # Data steps only run through the migration runner, so these stay pending
+        if not migration.data:
+            print(f"INSERT INTO schema_migrations (version, name) "
+                  f"VALUES ({migration.version}, '{migration.name}');")
+    print("---------------------------------")
+    data_steps = [migration for migration in pending if migration.data]
+    if data_steps:
+        print(f"Migrations {', '.join(str(m.version) for m in data_steps)} rewrite data and "
+              f"cannot run in the SQL editor: run `python -m models.migrations` with "
+              f"DATABASE_URL set to apply them")
@@ -0,0 +1,66 @@
+"""
+Per-request accounting of repository calls
+
+The API wraps each request in track_db_calls(); every repository call made
+while handling it (see metrics.db_call) adds to the request's CallStats
+through a context variable, so N+1 query patterns show up per request.
+A repository method calling another one counts once.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+
+@dataclass
+class CallStats:
+    """
+    Repository calls made while handling a request
+
+    Attributes:
+        count (int): Number of calls
+        seconds (float): Total duration of the calls; concurrent calls add up
+    """
+    count: int = 0
+    seconds: float = 0.0
+
+
+_stats: ContextVar[Optional[CallStats]] = ContextVar("db_call_stats", default=None)
+_inside_call: ContextVar[bool] = ContextVar("db_call_inside", default=False)
+
+
+@contextmanager
+def track_db_calls() -> Iterator[CallStats]:
+    """
+    Account the repository calls made in a with block, and in the tasks it starts
+
+    Yields:
+        CallStats: Calls so far, updated as they complete
+    """
+    stats = CallStats()
+    token = _stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _stats.reset(token)
+
+
+@contextmanager
+def db_call_scope() -> Iterator[None]:
+    """Account a repository call to the request being tracked, if any"""
+    if _inside_call.get():
+        # Called by another repository method, which is the one accounted
+        yield
+        return
+
+    token = _inside_call.set(True)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _inside_call.reset(token)
+        stats = _stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += time.perf_counter() - started
@@ -0,0 +1,99 @@
+"""
+Detection of code blocking the event loop
+
+A heartbeat callback is scheduled on the loop every `interval` seconds and
+a watchdog thread checks that it keeps running. When the loop has not run
+it for longer than `threshold`, something is blocking it (a synchronous
+call inside a coroutine, CPU-heavy work) and the watchdog logs the stack of
+the loop thread at that moment, which points at the culprit.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from monitoring.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "movieobserver_event_loop_lag_seconds",
+    "Delay of scheduled callbacks on the API event loop",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+EVENT_LOOP_STALLS = Counter(
+    "movieobserver_event_loop_stalls_total",
+    "Times the API event loop was blocked longer than the stall threshold")
+
+
+class LoopLagMonitor:
+    """
+    Watchdog logging the stack of whatever blocks an event loop
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: Optional[float] = None):
+        """
+        Args:
+            threshold (float): Seconds the loop may be blocked before the
+                               stack is logged
+            interval (float, optional): Seconds between heartbeats, defaults
+                                        to half the threshold
+        """
+        self.threshold = threshold
+        self.interval = interval if interval is not None else threshold / 2
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id: Optional[int] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        # Monotonic time the heartbeat last ran, and when it is due next
+        self._beat = 0.0
+        self._due = 0.0
+
+    def start(self) -> None:
+        """Start monitoring the running loop; call from a coroutine on it"""
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._beat = self._due = time.monotonic()
+        self._handle = self._loop.call_soon(self._heartbeat)
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-lag-monitor", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        """Stop monitoring"""
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def _heartbeat(self) -> None:
+        """Record the loop's lag and schedule the next heartbeat"""
+        now = time.monotonic()
+        EVENT_LOOP_LAG_SECONDS.observe(max(0.0, now - self._due))
+        self._beat = now
+        self._due = now + self.interval
+        if not self._stopped.is_set():
+            self._handle = self._loop.call_later(self.interval, self._heartbeat)
+
+    def _watch(self) -> None:
+        """Watchdog thread: log the loop thread's stack when it stalls"""
+        reported = None
+        while not self._stopped.wait(self.interval):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            # One report per stall, taken while the loop is still blocked
+            if blocked <= self.threshold or beat == reported:
+                continue
+            reported = beat
+            EVENT_LOOP_STALLS.inc()
+            frame = sys._current_frames().get(self._thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            logger.warning(
+                f"Event loop blocked for more than {blocked * 1000:.0f} ms, at:\n{stack}")
@@ -0,0 +1,322 @@
+"""
+Process metrics in the Prometheus text format, served by GET /metrics
+
+A minimal counter/gauge/histogram implementation instead of the
+prometheus_client dependency: metrics are updated from scraper threads and
+the event loop alike, so every update takes the metric's lock. Each
+process (API, scraper worker) exposes its own values.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from monitoring.accounting import db_call_scope
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; request and query latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds; page loads, which take up to the scraper timeout
+PAGE_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text format"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, integers without a decimal part"""
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Registry:
+    """
+    Collection of metrics rendered together
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, "Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric") -> None:
+        """
+        Add a metric
+
+        Raises:
+            ValueError: If a metric with the same name is registered
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    rendered = ",".join(f'{key}="{_escape(str(label))}"'
+                                        for key, label in labels.items())
+                    name = f"{name}{{{rendered}}}"
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    """
+    Base of the metric types, one value (or histogram) per label combination
+    """
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY):
+        """
+        Args:
+            name (str): Metric name
+            documentation (str): HELP text
+            labelnames (Sequence[str]): Names of the labels every update sets
+            registry (Registry, optional): Registry to add the metric to,
+                                           None for an unregistered metric
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        """
+        Get the label values of an update in label name order
+
+        Raises:
+            ValueError: If the labels differ from the metric's label names
+        """
+        if len(labels) != len(self.labelnames) or any(name not in labels for name in self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {list(self.labelnames)}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> List[Sample]:
+        """Get the (name, labels, value) samples of the metric"""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing total
+    """
+    type = "counter"
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """
+        Increase the counter
+
+        Raises:
+            ValueError: If amount is negative
+        """
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        """Get the current total of a label combination"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """
+    Value that goes up and down
+    """
+    type = "gauge"
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        """Set the gauge"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """Increase the gauge, decrease it with a negative amount"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        """Get the current value of a label combination"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values over cumulative buckets
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 registry: Optional[Registry] = REGISTRY):
+        """
+        Args:
+            buckets (Sequence[float]): Upper bounds of the buckets, +Inf is implied
+            See Metric for the other arguments
+        """
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # Per label combination: count per bucket (+Inf last), sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """Record a value"""
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    break
+            else:
+                index = len(self.buckets)
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the duration of a with block, in seconds, even if it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: Any) -> int:
+        """Get the number of observations of a label combination"""
+        with self._lock:
+            values = self._values.get(self._key(labels))
+            return sum(values[0]) if values else 0
+
+    def samples(self) -> List[Sample]:
+        samples: List[Sample] = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                labels = self._labels(key)
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket",
+                                    {**labels, "le": _format_value(bound)}, cumulative))
+                samples.append((f"{self.name}_sum", labels, total[0]))
+                samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+def timed(histogram: Histogram, **labels: Any) -> Callable:
+    """Decorate a coroutine function to observe the duration of each call"""
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, **labels)
+        return wrapper
+    return decorate
+
+
+# Scraping: where the time of a unit goes
+SCRAPE_FETCH_SECONDS = Histogram(
+    "movieobserver_scrape_fetch_seconds",
+    "HTTP page fetch latency, excluding rate limiting",
+    ["scraper"], buckets=PAGE_BUCKETS)
+SCRAPE_RENDER_SECONDS = Histogram(
+    "movieobserver_scrape_render_seconds",
+    "Selenium page load and render time, excluding rate limiting",
+    ["scraper"], buckets=PAGE_BUCKETS)
+SCRAPE_PARSE_SECONDS = Histogram(
+    "movieobserver_scrape_parse_seconds",
+    "Time spent parsing a page into movies",
+    ["scraper"])
+SCRAPE_PAGES = Counter(
+    "movieobserver_scrape_pages_total",
+    "Pages loaded, by method (http or selenium) and outcome (ok or error)",
+    ["scraper", "method", "outcome"])
+SCRAPED_MOVIES = Counter(
+    "movieobserver_scraped_movies_total",
+    "Movies produced by the scrapers",
+    ["scraper"])
+SCRAPED_SHOWTIMES = Counter(
+    "movieobserver_scraped_showtimes_total",
+    "Showtimes produced by the scrapers",
+    ["scraper"])
+SCRAPE_QUEUE_DEPTH = Gauge(
+    "movieobserver_scrape_queue_depth",
+    "Items waiting in the pipeline queue between the scrapers and the writer")
+DRIVER_POOL_DRIVERS = Gauge(
+    "movieobserver_driver_pool_drivers",
+    "WebDriver instances of the scrapers' pools, by state (busy or idle)",
+    ["scraper", "state"])
+
+# Storage and API
+DB_CALL_SECONDS = Histogram(
+    "movieobserver_db_call_seconds",
+    "Latency of repository methods",
+    ["method"])
+HTTP_REQUEST_SECONDS = Histogram(
+    "movieobserver_http_request_seconds",
+    "API request latency, by route template",
+    ["method", "route", "status"])
+
+
+def db_call(func: Callable) -> Callable:
+    """
+    Decorate an async repository method to time it as Class.method
+
+    The call is also accounted to the API request making it, see
+    accounting.track_db_calls().
+    """
+    method = func.__qualname__
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with db_call_scope(), DB_CALL_SECONDS.time(method=method):
+            return await func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,201 @@
+"""
+Opt-in profiling of scrape runs and API requests
+
+Two profilers are available:
+
+- "sample": a thread samples the stacks of every thread every few
+  milliseconds. Low overhead and it sees the scraper threads; stacks are
+  written as folded stacks (`<name>.folded`), the input of flamegraph.pl,
+  speedscope and inferno, plus one file per stage (`<name>.<stage>.folded`)
+  when stages are given.
+- "cprofile": the deterministic profiler of the standard library, which
+  only sees the thread that started it (the event loop). Written as
+  `<name>.prof`, for snakeviz, flameprof or pstats.
+
+Nothing is profiled unless enabled through the environment or a CLI flag,
+see ScraperService and api/profiling.py.
+"""
+import cProfile
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ("sample", "cprofile")
+
+# Seconds between stack samples
+DEFAULT_INTERVAL = 0.005
+
+# Stages of a scrape run, by the function of the stack that identifies them
+# (the frame nearest to the leaf wins)
+SCRAPE_STAGES = {
+    "_produce": "scrape",
+    "get_page_content": "fetch",
+    "get_page_with_selenium": "render",
+    "get_film_details": "enrich",
+    "_consume": "write",
+    "_insert_or_update_movies": "store",
+    "_upsert_films": "store",
+}
+
+
+def _frame_label(frame) -> str:
+    """Name a frame as `function (file.py:line)`, the line of the function"""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the stacks of all threads
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL,
+                 stages: Optional[Dict[str, str]] = None,
+                 thread_ids: Optional[List[int]] = None):
+        """
+        Args:
+            interval (float): Seconds between samples
+            stages (Dict[str, str], optional): Stage names by the function
+                                               name identifying them
+            thread_ids (List[int], optional): Only sample these threads
+        """
+        self.interval = interval
+        self.stages = stages or {}
+        self.thread_ids = thread_ids
+        # Sample counts by stage, then by folded stack
+        self.samples: Dict[str, Counter] = {}
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                self._record(names.get(thread_id, "thread"), frame)
+
+    def _record(self, thread_name: str, frame) -> None:
+        """Add the sample of a thread's stack"""
+        labels = []
+        stage = "other"
+        staged = False
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            if not staged and frame.f_code.co_name in self.stages:
+                stage = self.stages[frame.f_code.co_name]
+                staged = True
+            frame = frame.f_back
+        # Pool threads (asyncio_0, asyncio_1...) are merged into one root
+        root = re.sub(r"_\d+$", "", thread_name)
+        stack = ";".join([root] + labels[::-1])
+        self.samples.setdefault(stage, Counter())[stack] += 1
+
+    def folded(self, stage: Optional[str] = None) -> str:
+        """
+        Render samples as folded stacks, one `frame;frame;... count` per line
+
+        Args:
+            stage (str, optional): Only the samples of this stage
+
+        Returns:
+            str: Folded stacks
+        """
+        counts: Counter = Counter()
+        for name, stacks in self.samples.items():
+            if stage is None or name == stage:
+                counts.update(stacks)
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+
+    def write(self, directory: str, name: str) -> List[str]:
+        """
+        Write the folded stacks of the run and of each stage
+
+        Returns:
+            List[str]: Paths of the written files
+        """
+        paths = [os.path.join(directory, f"{name}.folded")]
+        with open(paths[0], "w") as f:
+            f.write(self.folded())
+        if self.stages:
+            for stage in sorted(self.samples):
+                paths.append(os.path.join(directory, f"{name}.{stage}.folded"))
+                with open(paths[-1], "w") as f:
+                    f.write(self.folded(stage))
+        return paths
+
+
+@contextmanager
+def profile(directory: str, name: str, profiler: str = "sample",
+            stages: Optional[Dict[str, str]] = None,
+            thread_ids: Optional[List[int]] = None) -> Iterator[None]:
+    """
+    Profile a with block and write the artifacts to a directory
+
+    Artifacts are named after `name` and the start time, so runs do not
+    overwrite each other. A profiler failing to write never fails the block.
+
+    Args:
+        directory (str): Output directory, created if needed
+        name (str): Artifact name prefix, e.g. "scrape-2024-05-01"
+        profiler (str): "sample" or "cprofile"
+        stages (Dict[str, str], optional): Stages of the sampling profiler
+        thread_ids (List[int], optional): Threads sampled by the sampling
+                                          profiler, all by default
+
+    Raises:
+        ValueError: If the profiler is unknown
+    """
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler: {profiler} (expected one of {', '.join(PROFILERS)})")
+
+    name = f"{name}-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}"
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+    started = time.perf_counter()
+    if profiler == "cprofile":
+        sampler = None
+        deterministic = cProfile.Profile()
+        deterministic.enable()
+    else:
+        deterministic = None
+        sampler = SamplingProfiler(stages=stages, thread_ids=thread_ids)
+        sampler.start()
+
+    try:
+        yield
+    finally:
+        if deterministic is not None:
+            deterministic.disable()
+        else:
+            sampler.stop()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            if deterministic is not None:
+                paths = [os.path.join(directory, f"{name}.prof")]
+                deterministic.dump_stats(paths[0])
+            else:
+                paths = sampler.write(directory, name)
+            logger.info(f"Profiled {name} ({time.perf_counter() - started:.1f} s): {', '.join(paths)}")
+        except OSError as e:
+            logger.error(f"Error writing profile {name} to {directory}: {e}")
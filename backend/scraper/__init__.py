@@ -1,7 +1,20 @@
-from .spaziocinema_scraper import SpaziocinemaInfoScraper
-from .uci_cinemas_scraper import UCICinemasScraper
+import importlib
 
 __all__ = [
     "SpaziocinemaInfoScraper",
     "UCICinemasScraper"
 ]
+
+# Scraper modules pull in BeautifulSoup and Selenium helpers, so they are only
+# imported when one of the exported classes is first accessed
+_LAZY_IMPORTS = {
+    "SpaziocinemaInfoScraper": ".spaziocinema_scraper",
+    "UCICinemasScraper": ".uci_cinemas_scraper",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
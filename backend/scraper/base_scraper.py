@@ -1,29 +1,154 @@
 import logging
+import threading
+import time
 from abc import ABC, abstractmethod
-from bs4 import BeautifulSoup
+from contextlib import contextmanager
 import requests
 import os
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.firefox.service import Service as FirefoxService
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.firefox import GeckoDriverManager
-from datetime import datetime
-from typing import List, Dict, Any, Optional
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from typing import List, Dict, Any, Callable, Iterator, Optional
+
+from monitoring.metrics import (DRIVER_POOL_DRIVERS, SCRAPE_FETCH_SECONDS, SCRAPE_PAGES,
+                                SCRAPE_PARSE_SECONDS, SCRAPE_RENDER_SECONDS)
+from scraper import report
+from scraper.records import ScrapedMovie
+from scraper.units import ScrapeUnit
+
+# Selenium and webdriver_manager are imported inside _get_selenium_driver so
+# that importing a scraper module stays cheap until a browser is needed.
+# Logging and .env loading are configured by the entry points, not here.
 logger = logging.getLogger(__name__)
 
+_STAGE_HISTOGRAMS = {
+    "fetch": SCRAPE_FETCH_SECONDS,
+    "render": SCRAPE_RENDER_SECONDS,
+    "parse": SCRAPE_PARSE_SECONDS,
+}
+
+
+class ScrapeError(Exception):
+    """
+    A page needed by a scrape could not be fetched
+
+    Raised out of scrape_unit (or list_units) so the unit is reported as
+    failed and retried, instead of being recorded as a cinema with no movies.
+    """
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing out requests to a single site
+    """
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self) -> None:
+        """Block until the next request slot is available"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class DriverPool:
+    """
+    Thread-safe pool of reusable WebDriver instances
+
+    Starting a browser costs far more than loading a page, so units running
+    in parallel borrow drivers from the pool instead of launching one per
+    page. At most `size` drivers exist at a time; borrowers block when all
+    of them are in use. Drivers still borrowed when the pool is closed are
+    quit when they are returned.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = 1, name: str = ""):
+        """
+        Args:
+            factory (Callable[[], Any]): Creates a new driver
+            size (int): Maximum number of drivers
+            name (str): Scraper name the pool is reported under in metrics
+        """
+        self.factory = factory
+        self.size = max(1, size)
+        self.name = name
+        self._idle: List[Any] = []
+        self._created = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def driver(self) -> Iterator[Any]:
+        """
+        Borrow a driver for the duration of a with block
+
+        A driver whose block raised is quit instead of returned, since the
+        browser may be left in a broken state.
+
+        Yields:
+            WebDriver: Driver reserved for the caller
+        """
+        with self._condition:
+            while not self._idle and self._created >= self.size:
+                self._condition.wait()
+            if self._idle:
+                driver = self._idle.pop()
+            else:
+                driver = None
+                self._created += 1
+            self._report()
+
+        if driver is None:
+            try:
+                driver = self.factory()
+            except Exception:
+                self._discard(None)
+                raise
+
+        try:
+            yield driver
+        except BaseException:
+            self._discard(driver)
+            raise
+        with self._condition:
+            if not self._closed:
+                self._idle.append(driver)
+                self._condition.notify()
+                self._report()
+                return
+        # Returned after close(), nobody will borrow it again
+        self._discard(driver)
+
+    def _discard(self, driver: Any) -> None:
+        """Quit a driver and free its slot"""
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.warning(f"Error quitting WebDriver: {e}")
+        with self._condition:
+            self._created -= 1
+            self._condition.notify()
+            self._report()
+
+    def _report(self) -> None:
+        """Update the pool gauges, called with the condition held"""
+        idle = len(self._idle)
+        DRIVER_POOL_DRIVERS.set(idle, scraper=self.name, state="idle")
+        DRIVER_POOL_DRIVERS.set(self._created - idle, scraper=self.name, state="busy")
+
+    def close(self) -> None:
+        """Quit the idle drivers, and borrowed ones once they are returned"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._report()
+        for driver in idle:
+            self._discard(driver)
+
 
 class BaseScraper(ABC):
     """
@@ -35,6 +160,107 @@ class BaseScraper(ABC):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        # Budgets, overridden by the registry from the scraper configuration
+        self.name = self.__class__.__name__
+        self.concurrency = 1
+        self.timeout = 30.0
+        self.rate_limiter: Optional[RateLimiter] = None
+        # Browsers and HTTP connections shared by the units of this scraper
+        self._driver_pool: Optional[DriverPool] = None
+        self._pool_lock = threading.Lock()
+        self.session = self._create_session()
+
+    def configure(self, name: str, concurrency: int = 1, timeout: float = 30.0,
+                  requests_per_minute: Optional[float] = None) -> None:
+        """
+        Apply per-scraper budgets
+
+        Args:
+            name (str): Registry name of the scraper
+            concurrency (int): Maximum number of units scraped in parallel
+            timeout (float): Timeout in seconds for a single page fetch
+            requests_per_minute (float, optional): Rate limit for this site
+        """
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(
+            requests_per_minute) if requests_per_minute else None
+        self.close()
+        self.session = self._create_session()
+
+    def _create_session(self) -> requests.Session:
+        """Create an HTTP session keeping a connection per concurrent unit"""
+        session = requests.Session()
+        session.headers.update(self.headers)
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def driver(self):
+        """
+        Borrow a pooled WebDriver, e.g. `with self.driver() as driver:`
+
+        The pool holds up to `concurrency` browsers, reused across units
+        and dates until close() is called.
+        """
+        with self._pool_lock:
+            if self._driver_pool is None:
+                self._driver_pool = DriverPool(
+                    self._get_selenium_driver, self.concurrency, self.name)
+        return self._driver_pool.driver()
+
+    def close(self) -> None:
+        """Quit pooled browsers and close HTTP connections"""
+        with self._pool_lock:
+            pool, self._driver_pool = self._driver_pool, None
+        if pool:
+            pool.close()
+        self.session.close()
+
+    def throttle(self) -> None:
+        """Wait for the rate limiter before hitting the site"""
+        if self.rate_limiter:
+            self.rate_limiter.wait()
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        """
+        Account time spent loading or parsing a page
+
+        Goes to the scraper's metrics and to the report of the unit being
+        scraped (see scraper.report).
+
+        Args:
+            stage (str): "fetch" (HTTP), "render" (Selenium) or "parse"
+            seconds (float): Time spent, rate limiting excluded
+        """
+        _STAGE_HISTOGRAMS[stage].observe(seconds, scraper=self.name)
+        report.record(stage, seconds)
+
+    @contextmanager
+    def timed_stage(self, stage: str) -> Iterator[None]:
+        """Record the duration of a with block as a stage, see record_stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, time.perf_counter() - started)
+
+    def record_page(self, method: str, content: Optional[str]) -> None:
+        """
+        Count a page load in the metrics and the unit report
+
+        Args:
+            method (str): "http" or "selenium"
+            content (str, optional): Page loaded, None if loading failed;
+                                     its size is counted in characters, which
+                                     spares encoding every page again
+        """
+        SCRAPE_PAGES.inc(scraper=self.name, method=method,
+                         outcome="error" if content is None else "ok")
+        size = len(content) if content is not None else 0
+        report.record(pages=1, size=size, errors=content is None)
 
     @abstractmethod
     def get_movies_for_date(self, date: str) -> List[Dict[str, Any]]:
@@ -49,6 +275,92 @@ class BaseScraper(ABC):
         """
         pass
 
+    def iter_movies_for_date(self, date: str) -> Iterator[ScrapedMovie]:
+        """
+        Yield movies for a specific date as soon as they are parsed
+
+        Scrapers that fetch several pages per date should override this so
+        that movies reach the storage stage page by page instead of after
+        the whole date has been scraped.
+
+        Args:
+            date (str): Date in format YYYY-MM-DD
+
+        Yields:
+            ScrapedMovie: MovieRecord, or movie dict for older scrapers
+        """
+        yield from self.get_movies_for_date(date)
+
+    def list_units(self, date: str) -> List[ScrapeUnit]:
+        """
+        Split the work for a date into independently scrapable units
+
+        The default is a single unit covering the whole site. Scrapers that
+        visit one page per cinema should return one unit per cinema.
+
+        Args:
+            date (str): Date in format YYYY-MM-DD
+
+        Returns:
+            List[ScrapeUnit]: Units to scrape
+        """
+        return [ScrapeUnit(scraper=self.name, date=date)]
+
+    def scrape_unit(self, unit: ScrapeUnit) -> Iterator[ScrapedMovie]:
+        """
+        Yield the movies of a single unit
+
+        Args:
+            unit (ScrapeUnit): Unit returned by list_units
+
+        Yields:
+            ScrapedMovie: MovieRecord, or movie dict for older scrapers
+        """
+        yield from self.iter_movies_for_date(unit.date)
+
+    def get_film_details(self, url: str) -> Dict[str, Any]:
+        """
+        Get details of a film from its page on the site
+
+        Called by the pipeline's enrichment stage for movies with a 'url',
+        at most once per URL while the cached details are fresh. The
+        default provides no details.
+
+        Args:
+            url (str): Film page URL
+
+        Returns:
+            Dict[str, Any]: Any of original_title, duration, genres, director, year
+        """
+        return {}
+
+    def theater_ref(self, external_id: str, name: str, city: Optional[str] = None,
+                    address: Optional[str] = None,
+                    website: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Describe a theater so the writer can upsert it and link showtimes to it
+
+        Attach the result to each showtime as 'theater_ref'.
+
+        Args:
+            external_id (str): Stable identifier of the theater on the site
+            name (str): Theater name
+            city (str, optional): City of the theater
+            address (str, optional): Street address
+            website (str, optional): Theater page URL
+
+        Returns:
+            Dict[str, Any]: Theater data keyed by (source, external_id)
+        """
+        return {
+            "source": self.name,
+            "external_id": external_id,
+            "name": name,
+            "city": city,
+            "address": address,
+            "website": website,
+        }
+
     def get_page_content(self, url: str) -> Optional[str]:
         """
         Get the HTML content of a page
@@ -60,13 +372,18 @@ class BaseScraper(ABC):
             Optional[str]: HTML content or None if request failed
         """
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.text
+            self.throttle()
+            with self.timed_stage("fetch"):
+                response = self.session.get(url, timeout=self.timeout)
+                response.raise_for_status()
+                text = response.text
         except requests.RequestException as e:
+            self.record_page("http", None)
             logger.error(f"Error fetching {url}: {e}")
             return None
-            
+        self.record_page("http", text)
+        return text
+
     def get_page_with_selenium(self, url: str) -> Optional[str]:
         """
         Get the HTML content of a page using Selenium (for JavaScript-rendered content)
@@ -78,46 +395,66 @@ class BaseScraper(ABC):
             Optional[str]: HTML content or None if request failed
         """
         try:
-            # Check which WebDriver to use based on env settings
-            firefox_driver_path = os.getenv('FIREFOX_DRIVER_PATH')
-            chrome_driver_path = os.getenv('CHROME_DRIVER_PATH')
-            
-            if firefox_driver_path is not None:
-                # Use Firefox WebDriver
-                firefox_options = FirefoxOptions()
-                firefox_options.add_argument("--headless")
-                
-                if firefox_driver_path.lower() == 'none':
-                    service = FirefoxService(GeckoDriverManager().install())
-                else:
-                    service = FirefoxService(firefox_driver_path)
-                
-                logger.info("Using Firefox WebDriver")
-                driver = webdriver.Firefox(service=service, options=firefox_options)
-            else:
-                # Use Chrome WebDriver as fallback
-                chrome_options = ChromeOptions()
-                chrome_options.add_argument("--headless")
-                chrome_options.add_argument("--no-sandbox")
-                chrome_options.add_argument("--disable-dev-shm-usage")
-                
-                if chrome_driver_path:
-                    service = ChromeService(chrome_driver_path)
-                else:
-                    service = ChromeService(ChromeDriverManager().install())
-                
-                logger.info("Using Chrome WebDriver")
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-
-            logger.info(f"Fetching page with Selenium: {url}")
-            driver.get(url)
-            # Wait for dynamic content to load
-            driver.implicitly_wait(10)
-
-            page_source = driver.page_source
-            driver.quit()
-
-            return page_source
+            with self.driver() as driver:
+                logger.info(f"Fetching page with Selenium: {url}")
+                self.throttle()
+                with self.timed_stage("render"):
+                    driver.set_page_load_timeout(self.timeout)
+                    driver.get(url)
+                    # Wait for dynamic content to load
+                    driver.implicitly_wait(10)
+                    html = driver.page_source
         except Exception as e:
+            self.record_page("selenium", None)
             logger.error(f"Error fetching {url} with Selenium: {e}")
-            return None
\ No newline at end of file
+            return None
+        self.record_page("selenium", html)
+        return html
+
+    def _get_selenium_driver(self):
+        """
+        Create a headless WebDriver based on the env settings
+
+        Returns:
+            WebDriver: Firefox driver if FIREFOX_DRIVER_PATH is set, Chrome otherwise
+        """
+        from selenium import webdriver
+
+        # Check which WebDriver to use based on env settings
+        firefox_driver_path = os.getenv('FIREFOX_DRIVER_PATH')
+        chrome_driver_path = os.getenv('CHROME_DRIVER_PATH')
+
+        if firefox_driver_path is not None:
+            from selenium.webdriver.firefox.service import Service as FirefoxService
+            from selenium.webdriver.firefox.options import Options as FirefoxOptions
+
+            # Use Firefox WebDriver
+            firefox_options = FirefoxOptions()
+            firefox_options.add_argument("--headless")
+
+            if firefox_driver_path.lower() == 'none':
+                from webdriver_manager.firefox import GeckoDriverManager
+                service = FirefoxService(GeckoDriverManager().install())
+            else:
+                service = FirefoxService(firefox_driver_path)
+
+            logger.info("Using Firefox WebDriver")
+            return webdriver.Firefox(service=service, options=firefox_options)
+
+        from selenium.webdriver.chrome.service import Service as ChromeService
+        from selenium.webdriver.chrome.options import Options as ChromeOptions
+
+        # Use Chrome WebDriver as fallback
+        chrome_options = ChromeOptions()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+
+        if chrome_driver_path:
+            service = ChromeService(chrome_driver_path)
+        else:
+            from webdriver_manager.chrome import ChromeDriverManager
+            service = ChromeService(ChromeDriverManager().install())
+
+        logger.info("Using Chrome WebDriver")
+        return webdriver.Chrome(service=service, options=chrome_options)
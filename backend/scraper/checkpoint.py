@@ -0,0 +1,150 @@
+"""
+Checkpoints of finished scrape units
+
+Every unit whose movies were stored is recorded with its result hash, so an
+interrupted multi-day run can resume and skip the units completed within a
+freshness window instead of re-rendering every cinema page.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from scraper.pipeline import UnitResult
+from scraper.units import ScrapeUnit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = os.getenv(
+    "SCRAPE_CHECKPOINT_PATH", "scrape_checkpoints.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_checkpoints (
+    scraper TEXT NOT NULL,
+    cinema TEXT NOT NULL,
+    date TEXT NOT NULL,
+    result_hash TEXT NOT NULL,
+    movies INTEGER NOT NULL,
+    original_showtimes INTEGER NOT NULL,
+    completed_at REAL NOT NULL,
+    PRIMARY KEY (scraper, cinema, date)
+);
+"""
+
+
+class CheckpointStore:
+    """
+    SQLite store of completed (scraper, cinema, date) units
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, result: UnitResult) -> None:
+        """
+        Checkpoint a unit whose movies have been stored
+
+        Args:
+            result (UnitResult): Result reported by the pipeline
+        """
+        unit = result.unit
+        with self._connect() as conn:
+            previous = conn.execute(
+                "SELECT result_hash FROM scrape_checkpoints "
+                "WHERE scraper = ? AND cinema = ? AND date = ?",
+                unit.key,
+            ).fetchone()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO scrape_checkpoints
+                    (scraper, cinema, date, result_hash, movies,
+                     original_showtimes, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (*unit.key, result.result_hash, result.movies,
+                 result.original_showtimes, time.time()),
+            )
+
+        changed = previous is None or previous["result_hash"] != result.result_hash
+        logger.debug(
+            f"Checkpointed {unit.key} ({result.movies} movies, "
+            f"{'changed' if changed else 'unchanged'})")
+
+    async def record_async(self, result: UnitResult) -> None:
+        """Pipeline callback recording a unit without blocking the event loop"""
+        await asyncio.to_thread(self.record, result)
+
+    def get(self, unit: ScrapeUnit) -> Optional[Dict]:
+        """Get the checkpoint of a unit, if any"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM scrape_checkpoints "
+                "WHERE scraper = ? AND cinema = ? AND date = ?",
+                unit.key,
+            ).fetchone()
+        return dict(row) if row else None
+
+    def filter_stale(self, units: List[ScrapeUnit], max_age_minutes: float) -> List[ScrapeUnit]:
+        """
+        Drop units completed within the freshness window
+
+        Args:
+            units (List[ScrapeUnit]): Candidate units
+            max_age_minutes (float): Freshness window in minutes
+
+        Returns:
+            List[ScrapeUnit]: Units still to scrape
+        """
+        if not units:
+            return []
+
+        cutoff = time.time() - max_age_minutes * 60
+        dates = sorted({unit.date for unit in units})
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT scraper, cinema, date FROM scrape_checkpoints "
+                f"WHERE completed_at >= ? AND date IN ({','.join('?' * len(dates))})",
+                (cutoff, *dates),
+            ).fetchall()
+        fresh = {tuple(row) for row in rows}
+
+        remaining = [unit for unit in units if unit.key not in fresh]
+        skipped = len(units) - len(remaining)
+        if skipped:
+            logger.info(f"Resuming: skipping {skipped} units completed in the last "
+                        f"{max_age_minutes:g} minutes")
+        return remaining
+
+    def cinema_history(self) -> Dict[Tuple[str, str], Dict]:
+        """
+        Get the most recent checkpoint of every (scraper, cinema)
+
+        Used to rank cinemas by how many movies and original-language
+        screenings they had the last time they were scraped.
+
+        Returns:
+            Dict[Tuple[str, str], Dict]: Latest checkpoint per (scraper, cinema)
+        """
+        with self._connect() as conn:
+            # SQLite returns the row holding MAX(completed_at) for bare columns
+            rows = conn.execute(
+                "SELECT scraper, cinema, movies, original_showtimes, "
+                "MAX(completed_at) AS completed_at "
+                "FROM scrape_checkpoints GROUP BY scraper, cinema"
+            ).fetchall()
+        return {(row["scraper"], row["cinema"]): dict(row) for row in rows}
@@ -1,7 +1,7 @@
 from typing import List, Dict, Any
 from bs4 import BeautifulSoup
-from models.movie import Showtime
 from scraper.base_scraper import BaseScraper
+from scraper.records import MovieRecord, ShowtimeRecord
 import logging
 
 logger = logging.getLogger(__name__)
@@ -99,29 +99,29 @@ class CinemaScraper(BaseScraper):
                         'a.booking-link')
                     booking_url = booking_elem['href'] if booking_elem else None
 
-                    showtime = {
-                        "time": time,
-                        "theater": theater,
-                        "room": room,
-                        "is_original_language": is_original_language,
-                        "is_3d": is_3d,
-                        "booking_url": booking_url
-                    }
+                    showtime = ShowtimeRecord(
+                        time=time,
+                        theater=theater,
+                        room=room,
+                        is_original_language=is_original_language,
+                        is_3d=is_3d,
+                        booking_url=booking_url
+                    )
 
                     showtimes.append(showtime)
 
                 # Create movie object
-                movie = {
-                    "title": title,
-                    "original_title": original_title,
-                    "date": date,
-                    "image_url": image_url,
-                    "description": description,
-                    "duration": duration,
-                    "genres": genres,
-                    "rating": rating,
-                    "showtimes": showtimes
-                }
+                movie = MovieRecord(
+                    title=title,
+                    original_title=original_title,
+                    date=date,
+                    image_url=image_url,
+                    description=description,
+                    duration=duration,
+                    genres=genres,
+                    rating=rating,
+                    showtimes=showtimes
+                )
 
                 movies.append(movie)
 
@@ -130,4 +130,4 @@ class CinemaScraper(BaseScraper):
                 continue
 
         logger.info(f"Scraped {len(movies)} movies from {url}")
-        return movies
+        return [movie.to_dict() for movie in movies]
@@ -0,0 +1,229 @@
+"""
+Film detail enrichment with a persistent cache
+
+Cinema listing pages only show titles and showtimes; duration, genres,
+director, year and original title live on each film's page. The same film
+is listed by every cinema on every date, so details are fetched once per
+film URL and cached on disk for a TTL. The pipeline fills batches from the
+cache before writing them, and fetches the missing URLs concurrently after
+the write, backfilling the films rows.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "SCRAPE_ENRICHMENT_CACHE_PATH", "scrape_enrichment.sqlite3")
+DEFAULT_TTL_HOURS = float(os.getenv("SCRAPE_ENRICHMENT_TTL_HOURS", "168"))
+
+# Fields a film page may provide
+ENRICHED_FIELDS = ("original_title", "duration", "genres", "director", "year")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS film_details (
+    url TEXT PRIMARY KEY,
+    details TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+DetailsFetcher = Callable[[str], Dict[str, Any]]
+
+
+class EnrichmentCache:
+    """
+    SQLite cache of film details keyed by film page URL
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH,
+                 ttl_hours: float = DEFAULT_TTL_HOURS):
+        """
+        Args:
+            path (str): SQLite file holding the cache
+            ttl_hours (float): Hours before cached details are fetched again
+        """
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the cached details of the URLs fetched within the TTL
+
+        Args:
+            urls (List[str]): Film page URLs
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Details by URL, fresh entries only
+        """
+        if not urls:
+            return {}
+
+        cutoff = time.time() - self.ttl_seconds
+        placeholders = ", ".join("?" for _ in urls)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT url, details FROM film_details "
+                f"WHERE url IN ({placeholders}) AND fetched_at >= ?",
+                (*urls, cutoff),
+            ).fetchall()
+        return {url: json.loads(details) for url, details in rows}
+
+    def put(self, url: str, details: Dict[str, Any]) -> None:
+        """
+        Cache the details of a film page
+
+        Args:
+            url (str): Film page URL
+            details (Dict[str, Any]): Details parsed from the page
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO film_details (url, details, fetched_at) "
+                "VALUES (?, ?, ?)",
+                (url, json.dumps(details, default=str), time.time()),
+            )
+
+
+def _fill(movies: List[Dict[str, Any]], details: Dict[str, Dict[str, Any]]) -> None:
+    """Set the fields a movie is missing from the details of its URL"""
+    for movie in movies:
+        for field, value in details.get(movie.get("url"), {}).items():
+            if movie.get(field) in (None, "", []):
+                movie[field] = value
+
+
+class Enricher:
+    """
+    Pipeline stage adding film page details to scraped movies
+
+    Each URL is fetched at most once per TTL: cached details are reused,
+    URLs already being fetched are awaited instead of fetched again, and
+    URLs that failed are not retried until the next run.
+    """
+
+    def __init__(self, cache: Optional[EnrichmentCache] = None, concurrency: int = 4):
+        """
+        Args:
+            cache (EnrichmentCache, optional): Persistent details cache,
+                                               opened on first use by default
+            concurrency (int): Maximum number of film pages fetched at a time
+        """
+        self.cache = cache
+        self.concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._failed: Set[str] = set()
+        # Number of film pages fetched since the last reset
+        self.fetched = 0
+
+    def reset(self) -> None:
+        """Forget the failures and counters of a previous run"""
+        self._semaphore = None
+        self._failed = set()
+        self.fetched = 0
+
+    async def enrich(self, movies: List[Dict[str, Any]],
+                     fetchers: List[Optional[DetailsFetcher]]) -> None:
+        """
+        Fill missing film fields of movies in place
+
+        Args:
+            movies (List[Dict[str, Any]]): Movies, enriched when they have a 'url'
+            fetchers (List[DetailsFetcher]): Details fetcher of each movie's
+                                             scraper, None to skip the movie
+        """
+        missing = await self.apply_cached(movies, fetchers)
+        if missing:
+            _fill(movies, await self.fetch(missing))
+
+    async def apply_cached(self, movies: List[Dict[str, Any]],
+                           fetchers: List[Optional[DetailsFetcher]]) -> Dict[str, DetailsFetcher]:
+        """
+        Fill missing film fields of movies in place from the cache only
+
+        Args:
+            movies (List[Dict[str, Any]]): Movies, enriched when they have a 'url'
+            fetchers (List[DetailsFetcher]): Details fetcher of each movie's
+                                             scraper, None to skip the movie
+
+        Returns:
+            Dict[str, DetailsFetcher]: Fetcher of each URL still to fetch,
+                                       for fetch()
+        """
+        fetcher_by_url: Dict[str, DetailsFetcher] = {}
+        for movie, fetcher in zip(movies, fetchers):
+            if fetcher is not None and movie.get("url"):
+                fetcher_by_url.setdefault(movie["url"], fetcher)
+
+        if not fetcher_by_url:
+            return {}
+
+        if self.cache is None:
+            self.cache = EnrichmentCache()
+        details = await asyncio.to_thread(self.cache.get_many, list(fetcher_by_url))
+        _fill(movies, details)
+        return {url: fetcher for url, fetcher in fetcher_by_url.items()
+                if url not in details and url not in self._failed}
+
+    async def fetch(self, fetcher_by_url: Dict[str, DetailsFetcher]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch film pages concurrently and cache their details
+
+        Args:
+            fetcher_by_url (Dict[str, DetailsFetcher]): URLs to fetch, as
+                                                        returned by apply_cached()
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Details by URL, failed URLs left out
+        """
+        urls = list(fetcher_by_url)
+        fetched = await asyncio.gather(
+            *(self._fetch(url, fetcher_by_url[url]) for url in urls))
+        return {url: details for url, details in zip(urls, fetched) if details}
+
+    async def _fetch(self, url: str, fetcher: DetailsFetcher) -> Optional[Dict[str, Any]]:
+        """Fetch a film page, sharing the request with concurrent callers"""
+        if url in self._inflight:
+            return await self._inflight[url]
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[url] = future
+        details = None
+        try:
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.concurrency)
+            async with self._semaphore:
+                details = await asyncio.to_thread(fetcher, url)
+            self.fetched += 1
+            details = {k: v for k, v in (details or {}).items()
+                       if k in ENRICHED_FIELDS and v not in (None, "", [])}
+            if details:
+                await asyncio.to_thread(self.cache.put, url, details)
+            else:
+                self._failed.add(url)
+        except Exception as e:
+            logger.warning(f"Error fetching film details from {url}: {e}")
+            self._failed.add(url)
+            details = None
+        finally:
+            future.set_result(details)
+            del self._inflight[url]
+        return details
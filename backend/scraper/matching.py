@@ -0,0 +1,181 @@
+"""
+Canonical title matching and showtime de-duplication
+
+Cinemas spell the same film differently ("Dune - Parte Due", "DUNE: PARTE
+DUE (V.O.)", "Dune parte due"). Titles are reduced to a normalized key so
+movies scraped from different sites and cinemas merge into one entry, and
+repeated showtimes are dropped by a set of showtime keys.
+"""
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Version and format markers cinemas append to titles, e.g. "(V.O.)",
+# "[VOS]", "(versione originale sottotitolata)", "- 3D"
+_MARKER = (
+    r"v\.?\s*o\.?(\s*s\.?)?(\s*t\.?)?(\s*ita\.?)?|vos[a-z]*|ov|omu|"
+    r"versione originale[^)\]]*|original version|lingua originale|"
+    r"sottotitolat[oi][^)\]]*|sott\.?\s*ita\.?|sub\.?\s*ita\.?|"
+    r"3d|2d|imax|4dx|dolby atmos"
+)
+_BRACKETED_MARKER = re.compile(rf"\s*[(\[]\s*({_MARKER})\s*[)\]]\s*$", re.IGNORECASE)
+_TRAILING_MARKER = re.compile(rf"\s+[-–|]\s*({_MARKER})\s*$", re.IGNORECASE)
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+ShowtimeKey = Tuple[Any, ...]
+
+
+def strip_version_markers(title: str) -> str:
+    """
+    Remove trailing version and format markers from a title
+
+    Args:
+        title (str): Title as shown by the cinema
+
+    Returns:
+        str: Title without markers such as "(V.O.)" or "- 3D"
+    """
+    previous = None
+    title = title.strip()
+    while title != previous:
+        previous = title
+        title = _BRACKETED_MARKER.sub("", title)
+        title = _TRAILING_MARKER.sub("", title).strip()
+    return title
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """
+    Reduce a title to a key shared by its spelling variants
+
+    Removes version markers, accents, case and punctuation.
+
+    Args:
+        title (str): Title as shown by the cinema
+
+    Returns:
+        str: Normalized key, empty for a missing title
+    """
+    if not title:
+        return ""
+    title = unicodedata.normalize("NFKD", strip_version_markers(title))
+    title = "".join(c for c in title if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", title.lower()).strip()
+
+
+def showtime_key(showtime: Dict[str, Any]) -> ShowtimeKey:
+    """
+    Get the key identifying a showtime regardless of which scrape reported it
+
+    Args:
+        showtime (Dict[str, Any]): Showtime data
+
+    Returns:
+        ShowtimeKey: Theater, time, room and format of the showtime
+    """
+    ref = showtime.get("theater_ref")
+    theater = (ref["source"], ref["external_id"]) if ref else showtime.get("theater")
+    return (
+        theater,
+        str(showtime.get("time", "")).strip(),
+        showtime.get("room"),
+        bool(showtime.get("is_original_language")),
+        bool(showtime.get("is_3d")),
+    )
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or value == "" or value == []
+
+
+class MovieIndex:
+    """
+    Index of canonical titles by normalized title and original title
+
+    The first spelling seen for a film becomes its canonical title. The
+    index is meant to outlive a single batch, so a film keeps the same
+    title across all batches and dates of a run. Across runs and workers
+    the stored films row is authoritative (see models.repository.film_key).
+    """
+
+    def __init__(self):
+        self._canonical: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(set(self._canonical.values()))
+
+    def canonical_title(self, movie: Dict[str, Any]) -> str:
+        """
+        Get the canonical title of a movie, registering it if new
+
+        Args:
+            movie (Dict[str, Any]): Movie data with 'title' and optionally
+                                    'original_title'
+
+        Returns:
+            str: Canonical title
+        """
+        keys = [k for k in (normalize_title(movie.get("title")),
+                            normalize_title(movie.get("original_title"))) if k]
+
+        canonical = next(
+            (self._canonical[k] for k in keys if k in self._canonical), None)
+        if canonical is None:
+            canonical = strip_version_markers(movie["title"])
+
+        for key in keys:
+            self._canonical.setdefault(key, canonical)
+        return canonical
+
+    def merge(self, movies: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merge movies of the same film and date and drop repeated showtimes
+
+        Metadata missing from the first movie is filled from its duplicates.
+        Input movies are not modified.
+
+        Args:
+            movies (Iterable[Dict[str, Any]]): Movie data with 'date' and 'showtimes'
+
+        Returns:
+            List[Dict[str, Any]]: One movie per film and date, in first-seen order
+        """
+        merged: Dict[Tuple[Optional[str], str], Dict[str, Any]] = {}
+        seen: Dict[Tuple[Optional[str], str], Set[ShowtimeKey]] = {}
+
+        for movie in movies:
+            title = self.canonical_title(movie)
+            key = (movie.get("date"), title)
+
+            entry = merged.get(key)
+            if entry is None:
+                entry = merged[key] = {**movie, "title": title, "showtimes": []}
+                seen[key] = set()
+            else:
+                for field, value in movie.items():
+                    if field != "showtimes" and _is_missing(entry.get(field)):
+                        entry[field] = value
+                if movie.get("is_original_language"):
+                    entry["is_original_language"] = True
+
+            keys = seen[key]
+            for showtime in movie.get("showtimes", []):
+                showtime_id = showtime_key(showtime)
+                if showtime_id not in keys:
+                    keys.add(showtime_id)
+                    entry["showtimes"].append(showtime)
+
+        return list(merged.values())
+
+
+def merge_movies(movies: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge duplicate movies with a throwaway index
+
+    Args:
+        movies (Iterable[Dict[str, Any]]): Movie data
+
+    Returns:
+        List[Dict[str, Any]]: One movie per film and date
+    """
+    return MovieIndex().merge(movies)
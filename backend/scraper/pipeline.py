@@ -0,0 +1,463 @@
+"""
+Streaming scrape pipeline
+
+Scrapers yield movies into a bounded queue while a writer stage persists
+them in batches, so fetching, parsing and storing overlap and memory stays
+bounded by the queue size instead of the whole result set.
+"""
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from monitoring.metrics import SCRAPE_QUEUE_DEPTH, SCRAPED_MOVIES, SCRAPED_SHOWTIMES
+from scraper.base_scraper import BaseScraper
+from scraper.enrichment import Enricher
+from scraper.matching import MovieIndex
+from scraper.records import as_record, validate_movies
+from scraper.report import (COMPLETED, DEFERRED, FAILED, RunReport, current_unit,
+                            set_current_unit)
+from scraper.units import ScrapeUnit
+
+logger = logging.getLogger(__name__)
+
+# Sentinel pushed once every producer has finished
+_DONE = object()
+
+BatchWriter = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+
+
+@dataclass
+class UnitResult:
+    """Summary of a unit whose movies were all stored"""
+    unit: ScrapeUnit
+    movies: int
+    original_showtimes: int
+    # Hash of the movies scraped for the unit, to detect changed results
+    result_hash: str
+
+
+UnitCallback = Callable[[UnitResult], Awaitable[None]]
+
+
+class _ProducersStopped(Exception):
+    """Raised in a producer thread once its run has ended or was cancelled"""
+
+
+class _Producers:
+    """
+    Queue access shared by the producer threads of one run
+
+    Threads cannot be cancelled, so a run that ends early (cancelled, or
+    units abandoned at the time budget) stops them here: later puts raise
+    _ProducersStopped, and puts blocked on a full queue are cancelled.
+    """
+
+    def __init__(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+        self.queue = queue
+        self.loop = loop
+        self.stopped = threading.Event()
+        self._puts: Set[concurrent.futures.Future] = set()
+
+    def put(self, item: Any) -> None:
+        """Queue an item, blocking the thread while the queue is full (backpressure)"""
+        if self.stopped.is_set():
+            raise _ProducersStopped()
+        future = asyncio.run_coroutine_threadsafe(self.queue.put(item), self.loop)
+        self._puts.add(future)
+        # Checked after registering, so stop() either sees the put or we see the stop
+        if self.stopped.is_set():
+            future.cancel()
+        try:
+            future.result()
+        except concurrent.futures.CancelledError:
+            raise _ProducersStopped()
+        finally:
+            self._puts.discard(future)
+        SCRAPE_QUEUE_DEPTH.set(self.queue.qsize())
+
+    def stop(self) -> None:
+        """Make producers still running give up instead of queueing"""
+        self.stopped.set()
+        for future in list(self._puts):
+            future.cancel()
+
+
+class ScrapePipeline:
+    """
+    Producer/consumer pipeline between scrapers and the database
+
+    Each scraper unit runs in a worker thread (up to the scraper's
+    concurrency budget at a time) and feeds a bounded asyncio queue;
+    producers block when the queue is full, which throttles fetching to the
+    pace of the writer. A single writer coroutine drains the queue and
+    stores movies in batches.
+    """
+
+    def __init__(self, writer: BatchWriter, queue_size: int = 100,
+                 batch_size: int = 25, flush_interval: float = 2.0,
+                 on_unit_done: Optional[UnitCallback] = None,
+                 enricher: Optional[Enricher] = None,
+                 film_writer: Optional[BatchWriter] = None):
+        """
+        Args:
+            writer (BatchWriter): Coroutine function storing a batch of movies
+            queue_size (int): Maximum number of movies buffered between stages
+            batch_size (int): Number of movies written per batch
+            flush_interval (float): Seconds to wait before writing a partial batch
+            on_unit_done (UnitCallback, optional): Called once all movies of a
+                                                   unit have been stored
+            enricher (Enricher, optional): Adds cached film page details to
+                                           each batch before it is written and
+                                           fetches the missing ones afterwards
+            film_writer (BatchWriter, optional): Stores film details fetched
+                                                 after their movies were written,
+                                                 e.g. FilmRepository.upsert_films
+        """
+        self.writer = writer
+        self.on_unit_done = on_unit_done
+        self.enricher = enricher
+        self.film_writer = film_writer
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Scrapers and unit keys that raised during the last run
+        self.failed_scrapers: Set[str] = set()
+        self.failed_units: Set[Tuple[str, str, str]] = set()
+        # Number of batches the writer failed to store during the last run
+        self.write_errors = 0
+        # Units fully stored during the last run
+        self.completed_units: List[UnitResult] = []
+        # Units not finished within the time budget of the last run
+        self.deferred_units: List[ScrapeUnit] = []
+        self._abandoned: Set[Tuple[str, str, str]] = set()
+        self._deadline: Optional[float] = None
+        self._scrapers: Dict[str, BaseScraper] = {}
+        self._report: Optional[RunReport] = None
+        # Film detail fetches running behind the writer
+        self._backfills: Set[asyncio.Task] = set()
+        # Kept across the batches of a run so a film is stored under one
+        # title whichever scraper or cinema reported it first; across runs
+        # the normalized film keys of the films table do the same
+        self.titles = MovieIndex()
+
+    async def run(self, scrapers: List[BaseScraper], date_str: str) -> int:
+        """
+        Scrape a date with every scraper and store the results
+
+        Args:
+            scrapers (List[BaseScraper]): Scrapers to run concurrently
+            date_str (str): Date in format YYYY-MM-DD
+
+        Returns:
+            int: Number of movies written
+        """
+        async def list_units(scraper: BaseScraper) -> List[ScrapeUnit]:
+            logger.info(
+                f"Starting scraping with {scraper.name} for date {date_str}")
+            try:
+                return await asyncio.to_thread(scraper.list_units, date_str)
+            except Exception as e:
+                logger.error(
+                    f"Error listing units with {scraper.name}: {str(e)}", exc_info=True)
+                self.failed_scrapers.add(scraper.name)
+                return []
+
+        self.failed_scrapers = set()
+        units = await asyncio.gather(*(list_units(s) for s in scrapers))
+        return await self.run_units(list(zip(scrapers, units)), reset=False)
+
+    async def run_units(self, work: List[Tuple[BaseScraper, List[ScrapeUnit]]],
+                        reset: bool = True, budget_seconds: Optional[float] = None,
+                        report: Optional[RunReport] = None) -> int:
+        """
+        Scrape explicit units and store the results
+
+        Units of a scraper are started in list order, so callers put the
+        most valuable units first. With a time budget, units not finished by
+        the deadline are abandoned and listed in deferred_units; whatever was
+        stored before the deadline is kept. Abandoned units stop feeding the
+        queue, but their worker threads run until the current page returns.
+        The run returns once the film details fetched behind the writer are
+        stored.
+
+        Args:
+            work (List[Tuple[BaseScraper, List[ScrapeUnit]]]): Units to scrape
+                                                               per scraper
+            reset (bool): Clear the failures recorded by a previous run
+            budget_seconds (float, optional): Time budget for the whole run
+            report (RunReport, optional): Receives the timings, pages and
+                                          outcome of each unit
+
+        Returns:
+            int: Number of movies written
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        loop = asyncio.get_running_loop()
+        if reset:
+            self.failed_scrapers = set()
+        self.failed_units = set()
+        self.write_errors = 0
+        self.completed_units = []
+        self.deferred_units = []
+        self._abandoned = set()
+        self._deadline = None if budget_seconds is None else time.monotonic() + budget_seconds
+        self._scrapers = {scraper.name: scraper for scraper, _ in work}
+        self._report = report
+        self.titles = MovieIndex()
+        if self.enricher:
+            self.enricher.reset()
+        # Run-scoped writers (MovieWriter) track what the run already stored
+        if hasattr(self.writer, "reset"):
+            self.writer.reset()
+
+        producers = _Producers(queue, loop)
+        writer_task = asyncio.create_task(self._consume(queue))
+        try:
+            await asyncio.gather(*(
+                self._run_scraper(scraper, units, producers)
+                for scraper, units in work
+            ))
+        except asyncio.CancelledError:
+            # The caller gave up on the run (e.g. a lost lease): stop
+            # scraping and storing right away instead of draining the queue
+            producers.stop()
+            writer_task.cancel()
+            for task in self._backfills:
+                task.cancel()
+            await asyncio.gather(writer_task, *self._backfills, return_exceptions=True)
+            raise
+        finally:
+            if not writer_task.done():
+                await queue.put(_DONE)
+                await writer_task
+            # Only producers of abandoned units can still be running
+            producers.stop()
+            if self._backfills:
+                await asyncio.gather(*self._backfills, return_exceptions=True)
+            self._close_report()
+
+        return writer_task.result()
+
+    def _close_report(self) -> None:
+        """Record the outcome of each unit in the run's report"""
+        if self._report is None:
+            return
+        completed = {result.unit.key for result in self.completed_units}
+        deferred = {unit.key for unit in self.deferred_units}
+        for key, unit_report in self._report.units.items():
+            if key in self.failed_units:
+                unit_report.status = FAILED
+            elif key in deferred:
+                unit_report.status = DEFERRED
+            elif key in completed:
+                unit_report.status = COMPLETED
+
+    async def _run_scraper(self, scraper: BaseScraper, units: List[ScrapeUnit],
+                           producers: _Producers) -> None:
+        """Scrape units of a scraper, at most scraper.concurrency at a time"""
+        semaphore = asyncio.Semaphore(scraper.concurrency)
+
+        async def run_unit(unit: ScrapeUnit) -> int:
+            # Each unit runs in its own task: what the scraper records while
+            # scraping it (see scraper.report) goes to this unit's report
+            unit_report = self._report.unit(unit) if self._report else None
+            set_current_unit(unit_report)
+            async with semaphore:
+                remaining = self._remaining()
+                if remaining is not None and remaining <= 0:
+                    self.deferred_units.append(unit)
+                    return 0
+                started = time.perf_counter()
+                try:
+                    count = await asyncio.wait_for(asyncio.to_thread(
+                        self._produce, scraper, unit, producers), remaining)
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"Time budget exhausted while scraping {unit.key}, deferring it")
+                    self._abandoned.add(unit.key)
+                    self.deferred_units.append(unit)
+                    count = 0
+                if unit_report is not None:
+                    unit_report.seconds = time.perf_counter() - started
+                    unit_report.movies = count
+                return count
+
+        counts = await asyncio.gather(*(run_unit(unit) for unit in units))
+
+        if sum(counts):
+            logger.info(
+                f"Successfully scraped {sum(counts)} movies from {scraper.name}")
+        else:
+            logger.warning(
+                f"No movies found from {scraper.name} in {len(units)} units")
+
+    def _produce(self, scraper: BaseScraper, unit: ScrapeUnit,
+                 producers: _Producers) -> int:
+        """Scrape a unit in a worker thread and feed its movies to the queue"""
+        count = 0
+        original = 0
+        digest = hashlib.sha256()
+        put = producers.put
+
+        try:
+            for movie in scraper.scrape_unit(unit):
+                if unit.key in self._abandoned or producers.stopped.is_set():
+                    return count
+                record = as_record(movie)
+                # Make sure date is consistent
+                record.date = unit.date
+                # Built once, for both the result hash and the writer
+                data = record.to_dict()
+                digest.update(json.dumps(data, sort_keys=True, default=str).encode())
+                original += sum(1 for s in record.showtimes
+                                if s.is_original_language)
+                put((unit.key, data))
+                count += 1
+                SCRAPED_MOVIES.inc(scraper=scraper.name)
+                SCRAPED_SHOWTIMES.inc(len(record.showtimes), scraper=scraper.name)
+        except (_ProducersStopped, concurrent.futures.CancelledError):
+            return count
+        except Exception as e:
+            if unit.key in self._abandoned or producers.stopped.is_set():
+                # The run already gave up on the unit, this is not a scrape error
+                logger.debug(f"Abandoned unit {unit.key} stopped: {e!r}")
+                return count
+            logger.error(
+                f"Error scraping {unit.key} with {scraper.name}: {str(e)}", exc_info=True)
+            unit_report = current_unit()
+            if unit_report is not None:
+                unit_report.error = str(e)
+                unit_report.errors += 1
+            self.failed_scrapers.add(scraper.name)
+            self.failed_units.add(unit.key)
+            return count
+
+        # Queued after the unit's movies, so the writer sees it once they are stored
+        try:
+            put(UnitResult(unit=unit, movies=count, original_showtimes=original,
+                           result_hash=digest.hexdigest()))
+        except _ProducersStopped:
+            pass
+        return count
+
+    async def _consume(self, queue: asyncio.Queue) -> int:
+        """Drain the queue and write movies in batches until producers finish"""
+        batch: List[Tuple[Tuple[str, str, str], Dict[str, Any]]] = []
+        written = 0
+        done = False
+
+        while not done:
+            try:
+                item = await asyncio.wait_for(queue.get(), self.flush_interval)
+            except asyncio.TimeoutError:
+                item = None
+            SCRAPE_QUEUE_DEPTH.set(queue.qsize())
+
+            if item is _DONE:
+                done = True
+            elif isinstance(item, UnitResult):
+                # Store everything queued before the unit finished, then report it
+                if batch:
+                    written += await self._flush(batch)
+                    batch = []
+                await self._unit_done(item)
+                continue
+            elif item is not None:
+                batch.append(item)
+
+            if batch and (item is None or len(batch) >= self.batch_size or done):
+                written += await self._flush(batch)
+                batch = []
+
+        return written
+
+    def _remaining(self) -> Optional[float]:
+        """Seconds left in the run's time budget, None if unlimited"""
+        if self._deadline is None:
+            return None
+        return self._deadline - time.monotonic()
+
+    async def _unit_done(self, result: UnitResult) -> None:
+        """Report a unit whose movies have all been stored"""
+        if result.unit.key in self.failed_units | self._abandoned:
+            return
+        self.completed_units.append(result)
+        if self.on_unit_done:
+            try:
+                await self.on_unit_done(result)
+            except Exception as e:
+                logger.error(f"Error recording unit {result.unit.key}: {e}")
+
+    async def _flush(self, batch: List[Tuple[Tuple[str, str, str], Dict[str, Any]]]) -> int:
+        """Enrich from the cache, validate, merge movies of the same film and write a batch"""
+        movies = [movie for _, movie in batch]
+        # Batch stages are shared among the batch's units by movie count
+        movies_by_unit = Counter(unit_key for unit_key, _ in batch)
+        missing = {}
+        if self.enricher:
+            fetchers = [getattr(self._scrapers.get(unit_key[0]), "get_film_details", None)
+                        for unit_key, _ in batch]
+            started = time.perf_counter()
+            try:
+                missing = await self.enricher.apply_cached(movies, fetchers)
+            except Exception as e:
+                # Details are optional, store the movies without them
+                logger.error(f"Error enriching batch of {len(batch)} movies: {e}")
+            self._share("enrich", time.perf_counter() - started, movies_by_unit)
+
+        valid = validate_movies(movies)
+        movies = self.titles.merge(valid)
+        started = time.perf_counter()
+        try:
+            await self.writer(movies)
+        except Exception as e:
+            logger.error(f"Error storing batch of {len(movies)} movies: {e}")
+            self.write_errors += 1
+            # Units with unstored movies must not be reported as done
+            self.failed_units.update(unit_key for unit_key, _ in batch)
+            return 0
+
+        self._share("store", time.perf_counter() - started, movies_by_unit)
+        if self._report is not None:
+            for unit_key, count in movies_by_unit.items():
+                if unit_key in self._report.units:
+                    self._report.units[unit_key].rows_written += count
+
+        logger.info(f"Stored batch of {len(movies)} movies")
+        if missing:
+            # Film pages are slow, fetch them without holding up the writer
+            titles = {movie["url"]: movie["title"] for movie in valid
+                      if movie.get("url") in missing}
+            task = asyncio.create_task(self._backfill(titles, missing, movies_by_unit))
+            self._backfills.add(task)
+            task.add_done_callback(self._backfills.discard)
+        return len(movies)
+
+    def _share(self, stage: str, seconds: float, movies_by_unit: Dict[Tuple[str, str, str], int]) -> None:
+        """Account the time of a batch stage to the run's report"""
+        if self._report is not None:
+            self._report.share(stage, seconds, movies_by_unit)
+
+    async def _backfill(self, titles: Dict[str, str], missing: Dict[str, Any],
+                        movies_by_unit: Dict[Tuple[str, str, str], int]) -> None:
+        """Fetch film details missing from the cache and store them on the films"""
+        started = time.perf_counter()
+        try:
+            details = await self.enricher.fetch(missing)
+            films = [{**details[url], "title": title}
+                     for url, title in titles.items() if url in details]
+            if films and self.film_writer:
+                await self.film_writer(films)
+                logger.info(f"Backfilled details of {len(films)} films")
+        except Exception as e:
+            # The details stay cached, later batches and runs still get them
+            logger.error(f"Error backfilling film details: {e}")
+        finally:
+            self._share("enrich", time.perf_counter() - started, movies_by_unit)
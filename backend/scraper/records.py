@@ -0,0 +1,179 @@
+"""
+Compact records emitted by scrapers
+
+Scrapers build one MovieRecord per movie and one ShowtimeRecord per
+showtime. Records are plain __slots__ objects: cheap to create while
+parsing, with a single spelling of every field. The pipeline validates
+and converts them in one batched pass right before writing
+(validate_movies), instead of constructing a pydantic model per showtime
+inside the parsing loops.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+from scraper.times import format_minute, parse_minute
+
+logger = logging.getLogger(__name__)
+
+# Keys used by older scrapers, mapped to the record fields
+_LEGACY_KEYS = {
+    "poster_url": "image_url",
+    "synopsis": "description",
+}
+
+
+class ShowtimeRecord:
+    """
+    A screening of a movie at a theater
+
+    The time text is parsed on creation: `time` holds the normalized HH:MM
+    time (None if the text has no time), `start_minute` the minutes of the
+    cinema day and `time_text` the text as scraped.
+    """
+
+    __slots__ = ("time", "theater", "room", "is_original_language", "is_3d",
+                 "booking_url", "theater_ref", "time_text", "start_minute")
+
+    def __init__(self, time: str, theater: str, room: Optional[str] = None,
+                 is_original_language: bool = False, is_3d: bool = False,
+                 booking_url: Optional[str] = None,
+                 theater_ref: Optional[Dict[str, Any]] = None,
+                 time_text: Optional[str] = None):
+        self.time_text = time_text if time_text is not None else time
+        self.start_minute = parse_minute(self.time_text)
+        self.time = format_minute(self.start_minute) if self.start_minute is not None else None
+        self.theater = theater
+        self.room = room
+        self.is_original_language = is_original_language
+        self.is_3d = is_3d
+        self.booking_url = booking_url
+        self.theater_ref = theater_ref
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ShowtimeRecord":
+        fields = {k: v for k, v in data.items()
+                  if k in cls.__slots__ and k != "start_minute"}
+        return cls(**fields)
+
+
+class MovieRecord:
+    """A movie showing on a date, with its showtimes"""
+
+    __slots__ = ("title", "date", "original_title", "image_url", "description",
+                 "duration", "genres", "rating", "director", "year", "url",
+                 "city", "showtimes")
+
+    def __init__(self, title: str, date: Optional[str] = None,
+                 original_title: Optional[str] = None, image_url: Optional[str] = None,
+                 description: Optional[str] = None, duration: Optional[int] = None,
+                 genres: Optional[List[str]] = None, rating: Optional[float] = None,
+                 director: Optional[str] = None, year: Optional[int] = None,
+                 url: Optional[str] = None, city: Optional[str] = None,
+                 showtimes: Optional[List[ShowtimeRecord]] = None):
+        self.title = title
+        self.date = date
+        self.original_title = original_title
+        self.image_url = image_url
+        self.description = description
+        self.duration = duration
+        self.genres = genres
+        self.rating = rating
+        self.director = director
+        self.year = year
+        self.url = url
+        self.city = city
+        self.showtimes = showtimes if showtimes is not None else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {field: getattr(self, field) for field in self.__slots__}
+        data["showtimes"] = [s.to_dict() for s in self.showtimes]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MovieRecord":
+        """
+        Build a record from a movie dict, accepting the legacy key names
+
+        Args:
+            data (Dict[str, Any]): Movie data as built by older scrapers
+
+        Returns:
+            MovieRecord: Record with unknown keys dropped
+        """
+        fields = {}
+        for key, value in data.items():
+            key = _LEGACY_KEYS.get(key, key)
+            if key in cls.__slots__ and key != "showtimes" and fields.get(key) is None:
+                fields[key] = value
+        showtimes = [s if isinstance(s, ShowtimeRecord) else ShowtimeRecord.from_dict(s)
+                     for s in data.get("showtimes", [])]
+        return cls(showtimes=showtimes, **fields)
+
+
+ScrapedMovie = Union[MovieRecord, Dict[str, Any]]
+
+
+def as_record(movie: ScrapedMovie) -> MovieRecord:
+    """Get the record of a movie yielded by a scraper as a record or a dict"""
+    return movie if isinstance(movie, MovieRecord) else MovieRecord.from_dict(movie)
+
+
+_adapter = None
+
+
+def _movie_list_adapter():
+    """Build the list validator on first use (pydantic schema building is slow)"""
+    global _adapter
+    if _adapter is None:
+        from pydantic import TypeAdapter
+
+        from models.movie import Movie
+        _adapter = TypeAdapter(List[Movie])
+    return _adapter
+
+
+def validate_movies(movies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Validate a batch of scraped movies in one pass
+
+    The whole batch goes through a single pydantic list validation against
+    models.movie.Movie. Movies failing validation are logged and dropped;
+    the rest are kept.
+
+    Args:
+        movies (List[Dict[str, Any]]): Movie data, as built by MovieRecord.to_dict
+
+    Returns:
+        List[Dict[str, Any]]: Validated movie data, with coerced types
+    """
+    from pydantic import ValidationError
+
+    # Showtimes whose text holds no time cannot be stored in the TIME column
+    for movie in movies:
+        showtimes = movie.get("showtimes") or []
+        timed = [s for s in showtimes if s.get("start_minute") is not None]
+        if len(timed) < len(showtimes):
+            logger.warning(
+                f"Dropping {len(showtimes) - len(timed)} showtimes without a time "
+                f"of {movie.get('title')!r}: "
+                f"{[s.get('time_text') for s in showtimes if s.get('start_minute') is None]}")
+            movie["showtimes"] = timed
+
+    adapter = _movie_list_adapter()
+    try:
+        validated = adapter.validate_python(movies)
+    except ValidationError as e:
+        errors = e.errors()
+        invalid = {error["loc"][0] for error in errors}
+        for index in sorted(invalid):
+            logger.warning(
+                f"Dropping invalid movie {movies[index].get('title')!r}: "
+                f"{[err['msg'] for err in errors if err['loc'][0] == index]}")
+        validated = adapter.validate_python(
+            [movie for i, movie in enumerate(movies) if i not in invalid])
+
+    return adapter.dump_python(
+        validated, exclude={"__all__": {"created_at", "updated_at"}})
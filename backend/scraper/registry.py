@@ -0,0 +1,209 @@
+"""
+Config-driven scraper registry
+
+Scrapers are declared in a JSON file (``scrapers.json`` next to the backend
+package, or the path in the SCRAPERS_CONFIG environment variable) together
+with their budgets. Only enabled scrapers are imported and instantiated, so a
+disabled entry costs nothing at runtime.
+"""
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from scraper.base_scraper import BaseScraper
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scrapers.json")
+
+
+class ScraperConfig(BaseModel):
+    """Configuration and budgets for a single scraper"""
+    model_config = ConfigDict(populate_by_name=True)
+
+    name: str
+    class_path: str = Field(alias="class")
+    base_url: Optional[str] = None
+    enabled: bool = True
+    # Maximum number of units (cinemas) scraped in parallel
+    concurrency: int = 1
+    # Rate limit for requests to the site, None for unlimited
+    requests_per_minute: Optional[float] = None
+    # Timeout in seconds for a single page fetch
+    timeout: float = 30.0
+    # Minimum minutes between two scrapes of the same date
+    refresh_interval_minutes: int = 0
+    # Number of days ahead the site publishes showtimes, None for no limit
+    days_ahead: Optional[int] = None
+    # Extra keyword arguments passed to the scraper constructor
+    options: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ScraperRegistry:
+    """
+    Registry of configured scrapers
+    """
+
+    def __init__(self, configs: List[ScraperConfig]):
+        self.configs = {config.name: config for config in configs}
+        self._instances: Dict[str, BaseScraper] = {}
+        self._last_refreshed: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "ScraperRegistry":
+        """
+        Load the registry from a JSON configuration file
+
+        Args:
+            path (str, optional): Config file path. Defaults to SCRAPERS_CONFIG
+                                  or scrapers.json in the backend directory.
+
+        Returns:
+            ScraperRegistry: Registry with the configured scrapers
+        """
+        path = path or os.getenv("SCRAPERS_CONFIG") or DEFAULT_CONFIG_PATH
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        configs = [ScraperConfig.model_validate(entry)
+                   for entry in data.get("scrapers", [])]
+        logger.info(
+            f"Loaded {len(configs)} scraper configs from {path} "
+            f"({sum(c.enabled for c in configs)} enabled)")
+        return cls(configs)
+
+    def enabled_configs(self) -> List[ScraperConfig]:
+        """Get the configs of all enabled scrapers"""
+        return [config for config in self.configs.values() if config.enabled]
+
+    def horizon(self) -> Optional[int]:
+        """
+        Get the number of days ahead any enabled scraper publishes showtimes
+
+        Returns:
+            Optional[int]: Largest days_ahead of the enabled scrapers, None
+                           if one of them has no limit
+        """
+        horizons = [config.days_ahead for config in self.enabled_configs()]
+        if None in horizons:
+            return None
+        return max(horizons, default=0)
+
+    def get(self, name: str) -> BaseScraper:
+        """
+        Get the scraper instance for a registry name, creating it on first use
+
+        Args:
+            name (str): Registry name
+
+        Returns:
+            BaseScraper: Configured scraper instance
+        """
+        with self._lock:
+            if name not in self._instances:
+                config = self.configs[name]
+                if not config.enabled:
+                    raise ValueError(f"Scraper {name} is disabled")
+                self._instances[name] = self._create(config)
+            return self._instances[name]
+
+    def enabled_scrapers(self) -> List[BaseScraper]:
+        """Get instances of all enabled scrapers"""
+        return [self.get(config.name) for config in self.enabled_configs()]
+
+    def due_scrapers(self, date_str: str, force: bool = False) -> List[BaseScraper]:
+        """
+        Get the enabled scrapers that should refresh a date now
+
+        A scraper is skipped when the date is beyond its days_ahead horizon
+        or, unless forced, when it refreshed the date less than
+        refresh_interval_minutes ago.
+
+        Args:
+            date_str (str): Date in format YYYY-MM-DD
+            force (bool): Ignore the refresh interval (explicit triggers)
+
+        Returns:
+            List[BaseScraper]: Scrapers due for the date
+        """
+        days_until = (datetime.strptime(date_str, "%Y-%m-%d").date()
+                      - datetime.now().date()).days
+        now = time.time()
+
+        due = []
+        for config in self.enabled_configs():
+            if config.days_ahead is not None and days_until >= config.days_ahead:
+                logger.info(
+                    f"Skipping {config.name} for {date_str}: beyond {config.days_ahead} days ahead")
+                continue
+
+            last = self._last_refreshed.get((config.name, date_str))
+            if (not force and last is not None
+                    and now - last < config.refresh_interval_minutes * 60):
+                logger.info(
+                    f"Skipping {config.name} for {date_str}: refreshed recently")
+                continue
+
+            due.append(self.get(config.name))
+        return due
+
+    def mark_refreshed(self, name: str, date_str: str) -> None:
+        """Record that a scraper finished refreshing a date"""
+        self._last_refreshed[(name, date_str)] = time.time()
+
+    def close(self) -> None:
+        """Release the browsers and connections of every created scraper"""
+        with self._lock:
+            scrapers = list(self._instances.values())
+        for scraper in scrapers:
+            scraper.close()
+
+    @staticmethod
+    def _create(config: ScraperConfig) -> BaseScraper:
+        """Import and instantiate a scraper class from its config"""
+        module_name, class_name = config.class_path.rsplit(".", 1)
+        scraper_class = getattr(
+            importlib.import_module(module_name), class_name)
+
+        args = [config.base_url] if config.base_url else []
+        scraper = scraper_class(*args, **config.options)
+        scraper.configure(
+            name=config.name,
+            concurrency=config.concurrency,
+            timeout=config.timeout,
+            requests_per_minute=config.requests_per_minute,
+        )
+        return scraper
+
+
+_registry: Optional[ScraperRegistry] = None
+
+
+def get_registry() -> ScraperRegistry:
+    """
+    Get or create the process-wide scraper registry
+
+    Returns:
+        ScraperRegistry: Registry loaded from the configuration file
+    """
+    global _registry
+    if _registry is None:
+        _registry = ScraperRegistry.from_file()
+    return _registry
+
+
+def close_registry() -> None:
+    """Release the scrapers of the process-wide registry, if it was created"""
+    global _registry
+    registry, _registry = _registry, None
+    if registry is not None:
+        registry.close()
@@ -0,0 +1,207 @@
+"""
+Reports of scrape runs
+
+Each run of ScraperService builds a RunReport and stores it in the
+scrape_runs table (see ScrapeRunRepository), served by GET /scrape/runs so
+scraping performance can be compared across runs.
+
+Time is split into stages:
+- fetch, render, parse: recorded by the scrapers while a unit is scraped,
+  accounted to the unit through a context variable set by the pipeline;
+- enrich, store: spent by the writer on batches mixing several units, and
+  shared among the units of a batch in proportion to their movies.
+"""
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from scraper.units import ScrapeUnit
+
+STAGES = ("fetch", "render", "parse", "enrich", "store")
+
+PENDING = "pending"
+COMPLETED = "completed"
+FAILED = "failed"
+DEFERRED = "deferred"
+# Runs with failed or deferred units
+PARTIAL = "partial"
+
+
+@dataclass
+class UnitReport:
+    """
+    Work done for a unit
+
+    Attributes:
+        scraper (str): Scraper name
+        date (str): Date in format YYYY-MM-DD
+        cinema (str): Cinema of the unit, empty for whole-site units
+        status (str): PENDING, COMPLETED, FAILED or DEFERRED
+        seconds (float): Wall time of the scrape in its worker thread
+        stages (Dict[str, float]): Seconds per stage (see STAGES)
+        pages (int): Pages loaded
+        bytes (int): Size of the pages loaded, in characters of the decoded
+                     text (equal to bytes for ASCII pages)
+        errors (int): Pages that failed to load, and the unit's own failure
+        movies (int): Movies scraped
+        rows_written (int): Movies stored
+        error (str, optional): Why the unit failed
+    """
+    scraper: str
+    date: str
+    cinema: str = ""
+    status: str = PENDING
+    seconds: float = 0.0
+    stages: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(STAGES, 0.0))
+    pages: int = 0
+    bytes: int = 0
+    errors: int = 0
+    movies: int = 0
+    rows_written: int = 0
+    error: Optional[str] = None
+
+    def add(self, stage: Optional[str] = None, seconds: float = 0.0,
+            pages: int = 0, size: int = 0, errors: int = 0) -> None:
+        """Account time spent in a stage and pages loaded"""
+        if stage is not None:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.pages += pages
+        self.bytes += size
+        self.errors += errors
+
+
+_current_unit: ContextVar[Optional[UnitReport]] = ContextVar("scrape_unit_report", default=None)
+
+
+def set_current_unit(report: Optional[UnitReport]) -> None:
+    """
+    Account what the current task (and the threads it starts) records to a unit
+
+    Call from the task scraping the unit; sibling tasks are not affected.
+    """
+    _current_unit.set(report)
+
+
+def current_unit() -> Optional[UnitReport]:
+    """Get the report of the unit being scraped, None if not reported"""
+    return _current_unit.get()
+
+
+def record(stage: Optional[str] = None, seconds: float = 0.0,
+           pages: int = 0, size: int = 0, errors: int = 0) -> None:
+    """
+    Account time or pages to the unit being scraped, if it is reported
+
+    Args:
+        stage (str, optional): One of STAGES
+        seconds (float): Time spent in the stage
+        pages (int): Pages loaded
+        size (int): Size of the pages loaded
+        errors (int): Pages that failed to load
+    """
+    report = _current_unit.get()
+    if report is not None:
+        report.add(stage, seconds, pages, size, errors)
+
+
+class RunReport:
+    """
+    Report of a scrape run, built while the run progresses
+    """
+
+    def __init__(self, dates: List[str]):
+        """
+        Args:
+            dates (List[str]): Dates scraped by the run
+        """
+        self.dates = list(dates)
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.status = PENDING
+        self.written = 0
+        self.error: Optional[str] = None
+        self.units: Dict[Tuple[str, str, str], UnitReport] = {}
+
+    def unit(self, unit: ScrapeUnit) -> UnitReport:
+        """Get the report of a unit, created on first use"""
+        report = self.units.get(unit.key)
+        if report is None:
+            report = UnitReport(scraper=unit.scraper, date=unit.date, cinema=unit.cinema or "")
+            self.units[unit.key] = report
+        return report
+
+    def share(self, stage: str, seconds: float, movies_by_unit: Dict[Tuple[str, str, str], int]) -> None:
+        """
+        Share the time of a batch-level stage among the units of the batch
+
+        Args:
+            stage (str): "enrich" or "store"
+            seconds (float): Time spent on the batch
+            movies_by_unit (Dict[tuple, int]): Movies of each unit in the batch
+        """
+        total = sum(movies_by_unit.values())
+        for key, movies in movies_by_unit.items():
+            report = self.units.get(key)
+            if report is not None and total:
+                report.add(stage, seconds * movies / total)
+
+    def finish(self, written: int, error: Optional[str] = None) -> None:
+        """
+        Close the report
+
+        Args:
+            written (int): Movies written by the run
+            error (str, optional): Why the run itself failed
+        """
+        self.finished_at = datetime.now(timezone.utc)
+        self.written = written
+        self.error = error
+        statuses = {report.status for report in self.units.values()}
+        if error is not None:
+            self.status = FAILED
+        else:
+            self.status = COMPLETED if statuses <= {COMPLETED} else PARTIAL
+
+    @property
+    def seconds(self) -> float:
+        """Wall time of the run so far"""
+        end = self.finished_at or datetime.now(timezone.utc)
+        return (end - self.started_at).total_seconds()
+
+    def scrapers(self) -> Dict[str, Dict[str, Any]]:
+        """Totals of the units of each scraper"""
+        totals: Dict[str, Dict[str, Any]] = {}
+        for report in self.units.values():
+            total = totals.setdefault(report.scraper, {
+                "units": 0, "failed": 0, "deferred": 0, "seconds": 0.0,
+                "stages": dict.fromkeys(STAGES, 0.0),
+                "pages": 0, "bytes": 0, "errors": 0, "movies": 0, "rows_written": 0,
+            })
+            total["units"] += 1
+            total["failed"] += report.status == FAILED
+            total["deferred"] += report.status == DEFERRED
+            for name in ("seconds", "pages", "bytes", "errors", "movies", "rows_written"):
+                total[name] += getattr(report, name)
+            for stage, seconds in report.stages.items():
+                total["stages"][stage] = total["stages"].get(stage, 0.0) + seconds
+        return totals
+
+    def to_row(self) -> Dict[str, Any]:
+        """Render the report as a scrape_runs row"""
+        scrapers = self.scrapers()
+        return {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "dates": self.dates,
+            "status": self.status,
+            "seconds": round(self.seconds, 3),
+            "written": self.written,
+            "pages": sum(total["pages"] for total in scrapers.values()),
+            "errors": sum(total["errors"] for total in scrapers.values()),
+            "report": {
+                "error": self.error,
+                "scrapers": scrapers,
+                "units": [asdict(report) for report in self.units.values()],
+            },
+        }
@@ -1,95 +1,323 @@
+import argparse
 import logging
 import asyncio
+import os
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional, Tuple
 
 # Import database repository
-from models.repository import MovieRepository
+from models.repository import FilmRepository, FreshnessRepository, MovieWriter, ScrapeRunRepository
 
-# Import scrapers
-from scraper.cinema_scraper import CinemaScraper
-from scraper.uci_cinemas_scraper import UCICinemasScraper
-from scraper.spaziocinema_scraper import SpaziocinemaInfoScraper
+# Import scraping machinery; scraper classes are loaded by the registry
+from scraper.base_scraper import BaseScraper
+from scraper.checkpoint import CheckpointStore
+from scraper.enrichment import Enricher
+from scraper.pipeline import ScrapePipeline, UnitResult
+from scraper.registry import ScraperRegistry, close_registry, get_registry
+from scraper.report import RunReport
+from scraper.units import ScrapeUnit
+from scraper.work_queue import WorkQueue
+from monitoring.profiling import SCRAPE_STAGES, profile
 
 logger = logging.getLogger(__name__)
 
+# Receives progress events: ("scrape", {...}) and ("data", {"date": ...})
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+# Units checkpointed more recently than this are skipped when resuming
+DEFAULT_FRESHNESS_MINUTES = float(os.getenv("SCRAPE_RESUME_FRESHNESS_MINUTES", "720"))
+
+# Runs are profiled into this directory when set (see monitoring/profiling.py)
+DEFAULT_PROFILE_DIR = os.getenv("SCRAPE_PROFILE_DIR") or None
+DEFAULT_PROFILER = os.getenv("SCRAPE_PROFILER", "sample")
+
+
+@dataclass
+class ScrapeRunResult:
+    """Outcome of a scrape run"""
+    written: int = 0
+    # Units whose movies were all stored
+    completed: List[UnitResult] = field(default_factory=list)
+    # Keys of units whose scraper raised or whose movies failed to store
+    failed: List[Tuple[str, str, str]] = field(default_factory=list)
+    # Units not reached within the time budget, left for the next run
+    deferred: List[ScrapeUnit] = field(default_factory=list)
+    # Timings, pages and outcome per scraper and unit, stored in scrape_runs
+    report: Optional[RunReport] = None
+
 
 class ScraperService:
     """
     Service to manage scraping operations from different cinema websites
     """
 
-    def __init__(self):
+    def __init__(self, registry: Optional[ScraperRegistry] = None,
+                 checkpoints: Optional[CheckpointStore] = None,
+                 enricher: Optional[Enricher] = None,
+                 progress: Optional[ProgressCallback] = None,
+                 profile_dir: Optional[str] = DEFAULT_PROFILE_DIR,
+                 profiler: str = DEFAULT_PROFILER):
         # No need to store DB instance, we'll get client when needed
-        self.scrapers = [
-            # Real cinema website scrapers
-            UCICinemasScraper("https://ucicinemas.it"),
-            SpaziocinemaInfoScraper("https://www.spaziocinema.info"),
-
-            # Example scrapers (for testing)
-            CinemaScraper("https://www.example-cinema.com"),
+        # Scrapers and their budgets come from scrapers.json (see registry.py);
+        # add a new cinema website by adding an entry there
+        self.registry = registry or get_registry()
+        # Every stored unit is checkpointed so interrupted runs can resume
+        self.checkpoints = checkpoints or CheckpointStore()
+        # Film page details are fetched once per film and cached on disk
+        self.enricher = enricher or Enricher()
+        # Scrape progress and changed dates, e.g. for the API's event stream
+        self.progress = progress
+        # Directory receiving a profile of each run, None to not profile
+        self.profile_dir = profile_dir
+        self.profiler = profiler
 
-            # Add more cinema websites as needed
-            # Create a new scraper class for each cinema chain with unique HTML structure
-        ]
+    @property
+    def scrapers(self) -> List[BaseScraper]:
+        """Instances of all enabled scrapers"""
+        return self.registry.enabled_scrapers()
 
-    async def scrape_all_cinemas(self, date_str: str = None) -> None:
+    async def scrape_all_cinemas(self, date_str: str = None, resume: bool = False,
+                                 freshness_minutes: float = DEFAULT_FRESHNESS_MINUTES,
+                                 budget_seconds: Optional[float] = None,
+                                 force: bool = False) -> int:
         """
         Scrape all cinemas for a specific date
 
         Args:
             date_str (str, optional): Date in format YYYY-MM-DD. 
                                       If None, today's date is used.
+            resume (bool): Skip units checkpointed within the freshness window
+            freshness_minutes (float): Freshness window used when resuming
+            budget_seconds (float, optional): Time budget for the run
+            force (bool): Scrape even if the date was refreshed recently
+
+        Returns:
+            int: Number of movies written to the database
         """
         if date_str is None:
             date_str = datetime.now().strftime("%Y-%m-%d")
 
-        logger.info(f"Starting scraping for date {date_str}")
-
-        all_movies = []
-
-        for scraper in self.scrapers:
-            try:
-                logger.info(f"Starting scraping with {scraper.__class__.__name__} for date {date_str}")
-                movies = scraper.get_movies_for_date(date_str)
-                
-                if movies:
-                    logger.info(f"Successfully scraped {len(movies)} movies from {scraper.__class__.__name__}")
-                    all_movies.extend(movies)
-                else:
-                    logger.warning(f"No movies found from {scraper.__class__.__name__} for date {date_str}")
-            except Exception as e:
-                logger.error(
-                    f"Error scraping with {scraper.__class__.__name__}: {str(e)}", exc_info=True)
-
-        if all_movies:
-            # Store movies in database using repository
-            for movie in all_movies:
+        result = await self.run([date_str], resume, freshness_minutes, budget_seconds, force)
+        return result.written
+
+    async def schedule_daily_scraping(self, days_ahead: int = 7, resume: bool = False,
+                                      freshness_minutes: float = DEFAULT_FRESHNESS_MINUTES,
+                                      budget_seconds: Optional[float] = None,
+                                      force: bool = False) -> ScrapeRunResult:
+        """
+        Schedule scraping for the next N days
+
+        All days are scraped in a single prioritized run, nearest date first.
+
+        Args:
+            days_ahead (int): Number of days to scrape ahead
+            resume (bool): Skip units checkpointed within the freshness window,
+                           so an interrupted run only redoes the remaining work
+            freshness_minutes (float): Freshness window used when resuming
+            budget_seconds (float, optional): Time budget for the whole run
+            force (bool): Scrape even the dates refreshed recently
+
+        Returns:
+            ScrapeRunResult: Outcome of the run
+        """
+        today = datetime.now()
+        dates = [(today + timedelta(days=i)).strftime("%Y-%m-%d")
+                 for i in range(days_ahead)]
+
+        logger.info(f"Scheduling scrape for {', '.join(dates)}")
+        return await self.run(dates, resume, freshness_minutes, budget_seconds, force)
+
+    async def run(self, dates: List[str], resume: bool = False,
+                  freshness_minutes: float = DEFAULT_FRESHNESS_MINUTES,
+                  budget_seconds: Optional[float] = None,
+                  force: bool = False) -> ScrapeRunResult:
+        """
+        Scrape several dates in one run, most valuable units first
+
+        Units are ordered by date, then by how many original-language
+        showtimes and movies their cinema had when last scraped. With a time
+        budget, everything stored before the deadline is kept and the
+        remaining units are reported as deferred; they are not checkpointed,
+        so the next run (or a resumed one) picks them up.
+
+        A scraper only counts as having refreshed a date (see
+        ScraperRegistry.due_scrapers) when at least one of its units for the
+        date was stored and none failed or was deferred.
+
+        Every run, even a failed one, stores a report of its timings per
+        scraper and unit in scrape_runs (see scraper.report).
+
+        Args:
+            dates (List[str]): Dates in format YYYY-MM-DD
+            resume (bool): Skip units checkpointed within the freshness window
+            freshness_minutes (float): Freshness window used when resuming
+            budget_seconds (float, optional): Time budget for the whole run
+            force (bool): Ignore the scrapers' refresh intervals
+
+        Returns:
+            ScrapeRunResult: Outcome of the run
+        """
+        report = RunReport(dates)
+        try:
+            if not self.profile_dir:
+                result = await self._run(
+                    dates, resume, freshness_minutes, budget_seconds, force, report)
+            else:
+                with profile(self.profile_dir, f"scrape-{dates[0] if dates else 'none'}",
+                             self.profiler, stages=SCRAPE_STAGES):
+                    result = await self._run(
+                        dates, resume, freshness_minutes, budget_seconds, force, report)
+        except Exception as e:
+            report.finish(0, error=str(e))
+            await self._save_report(report)
+            raise
+
+        report.finish(result.written)
+        await self._save_report(report)
+        result.report = report
+        return result
+
+    async def _save_report(self, report: RunReport) -> None:
+        """Store the report of a run, never failing the run"""
+        try:
+            await ScrapeRunRepository.save_run(report.to_row())
+        except Exception as e:
+            logger.error(f"Error storing the report of the run of {report.dates}: {e}")
+
+    async def _run(self, dates: List[str], resume: bool,
+                   freshness_minutes: float, budget_seconds: Optional[float],
+                   force: bool, report: RunReport) -> ScrapeRunResult:
+        """Implementation of run"""
+        started = time.monotonic()
+        work: Dict[str, Tuple[BaseScraper, List[ScrapeUnit]]] = {}
+        self._emit("scrape", {"status": "started", "dates": dates})
+
+        for date_str in dates:
+            logger.info(f"Starting scraping for date {date_str}")
+            for scraper in self.registry.due_scrapers(date_str, force):
+                logger.info(
+                    f"Starting scraping with {scraper.name} for date {date_str}")
                 try:
-                    # Make sure date is consistent
-                    movie["date"] = date_str
-                    # Use repository to insert or update movie
-                    await MovieRepository.insert_or_update_movie(movie)
+                    units = await asyncio.to_thread(scraper.list_units, date_str)
                 except Exception as e:
-                    logger.error(f"Error storing movie {movie['title']}: {e}")
+                    logger.error(
+                        f"Error listing units with {scraper.name}: {str(e)}", exc_info=True)
+                    continue
+                if resume:
+                    units = self.checkpoints.filter_stale(units, freshness_minutes)
+                work.setdefault(scraper.name, (scraper, []))[1].extend(units)
+
+        history = await asyncio.to_thread(self.checkpoints.cinema_history)
+        for _, units in work.values():
+            units.sort(key=lambda unit: self._priority(unit, history))
+
+        remaining = None
+        if budget_seconds is not None:
+            remaining = budget_seconds - (time.monotonic() - started)
+
+        # Stream movies from every scraper into batched database writes
+        async def unit_done(result: UnitResult) -> None:
+            await self.checkpoints.record_async(result)
+            self._emit("scrape", {"status": "unit_done", "unit": list(result.unit.key),
+                                  "movies": result.movies})
+
+        pipeline = ScrapePipeline(MovieWriter(),
+                                  on_unit_done=unit_done,
+                                  enricher=self.enricher,
+                                  film_writer=FilmRepository.upsert_films)
+        # Browsers stay pooled in the registry's scrapers across runs; the
+        # registry owner releases them (close_registry)
+        written = await pipeline.run_units(list(work.values()), budget_seconds=remaining,
+                                           report=report)
+
+        # An empty unit list (e.g. a cinema list that failed to load) or a
+        # failed unit must not mute the scraper for its refresh interval
+        refreshed = {(result.unit.scraper, result.unit.date)
+                     for result in pipeline.completed_units}
+        unfinished = {(unit.scraper, unit.date) for unit in pipeline.deferred_units}
+        unfinished |= {(scraper, date) for scraper, _, date in pipeline.failed_units}
+        for name, date_str in refreshed - unfinished:
+            self.registry.mark_refreshed(name, date_str)
 
-            logger.info(f"Updated {len(all_movies)} movies in database")
+        # Lets the API stop refreshing the dates on demand (see api.refresh)
+        fresh_dates = sorted({date_str for _, date_str in refreshed - unfinished})
+        try:
+            await FreshnessRepository.mark_refreshed(fresh_dates)
+        except Exception as e:
+            logger.error(f"Error recording freshness of {fresh_dates}: {e}")
 
-    async def schedule_daily_scraping(self, days_ahead: int = 7) -> None:
+        if pipeline.deferred_units:
+            logger.warning(
+                f"Time budget exhausted: deferred {len(pipeline.deferred_units)} units "
+                f"to the next run: {[unit.key for unit in pipeline.deferred_units]}")
+
+        logger.info(f"Updated {written} movies in database")
+        self._emit("scrape", {
+            "status": "finished", "written": written,
+            "completed": len(pipeline.completed_units),
+            "failed": len(pipeline.failed_units),
+            "deferred": len(pipeline.deferred_units),
+        })
+        # Dates whose stored showtimes may have changed
+        now = datetime.utcnow().isoformat()
+        for date_str in sorted({result.unit.date for result in pipeline.completed_units}):
+            self._emit("data", {"date": date_str, "updated_at": now})
+
+        return ScrapeRunResult(
+            written=written,
+            completed=pipeline.completed_units,
+            failed=sorted(pipeline.failed_units),
+            deferred=pipeline.deferred_units,
+        )
+
+    def _emit(self, name: str, data: Dict[str, Any]) -> None:
+        """Report progress, never letting a listener break the run"""
+        if self.progress is None:
+            return
+        try:
+            self.progress(name, data)
+        except Exception as e:
+            logger.error(f"Error reporting scrape progress: {e}")
+
+    @staticmethod
+    def _priority(unit: ScrapeUnit, history: Dict[Tuple[str, str], Dict]) -> tuple:
+        """Sort key putting near dates and busy, original-language cinemas first"""
+        last = history.get((unit.scraper, unit.cinema), {})
+        return (unit.date, -last.get("original_showtimes", 0),
+                -last.get("movies", 0), unit.cinema)
+
+    async def publish_units(self, queue: WorkQueue, days_ahead: int = 7) -> int:
         """
-        Schedule scraping for the next N days
+        Publish the units for the next N days to a shared work queue
+
+        Workers (see scraper/worker.py) lease and scrape the units, so the
+        run can be spread over several processes or machines.
 
         Args:
+            queue (WorkQueue): Queue shared with the workers
             days_ahead (int): Number of days to scrape ahead
+
+        Returns:
+            int: Number of units published
         """
         today = datetime.now()
+        published = 0
 
         for i in range(days_ahead):
-            date = today + timedelta(days=i)
-            date_str = date.strftime("%Y-%m-%d")
+            date_str = (today + timedelta(days=i)).strftime("%Y-%m-%d")
+            for scraper in self.registry.due_scrapers(date_str):
+                try:
+                    units = await asyncio.to_thread(scraper.list_units, date_str)
+                except Exception as e:
+                    logger.error(
+                        f"Error listing units with {scraper.name}: {str(e)}", exc_info=True)
+                    continue
+                published += await asyncio.to_thread(queue.publish, units)
 
-            logger.info(f"Scheduling scrape for {date_str}")
-            await self.scrape_all_cinemas(date_str)
+        logger.info(f"Published {published} units for {days_ahead} days")
+        return published
 
 
 if __name__ == "__main__":
@@ -99,6 +327,26 @@ if __name__ == "__main__":
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
 
+    parser = argparse.ArgumentParser(description="Scrape the next days")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip units completed within the freshness window")
+    parser.add_argument("--freshness-minutes", type=float,
+                        default=DEFAULT_FRESHNESS_MINUTES)
+    parser.add_argument("--budget-minutes", type=float,
+                        help="Stop starting new units after this many minutes")
+    parser.add_argument("--force", action="store_true",
+                        help="Ignore the scrapers' refresh intervals")
+    parser.add_argument("--profile", metavar="DIR", default=DEFAULT_PROFILE_DIR,
+                        help="Profile the run, writing the artifacts to DIR")
+    parser.add_argument("--profiler", choices=["sample", "cprofile"], default=DEFAULT_PROFILER)
+    args = parser.parse_args()
+
     # Run the scraper service
-    scraper_service = ScraperService()
-    asyncio.run(scraper_service.schedule_daily_scraping())
\ No newline at end of file
+    scraper_service = ScraperService(profile_dir=args.profile, profiler=args.profiler)
+    try:
+        asyncio.run(scraper_service.schedule_daily_scraping(
+            args.days, args.resume, args.freshness_minutes,
+            args.budget_minutes * 60 if args.budget_minutes else None, args.force))
+    finally:
+        close_registry()
\ No newline at end of file
@@ -1,37 +1,112 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 from bs4 import BeautifulSoup
 import re
 import logging
+import time
 from datetime import datetime
-from models.movie import Showtime
-from scraper.base_scraper import BaseScraper
+from scraper.base_scraper import BaseScraper, ScrapeError
+from scraper.records import MovieRecord, ShowtimeRecord
+from scraper.units import ScrapeUnit
 
 logger = logging.getLogger(__name__)
 
 
 class SpaziocinemaInfoScraper(BaseScraper):
     """
-    Scraper for Spazio Cinema Milano (https://www.spaziocinema.info/milano)
+    Scraper for Spazio Cinema (https://www.spaziocinema.info), one unit per city
     """
 
-    def __init__(self, base_url: str = "https://www.spaziocinema.info"):
+    def __init__(self, base_url: str = "https://www.spaziocinema.info",
+                 cities: Optional[List[str]] = None):
+        """
+        Args:
+            base_url (str): Site URL
+            cities (List[str], optional): City slugs to scrape, default ["milano"]
+        """
         super().__init__(base_url)
-        self.city = "milano"
-        self.theater_name = "Spazio Cinema Milano"
+        self.cities = [city.lower() for city in (cities or ["milano"])]
 
     def get_movies_for_date(self, date: str) -> List[Dict[str, Any]]:
+        """
+        Get the movies of every configured city for a specific date
+
+        Args:
+            date (str): Date in format YYYY-MM-DD
+
+        Returns:
+            List[Dict[str, Any]]: List of movie data
+        """
+        return [movie.to_dict() for movie in self.iter_movies_for_date(date)]
+
+    def iter_movies_for_date(self, date: str) -> Iterator[MovieRecord]:
+        """Yield movies city by city for a specific date"""
+        for unit in self.list_units(date):
+            yield from self.scrape_unit(unit)
+
+    def list_units(self, date: str) -> List[ScrapeUnit]:
+        """
+        Get one unit per city, so cities are scraped concurrently
+
+        Args:
+            date (str): Date in format YYYY-MM-DD
+
+        Returns:
+            List[ScrapeUnit]: Units keyed by city slug
+        """
+        return [
+            ScrapeUnit(scraper=self.name, date=date, cinema=city, meta={"city": city})
+            for city in self.cities
+        ]
+
+    def scrape_unit(self, unit: ScrapeUnit) -> Iterator[MovieRecord]:
+        """
+        Yield the movies showing in the unit's city on the unit's date
+
+        The city comes from the unit rather than the scraper, so units of
+        several cities can run in parallel on one scraper instance.
+
+        Args:
+            unit (ScrapeUnit): Unit returned by list_units
+
+        Yields:
+            MovieRecord: Movie data, with the city set
+        """
+        yield from self._get_city_movies(unit.meta.get("city", unit.cinema), unit.date)
+
+    def set_city(self, city: str) -> None:
+        """Scrape a single city (kept for callers of the single-city API)"""
+        self.cities = [city.lower()]
+
+    def _get_city_movies(self, city: str, date: str) -> List[MovieRecord]:
+        """
+        Get the movies showing in a city on a date
+
+        Args:
+            city (str): City slug, as in https://www.spaziocinema.info/milano
+            date (str): Date in format YYYY-MM-DD
+
+        Returns:
+            List[MovieRecord]: List of movie data
+
+        Raises:
+            ScrapeError: If the programme page could not be fetched
+        """
         date_obj = datetime.strptime(date, "%Y-%m-%d")
         formatted_date = date_obj.strftime("%d-%m-%Y")
-        url = f"{self.base_url}/{self.city}/programmazione?data={formatted_date}"
+        url = f"{self.base_url}/{city}/programmazione?data={formatted_date}"
+        city_name = city.replace("-", " ").title()
+        theater_name = f"Spazio Cinema {city_name}"
 
         logger.info(f"Scraping movies from {url}")
         html_content = self.get_page_with_selenium(url)
         if not html_content:
-            logger.error("Failed to retrieve page content.")
-            return []
+            raise ScrapeError(f"Failed to retrieve {url}")
 
+        parse_started = time.perf_counter()
         soup = BeautifulSoup(html_content, 'lxml')
         movie_sections = soup.select('.movie-list .movie-card')
+        theater_ref = self.theater_ref(
+            city, theater_name, city=city_name, website=f"{self.base_url}/{city}")
 
         movies = []
 
@@ -83,37 +158,44 @@ class SpaziocinemaInfoScraper(BaseScraper):
                         booking_url = f"{self.base_url}{link['href']}" if link['href'].startswith(
                             "/") else link['href']
 
-                    showtimes.append({
-                        "time": time_text,
-                        "theater": self.theater_name,
-                        "room": "Sala standard",
-                        "is_original_language": is_original,
-                        "is_3d": is_3d,
-                        "booking_url": booking_url,
-                    })
+                    showtimes.append(ShowtimeRecord(
+                        time=time_text,
+                        theater=theater_name,
+                        room="Sala standard",
+                        is_original_language=is_original,
+                        is_3d=is_3d,
+                        booking_url=booking_url,
+                        theater_ref=theater_ref,
+                    ))
+
+                # Film page, fetched once per film by the enrichment stage
+                link_elem = section.select_one(".movie-title a[href], a.movie-link[href]")
+                movie_url = None
+                if link_elem:
+                    movie_url = f"{self.base_url}{link_elem['href']}" if link_elem['href'].startswith(
+                        "/") else link_elem['href']
 
                 if showtimes:
-                    movies.append({
-                        "title": title,
-                        "original_title": original_title,
-                        "date": date,
-                        "image_url": image_url,
-                        "description": description,
-                        "duration": duration,
-                        "genres": genres or None,
-                        "rating": None,
-                        "showtimes": showtimes,
-                    })
+                    movies.append(MovieRecord(
+                        title=title,
+                        original_title=original_title,
+                        date=date,
+                        image_url=image_url,
+                        description=description,
+                        duration=duration,
+                        genres=genres or None,
+                        showtimes=showtimes,
+                        url=movie_url,
+                        city=city_name,
+                    ))
             except Exception as e:
                 logger.error(f"Error parsing movie section: {e}")
                 continue
 
-        logger.info(f"Extracted {len(movies)} movies for {date}")
+        self.record_stage("parse", time.perf_counter() - parse_started)
+        logger.info(f"Extracted {len(movies)} movies in {city_name} for {date}")
         return movies
 
-    def set_city(self, city: str) -> None:
-        self.city = city.lower()
-
     def get_movie_details(self, movie_url: str) -> Dict[str, Any]:
         logger.info(f"Fetching movie details from {movie_url}")
         html_content = self.get_page_content(movie_url)
@@ -123,12 +205,15 @@ class SpaziocinemaInfoScraper(BaseScraper):
         soup = BeautifulSoup(html_content, 'lxml')
         details = {}
 
-        # Extract director, cast, country, year
+        # Extract director, cast, country, year and the original title
         mappings = {
             'director': ['.regia', '.director'],
             'cast': ['.cast'],
             'country': ['.paese', '.country'],
-            'year': ['.anno', '.year']
+            'year': ['.anno', '.year'],
+            'original_title': ['.titolo-originale', '.original-title'],
+            'duration': ['.durata', '.duration'],
+            'genres': ['.genere', '.genre'],
         }
 
         for key, selectors in mappings.items():
@@ -138,9 +223,18 @@ class SpaziocinemaInfoScraper(BaseScraper):
                     text = elem.text.strip()
                     if key == 'year':
                         match = re.search(r'\d{4}', text)
-                        details[key] = match.group(0) if match else None
+                        details[key] = int(match.group(0)) if match else None
+                    elif key == 'duration':
+                        match = re.search(r'(\d+)', text)
+                        details[key] = int(match.group(1)) if match else None
+                    elif key == 'genres':
+                        details[key] = [g.strip() for g in re.split(r',|/', text) if g.strip()]
                     else:
                         details[key] = text
                     break
 
         return details
+
+    def get_film_details(self, url: str) -> Dict[str, Any]:
+        """Film page details used by the enrichment stage"""
+        return self.get_movie_details(url)
@@ -0,0 +1,52 @@
+"""
+Showtime time parsing
+
+Cinema pages show times as free text ("20:30", "ore 20.30 V.O.", "20h30").
+Times are parsed into minutes since the start of the cinema day, so they
+sort and compare as integers. Screenings after midnight belong to the
+previous day's programme, so times before CINEMA_DAY_START_HOUR count past
+24:00 (00:30 becomes 1470).
+"""
+import re
+from typing import Optional
+
+CINEMA_DAY_START_HOUR = 5
+MINUTES_PER_DAY = 24 * 60
+
+_TIME = re.compile(r"(?<!\d)([01]?\d|2[0-3])\s*[:.hH]\s*([0-5]\d)(?!\d)")
+
+
+def parse_minute(text: Optional[str]) -> Optional[int]:
+    """
+    Parse the first time in a text into minutes of the cinema day
+
+    Args:
+        text (str): Time text as shown by the cinema
+
+    Returns:
+        Optional[int]: Minutes since midnight, past 1440 for after-midnight
+                       screenings, None if the text holds no time
+    """
+    if not text:
+        return None
+    match = _TIME.search(text)
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if hour < CINEMA_DAY_START_HOUR:
+        hour += 24
+    return hour * 60 + minute
+
+
+def format_minute(minute: int) -> str:
+    """
+    Format minutes of the cinema day as a wall-clock HH:MM time
+
+    Args:
+        minute (int): Minutes as returned by parse_minute
+
+    Returns:
+        str: Time in format HH:MM
+    """
+    minute %= MINUTES_PER_DAY
+    return f"{minute // 60:02d}:{minute % 60:02d}"
@@ -1,7 +1,9 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from bs4 import BeautifulSoup
-from models.movie import Showtime
-from scraper.base_scraper import BaseScraper
+from scraper.base_scraper import BaseScraper, ScrapeError
+from scraper.matching import merge_movies
+from scraper.records import MovieRecord, ShowtimeRecord
+from scraper.units import ScrapeUnit
 import logging
 import re
 from datetime import datetime, timedelta
@@ -21,10 +23,15 @@ class UCICinemasScraper(BaseScraper):
     https://ucicinemas.it/
     """
 
-    def __init__(self, base_url: str = "https://ucicinemas.it"):
+    def __init__(self, base_url: str = "https://ucicinemas.it", max_cinemas: Optional[int] = 3):
         super().__init__(base_url)
         self.cinema_list_url = f"{self.base_url}/cinema"
         self.films_list_url = f"{self.base_url}/film"
+        # Limit the number of cinemas to avoid too many requests (None for all)
+        self.max_cinemas = max_cinemas
+        # The cinema list rarely changes; cache it so multi-day runs render it once
+        self.cinema_list_ttl = 3600
+        self._cinemas_cache: Optional[Tuple[float, List[Dict[str, str]]]] = None
 
     def get_movies_for_date(self, date: str) -> List[Dict[str, Any]]:
         """
@@ -36,40 +43,85 @@ class UCICinemasScraper(BaseScraper):
         Returns:
             List[Dict[str, Any]]: List of movie data
         """
-        # First, get the list of cinemas
-        cinemas = self._get_all_cinemas()
-        logger.info(f"Found {len(cinemas)} UCI cinema locations")
+        # Deduplicate movies by title and add theater information
+        unique_movies = self._deduplicate_movies(
+            [movie.to_dict() for movie in self.iter_movies_for_date(date)])
 
-        # Convert date string to required format for UCI Cinemas
-        date_obj = datetime.strptime(date, "%Y-%m-%d")
+        logger.info(
+            f"Scraped {len(unique_movies)} unique movies from UCI Cinemas")
+        return unique_movies
 
-        # List to store all movie data
-        all_movies = []
+    def iter_movies_for_date(self, date: str) -> Iterator[MovieRecord]:
+        """
+        Yield movies cinema by cinema for a specific date
 
-        # For each cinema, get its showtimes
-        for cinema in cinemas[:3]:  # Limit to 3 cinemas to avoid too many requests
-            cinema_id = cinema["id"]
-            cinema_name = cinema["name"]
-            cinema_url = cinema["url"]
+        Movies are not deduplicated across cinemas here; the same title
+        is yielded once per cinema showing it.
 
-            logger.info(f"Scraping movies from {cinema_name} for date {date}")
+        Args:
+            date (str): Date in format YYYY-MM-DD
 
-            # Get showtimes for this cinema on the specified date
-            movies = self._get_cinema_showtimes(
-                cinema_url, cinema_name, date_obj)
+        Yields:
+            MovieRecord: Movie data for a single cinema
+        """
+        for unit in self.list_units(date):
+            yield from self.scrape_unit(unit)
 
-            # Add all movies from this cinema to our list
-            all_movies.extend(movies)
+    def list_units(self, date: str) -> List[ScrapeUnit]:
+        """
+        Get one unit per UCI cinema for a specific date
 
-            # Sleep to avoid overloading the server
-            time.sleep(1)
+        Args:
+            date (str): Date in format YYYY-MM-DD
 
-        # Deduplicate movies by title and add theater information
-        unique_movies = self._deduplicate_movies(all_movies)
+        Returns:
+            List[ScrapeUnit]: Units keyed by cinema ID
+        """
+        # First, get the list of cinemas
+        if self._cinemas_cache and time.monotonic() - self._cinemas_cache[0] < self.cinema_list_ttl:
+            cinemas = self._cinemas_cache[1]
+        else:
+            cinemas = self._get_all_cinemas()
+            logger.info(f"Found {len(cinemas)} UCI cinema locations")
+            if cinemas:
+                self._cinemas_cache = (time.monotonic(), cinemas)
+
+        if self.max_cinemas is not None:
+            cinemas = cinemas[:self.max_cinemas]
+
+        return [
+            ScrapeUnit(
+                scraper=self.name,
+                date=date,
+                cinema=cinema["id"],
+                meta={"name": cinema["name"], "url": cinema["url"]},
+            )
+            for cinema in cinemas
+        ]
 
-        logger.info(
-            f"Scraped {len(unique_movies)} unique movies from UCI Cinemas")
-        return unique_movies
+    def scrape_unit(self, unit: ScrapeUnit) -> Iterator[MovieRecord]:
+        """
+        Yield the movies showing at one UCI cinema on the unit's date
+
+        Args:
+            unit (ScrapeUnit): Unit returned by list_units
+
+        Yields:
+            MovieRecord: Movie data for the cinema
+        """
+        # Convert date string to required format for UCI Cinemas
+        date_obj = datetime.strptime(unit.date, "%Y-%m-%d")
+        cinema_name = unit.meta.get("name", unit.cinema)
+        cinema_url = unit.meta.get(
+            "url", f"{self.cinema_list_url}/{unit.cinema}")
+
+        logger.info(f"Scraping movies from {cinema_name} for date {unit.date}")
+
+        theater_ref = self.theater_ref(unit.cinema, cinema_name, website=cinema_url)
+
+        # Get showtimes for this cinema on the specified date
+        yield from self._get_cinema_showtimes(
+            cinema_url, cinema_name, date_obj, theater_ref)
 
     def _get_all_cinemas(self) -> List[Dict[str, str]]:
         """
@@ -77,14 +129,18 @@ class UCICinemasScraper(BaseScraper):
 
         Returns:
             List[Dict[str, str]]: List of cinema data with id, name and URL
+
+        Raises:
+            ScrapeError: If the cinema list page could not be fetched
         """
         # Get the cinema list page
         html_content = self.get_page_with_selenium(self.cinema_list_url)
 
         if not html_content:
-            logger.error(f"Failed to get content from {self.cinema_list_url}")
-            return []
+            # An empty list would look like a chain without cinemas
+            raise ScrapeError(f"Failed to get content from {self.cinema_list_url}")
 
+        parse_started = time.perf_counter()
         soup = BeautifulSoup(html_content, 'lxml')
         cinemas = []
 
@@ -104,9 +160,11 @@ class UCICinemasScraper(BaseScraper):
                 "url": cinema_url
             })
 
+        self.record_stage("parse", time.perf_counter() - parse_started)
         return cinemas
 
-    def _get_cinema_showtimes(self, cinema_url: str, cinema_name: str, date_obj: datetime) -> List[Dict[str, Any]]:
+    def _get_cinema_showtimes(self, cinema_url: str, cinema_name: str, date_obj: datetime,
+                              theater_ref: Optional[Dict[str, Any]] = None) -> List[MovieRecord]:
         """
         Get all movie showtimes for a specific cinema and date
 
@@ -114,148 +172,161 @@ class UCICinemasScraper(BaseScraper):
             cinema_url (str): URL of the cinema page
             cinema_name (str): Name of the cinema
             date_obj (datetime): Date object
+            theater_ref (Dict[str, Any], optional): Theater attached to each showtime
 
         Returns:
-            List[Dict[str, Any]]: List of movie data with showtimes
+            List[MovieRecord]: List of movie data with showtimes
+
+        Raises:
+            ScrapeError: If the cinema page could not be loaded
         """
         movies = []
 
-        # Use Selenium to load the cinema page with JavaScript
-        driver = self._get_selenium_driver()
-        try:
-            driver.get(cinema_url)
-
-            # Wait for the movies to load
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, ".movie-container"))
-            )
-
-            # Check if there's a calendar selector and select the correct date
+        # Use Selenium to load the cinema page with JavaScript, on a browser
+        # borrowed from the scraper's pool and kept open for the next cinema
+        with self.driver() as driver:
+            html_content = None
             try:
-                # First find the calendar element
-                calendar = WebDriverWait(driver, 5).until(
+                # Space out requests to the site (replaces a fixed sleep per cinema)
+                self.throttle()
+                render_started = time.perf_counter()
+                driver.set_page_load_timeout(self.timeout)
+                driver.get(cinema_url)
+
+                # Wait for the movies to load
+                WebDriverWait(driver, 10).until(
                     EC.presence_of_element_located(
-                        (By.CSS_SELECTOR, ".calendar-container"))
+                        (By.CSS_SELECTOR, ".movie-container"))
                 )
 
-                # Format the date for the selector (it may use format like "dd MMM" or similar)
-                formatted_date = date_obj.strftime("%d/%m")
-
-                # Try to find and click the date
-                date_buttons = driver.find_elements(
-                    By.CSS_SELECTOR, ".calendar-day")
-                for button in date_buttons:
-                    if formatted_date in button.text or date_obj.day == int(button.text.strip()):
-                        button.click()
-                        time.sleep(2)  # Wait for content to refresh
-                        break
-            except (TimeoutException, NoSuchElementException):
-                logger.warning(
-                    f"Could not find calendar selector on {cinema_url}")
-
-            # Get the page HTML after any date selection
-            html_content = driver.page_source
-            soup = BeautifulSoup(html_content, 'lxml')
-
-            # Find all movie containers
-            movie_containers = soup.select('.movie-container')
-
-            for container in movie_containers:
+                # Check if there's a calendar selector and select the correct date
                 try:
-                    # Extract movie details
-                    title_element = container.select_one('.movie-title, h3')
-                    title = title_element.text.strip() if title_element else "Unknown Title"
-
-                    # Extract movie description if available
-                    description_elem = container.select_one(
-                        '.movie-description, p')
-                    description = description_elem.text.strip() if description_elem else ""
-
-                    # Extract movie poster if available
-                    poster_elem = container.select_one('img')
-                    poster_url = poster_elem['src'] if poster_elem and 'src' in poster_elem.attrs else None
-
-                    # Check for original language screenings
-                    # Look for "V.O." or "VOSE" (Versión Original Subtitulada en Español) indicators
-                    is_original_language = any(tag for tag in container.select('.language-tag, .format')
-                                               if tag and ('V.O.' in tag.text or 'VOSE' in tag.text or 'OV' in tag.text))
-
-                    # Extract showtimes
-                    showtime_elements = container.select(
-                        '.showtimes a, .showtime')
-                    showtimes = []
-
-                    for element in showtime_elements:
-                        time_text = element.text.strip()
-                        if not time_text or time_text.lower() in ['acquista', 'prenota']:
+                    # First find the calendar element
+                    calendar = WebDriverWait(driver, 5).until(
+                        EC.presence_of_element_located(
+                            (By.CSS_SELECTOR, ".calendar-container"))
+                    )
+
+                    # Format the date for the selector (it may use format like "dd MMM" or similar)
+                    formatted_date = date_obj.strftime("%d/%m")
+
+                    # Try to find and click the date
+                    date_buttons = driver.find_elements(
+                        By.CSS_SELECTOR, ".calendar-day")
+                    for button in date_buttons:
+                        if formatted_date in button.text or date_obj.day == int(button.text.strip()):
+                            button.click()
+                            time.sleep(2)  # Wait for content to refresh
+                            break
+                except (TimeoutException, NoSuchElementException):
+                    logger.warning(
+                        f"Could not find calendar selector on {cinema_url}")
+
+                # Get the page HTML after any date selection
+                html_content = driver.page_source
+                self.record_stage("render", time.perf_counter() - render_started)
+                self.record_page("selenium", html_content)
+
+                parse_started = time.perf_counter()
+                soup = BeautifulSoup(html_content, 'lxml')
+
+                # Find all movie containers
+                movie_containers = soup.select('.movie-container')
+
+                for container in movie_containers:
+                    try:
+                        # Extract movie details
+                        title_element = container.select_one('.movie-title, h3')
+                        title = title_element.text.strip() if title_element else "Unknown Title"
+
+                        # Extract movie description if available
+                        description_elem = container.select_one(
+                            '.movie-description, p')
+                        description = description_elem.text.strip() if description_elem else ""
+
+                        # Extract movie poster if available
+                        poster_elem = container.select_one('img')
+                        poster_url = poster_elem['src'] if poster_elem and 'src' in poster_elem.attrs else None
+
+                        # Check for original language screenings
+                        # Look for "V.O." or "VOSE" (Versión Original Subtitulada en Español) indicators
+                        is_original_language = any(tag for tag in container.select('.language-tag, .format')
+                                                   if tag and ('V.O.' in tag.text or 'VOSE' in tag.text or 'OV' in tag.text))
+
+                        # Extract showtimes
+                        showtime_elements = container.select(
+                            '.showtimes a, .showtime')
+                        showtimes = []
+
+                        for element in showtime_elements:
+                            time_text = element.text.strip()
+                            if not time_text or time_text.lower() in ['acquista', 'prenota']:
+                                continue
+
+                            # Check if this showtime is in original language
+                            is_vo = is_original_language or any(tag for tag in element.parent.select('.language-tag, .format')
+                                                                if tag and ('V.O.' in tag.text or 'VOSE' in tag.text or 'OV' in tag.text))
+
+                            # Extract booking link if available
+                            booking_url = None
+                            if element.name == 'a' and 'href' in element.attrs:
+                                booking_url = element['href']
+                                if not booking_url.startswith('http'):
+                                    booking_url = f"{self.base_url}{booking_url}"
+
+                            # Extract any format information (3D, IMAX, etc.)
+                            format_elem = element.select_one('.format')
+                            theater_screen = format_elem.text.strip() if format_elem else "Standard"
+
+                            showtimes.append(ShowtimeRecord(
+                                time=time_text,
+                                theater=cinema_name,
+                                room=theater_screen,
+                                is_original_language=is_vo,
+                                booking_url=booking_url,
+                                theater_ref=theater_ref,
+                            ))
+
+                        # Skip movies with no showtimes
+                        if not showtimes:
                             continue
 
-                        # Check if this showtime is in original language
-                        is_vo = is_original_language or any(tag for tag in element.parent.select('.language-tag, .format')
-                                                            if tag and ('V.O.' in tag.text or 'VOSE' in tag.text or 'OV' in tag.text))
-
-                        # Extract booking link if available
-                        booking_url = None
-                        if element.name == 'a' and 'href' in element.attrs:
-                            booking_url = element['href']
-                            if not booking_url.startswith('http'):
-                                booking_url = f"{self.base_url}{booking_url}"
-
-                        # Extract any format information (3D, IMAX, etc.)
-                        format_elem = element.select_one('.format')
-                        theater_screen = format_elem.text.strip() if format_elem else "Standard"
-
-                        showtime = Showtime(
-                            time=time_text,
-                            is_original_language=is_vo,
-                            theater_screen=theater_screen,
-                            booking_url=booking_url
+                        # Extract movie URL if available
+                        movie_url_elem = container.select_one('a[href^="/film/"]')
+                        movie_url = None
+                        if movie_url_elem and 'href' in movie_url_elem.attrs:
+                            movie_url = f"{self.base_url}{movie_url_elem['href']}"
+
+                        # Create movie entry; original title, duration and
+                        # genres are filled in from the movie page by enrichment
+                        movie = MovieRecord(
+                            title=title,
+                            date=date_obj.strftime("%Y-%m-%d"),
+                            image_url=poster_url,
+                            description=description or None,
+                            showtimes=showtimes,
+                            url=movie_url,
                         )
-                        showtimes.append(showtime.dict())
 
-                    # Skip movies with no showtimes
-                    if not showtimes:
+                        movies.append(movie)
+
+                    except Exception as e:
+                        logger.error(f"Error parsing movie in {cinema_name}: {e}")
                         continue
 
-                    # Extract movie URL if available
-                    movie_url_elem = container.select_one('a[href^="/film/"]')
-                    movie_url = None
-                    if movie_url_elem and 'href' in movie_url_elem.attrs:
-                        movie_url = f"{self.base_url}{movie_url_elem['href']}"
-
-                    # Create movie entry
-                    movie = {
-                        "title": title,
-                        "original_title": title,  # Assume same as title, may be updated later
-                        "poster_url": poster_url,
-                        "synopsis": description,
-                        "duration": None,  # Not always available
-                        "is_original_language": is_original_language,
-                        "genres": [],  # Not easily available on cinema page
-                        "showtimes": showtimes,
-                        "theater": cinema_name,
-                        "theater_id": cinema_url.split('/')[-1],
-                        "url": movie_url,
-                        "date": date_obj.strftime("%Y-%m-%d")
-                    }
-
-                    movies.append(movie)
-
-                except Exception as e:
-                    logger.error(f"Error parsing movie in {cinema_name}: {e}")
-                    continue
-
-        except Exception as e:
-            logger.error(f"Error scraping {cinema_url}: {e}")
-        finally:
-            driver.quit()
+                self.record_stage("parse", time.perf_counter() - parse_started)
+
+            except Exception as e:
+                # Page or browser failure: fail the unit so it is retried
+                if html_content is None:
+                    self.record_page("selenium", None)
+                raise ScrapeError(f"Error scraping {cinema_url}: {e}") from e
 
         return movies
 
     def _deduplicate_movies(self, movies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        Deduplicate movies by title and combine showtimes
+        Deduplicate movies by normalized title and combine showtimes
 
         Args:
             movies (List[Dict[str, Any]]): List of movie data
@@ -263,79 +334,51 @@ class UCICinemasScraper(BaseScraper):
         Returns:
             List[Dict[str, Any]]: Deduplicated list of movie data
         """
-        unique_movies = {}
-
-        for movie in movies:
-            title = movie["title"]
-
-            if title not in unique_movies:
-                unique_movies[title] = movie
-            else:
-                # Add this theater's showtimes to the existing movie entry
-                existing_movie = unique_movies[title]
-
-                # Add theater to list of theaters showing this movie
-                theater_info = {
-                    "name": movie["theater"],
-                    "id": movie["theater_id"]
-                }
+        return merge_movies(movies)
 
-                if "theaters" not in existing_movie:
-                    existing_movie["theaters"] = [
-                        {"name": existing_movie["theater"], "id": existing_movie["theater_id"]}]
-
-                existing_movie["theaters"].append(theater_info)
-
-                # Add showtimes
-                existing_movie["showtimes"].extend(movie["showtimes"])
-
-                # Update original language flag if any theater shows it in original language
-                if movie["is_original_language"]:
-                    existing_movie["is_original_language"] = True
-
-        return list(unique_movies.values())
-
-    def _enrich_movie_details(self, movie: Dict[str, Any]) -> Dict[str, Any]:
+    def get_film_details(self, url: str) -> Dict[str, Any]:
         """
         Get additional movie details from the movie page
 
         Args:
-            movie (Dict[str, Any]): Movie data
+            url (str): URL of the movie page
 
         Returns:
-            Dict[str, Any]: Enriched movie data
+            Dict[str, Any]: Original title, duration, genres, director and year
         """
-        if not movie["url"]:
-            return movie
-
-        try:
-            html_content = self.get_page_content(movie["url"])
-
-            if not html_content:
-                return movie
+        html_content = self.get_page_content(url)
 
-            soup = BeautifulSoup(html_content, 'lxml')
-
-            # Try to extract original title if different from title
-            original_title_elem = soup.select_one('.original-title')
-            if original_title_elem:
-                movie["original_title"] = original_title_elem.text.strip()
-
-            # Try to extract duration
-            duration_elem = soup.select_one('.duration')
-            if duration_elem:
-                duration_text = duration_elem.text.strip()
-                match = re.search(r'(\d+)', duration_text)
-                if match:
-                    movie["duration"] = int(match.group(1))
-
-            # Try to extract genres
-            genre_elems = soup.select('.genre')
-            if genre_elems:
-                movie["genres"] = [elem.text.strip() for elem in genre_elems]
-
-        except Exception as e:
-            logger.error(
-                f"Error enriching movie details for {movie['title']}: {e}")
+        if not html_content:
+            return {}
 
-        return movie
+        soup = BeautifulSoup(html_content, 'lxml')
+        details = {}
+
+        # Try to extract original title if different from title
+        original_title_elem = soup.select_one('.original-title')
+        if original_title_elem:
+            details["original_title"] = original_title_elem.text.strip()
+
+        # Try to extract duration
+        duration_elem = soup.select_one('.duration')
+        if duration_elem:
+            match = re.search(r'(\d+)', duration_elem.text.strip())
+            if match:
+                details["duration"] = int(match.group(1))
+
+        # Try to extract genres
+        genre_elems = soup.select('.genre')
+        if genre_elems:
+            details["genres"] = [elem.text.strip() for elem in genre_elems]
+
+        director_elem = soup.select_one('.director, .regia')
+        if director_elem:
+            details["director"] = director_elem.text.strip()
+
+        year_elem = soup.select_one('.year, .anno')
+        if year_elem:
+            match = re.search(r'\d{4}', year_elem.text)
+            if match:
+                details["year"] = int(match.group(0))
+
+        return details
@@ -0,0 +1,45 @@
+"""
+Scrape units: the smallest independently schedulable piece of scraping work
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Tuple
+
+
+@dataclass(frozen=True)
+class ScrapeUnit:
+    """
+    One (scraper, cinema, date) piece of work
+
+    Attributes:
+        scraper (str): Registry name of the scraper
+        date (str): Date in format YYYY-MM-DD
+        cinema (str): Scraper-specific cinema key, empty for whole-site units
+        meta (Dict[str, Any]): Extra data the scraper needs to run the unit
+            (cinema name, URL, ...). Not part of the unit's identity.
+    """
+    scraper: str
+    date: str
+    cinema: str = ""
+    meta: Dict[str, Any] = field(default_factory=dict, compare=False, hash=False)
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        """Identity of the unit as (scraper, cinema, date)"""
+        return (self.scraper, self.cinema, self.date)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "scraper": self.scraper,
+            "date": self.date,
+            "cinema": self.cinema,
+            "meta": dict(self.meta),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ScrapeUnit":
+        return cls(
+            scraper=data["scraper"],
+            date=data["date"],
+            cinema=data.get("cinema", ""),
+            meta=data.get("meta") or {},
+        )
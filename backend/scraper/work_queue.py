@@ -0,0 +1,305 @@
+"""
+Durable scrape work queue with leases
+
+Scrape units are stored in a SQLite database so that several worker
+processes (or machines sharing the file) can pull work. A worker leases a
+unit for a limited time and extends the lease with heartbeats while it
+scrapes; units whose lease expires are handed out again.
+"""
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from scraper.units import ScrapeUnit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_PATH = os.getenv("SCRAPE_QUEUE_PATH", "scrape_queue.sqlite3")
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_units (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scraper TEXT NOT NULL,
+    cinema TEXT NOT NULL,
+    date TEXT NOT NULL,
+    meta TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'pending',
+    priority REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (scraper, cinema, date)
+);
+CREATE INDEX IF NOT EXISTS idx_scrape_units_status
+    ON scrape_units (status, priority, id);
+"""
+
+
+@dataclass
+class LeasedUnit:
+    """A unit leased by a worker"""
+    id: int
+    unit: ScrapeUnit
+    worker_id: str
+    lease_expires: float
+    attempts: int
+
+
+class WorkQueue:
+    """
+    SQLite-backed queue of scrape units with lease and heartbeat semantics
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, lease_seconds: float = 300.0,
+                 max_attempts: int = 3):
+        """
+        Args:
+            path (str): SQLite database file shared by all workers
+            lease_seconds (float): Lease duration granted by lease and heartbeat
+            max_attempts (int): Attempts before a failing unit is marked failed
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A connection per operation keeps the queue safe to use from
+        # threads and forked processes
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE takes the write lock up front so two workers can
+        # never lease the same unit
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def publish(self, units: List[ScrapeUnit], priorities: Optional[List[float]] = None) -> int:
+        """
+        Add units to the queue
+
+        Units that are already queued or leased are left untouched; finished
+        or failed units are reset to pending so a new run scrapes them again.
+
+        Args:
+            units (List[ScrapeUnit]): Units to publish
+            priorities (List[float], optional): Lower values are leased first
+
+        Returns:
+            int: Number of units made pending
+        """
+        now = time.time()
+        priorities = priorities or [0.0] * len(units)
+        published = 0
+        with self._transaction() as conn:
+            for unit, priority in zip(units, priorities):
+                cursor = conn.execute(
+                    """
+                    INSERT INTO scrape_units
+                        (scraper, cinema, date, meta, status, priority, updated_at)
+                    VALUES (?, ?, ?, ?, 'pending', ?, ?)
+                    ON CONFLICT (scraper, cinema, date) DO UPDATE SET
+                        meta = excluded.meta,
+                        priority = excluded.priority,
+                        status = 'pending',
+                        attempts = 0,
+                        last_error = NULL,
+                        updated_at = excluded.updated_at
+                    WHERE status IN ('done', 'failed')
+                    """,
+                    (unit.scraper, unit.cinema, unit.date,
+                     json.dumps(unit.meta), priority, now),
+                )
+                published += cursor.rowcount
+        return published
+
+    def lease(self, worker_id: str, lease_seconds: Optional[float] = None) -> Optional[LeasedUnit]:
+        """
+        Lease the next pending unit, or a unit whose lease has expired
+
+        Args:
+            worker_id (str): Identifier of the leasing worker
+            lease_seconds (float, optional): Lease duration override
+
+        Returns:
+            Optional[LeasedUnit]: Leased unit, or None if no work is available
+        """
+        now = time.time()
+        expires = now + (lease_seconds if lease_seconds is not None else self.lease_seconds)
+        with self._transaction() as conn:
+            row = conn.execute(
+                """
+                SELECT * FROM scrape_units
+                WHERE status = 'pending'
+                   OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY priority, id
+                LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            if row["status"] == LEASED:
+                logger.warning(
+                    f"Lease of unit {row['id']} held by {row['lease_owner']} expired, re-leasing")
+
+            conn.execute(
+                """
+                UPDATE scrape_units
+                SET status = 'leased', lease_owner = ?, lease_expires = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+                """,
+                (worker_id, expires, now, row["id"]),
+            )
+
+        unit = ScrapeUnit(scraper=row["scraper"], date=row["date"],
+                          cinema=row["cinema"], meta=json.loads(row["meta"]))
+        return LeasedUnit(id=row["id"], unit=unit, worker_id=worker_id,
+                          lease_expires=expires, attempts=row["attempts"] + 1)
+
+    def heartbeat(self, leased: LeasedUnit) -> bool:
+        """
+        Extend the lease of a unit still owned by the worker
+
+        Returns:
+            bool: False if the lease was lost (expired and taken by another worker)
+        """
+        expires = time.time() + self.lease_seconds
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE scrape_units SET lease_expires = ?, updated_at = ?
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+                """,
+                (expires, time.time(), leased.id, leased.worker_id),
+            )
+        if cursor.rowcount:
+            leased.lease_expires = expires
+        return bool(cursor.rowcount)
+
+    def complete(self, leased: LeasedUnit) -> bool:
+        """
+        Mark a leased unit as done
+
+        Returns:
+            bool: False if the worker no longer owned the lease
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE scrape_units
+                SET status = 'done', lease_owner = NULL, lease_expires = NULL,
+                    last_error = NULL, updated_at = ?
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+                """,
+                (time.time(), leased.id, leased.worker_id),
+            )
+        return bool(cursor.rowcount)
+
+    def fail(self, leased: LeasedUnit, error: str) -> bool:
+        """
+        Release a unit after an error
+
+        The unit goes back to pending until it has been attempted
+        max_attempts times, after which it is marked failed.
+
+        Returns:
+            bool: False if the worker no longer owned the lease
+        """
+        status = FAILED if leased.attempts >= self.max_attempts else PENDING
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE scrape_units
+                SET status = ?, lease_owner = NULL, lease_expires = NULL,
+                    last_error = ?, updated_at = ?
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+                """,
+                (status, error, time.time(), leased.id, leased.worker_id),
+            )
+        return bool(cursor.rowcount)
+
+    def date_done(self, scraper: str, date: str) -> bool:
+        """
+        Check whether every unit of a scraper and date is done
+
+        A unit pending a retry or failed for good keeps the date unfinished,
+        as it does for ScraperService runs.
+
+        Args:
+            scraper (str): Scraper name
+            date (str): Date in format YYYY-MM-DD
+
+        Returns:
+            bool: True if the date has units and all of them are done
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT COUNT(*) AS n, SUM(status = 'done') AS done
+                FROM scrape_units WHERE scraper = ? AND date = ?
+                """,
+                (scraper, date),
+            ).fetchone()
+        return row["n"] > 0 and row["done"] == row["n"]
+
+    def requeue_expired(self) -> int:
+        """
+        Return units with expired leases to pending
+
+        Leasing already picks up expired units; this makes them visible as
+        pending for monitoring.
+
+        Returns:
+            int: Number of units requeued
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE scrape_units
+                SET status = 'pending', lease_owner = NULL, lease_expires = NULL,
+                    updated_at = ?
+                WHERE status = 'leased' AND lease_expires < ?
+                """,
+                (now, now),
+            )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of units per status"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS n FROM scrape_units GROUP BY status").fetchall()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
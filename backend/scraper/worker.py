@@ -0,0 +1,232 @@
+"""
+Scrape worker pulling units from the shared work queue
+
+Run several of these on one or more hosts sharing the queue file:
+
+    python -m scraper.worker publish --days 7
+    python -m scraper.worker work --exit-when-idle
+    python -m scraper.worker stats
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, List, Optional
+
+from scraper.checkpoint import CheckpointStore
+from scraper.enrichment import Enricher
+from scraper.pipeline import BatchWriter, ScrapePipeline
+from scraper.registry import ScraperRegistry, get_registry
+from scraper.work_queue import DEFAULT_QUEUE_PATH, LeasedUnit, WorkQueue
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeWorker:
+    """
+    Worker leasing scrape units from a WorkQueue and storing their movies
+    """
+
+    def __init__(self, queue: WorkQueue, registry: Optional[ScraperRegistry] = None,
+                 writer: Optional[BatchWriter] = None, worker_id: Optional[str] = None,
+                 heartbeat_interval: Optional[float] = None,
+                 checkpoints: Optional[CheckpointStore] = None,
+                 enricher: Optional[Enricher] = None,
+                 film_writer: Optional[BatchWriter] = None,
+                 freshness_writer: Optional[Callable[[List[str]], Awaitable[None]]] = None):
+        """
+        Args:
+            queue (WorkQueue): Shared work queue
+            registry (ScraperRegistry, optional): Registry resolving unit scrapers
+            writer (BatchWriter, optional): Batch writer, defaults to the movie repository
+            worker_id (str, optional): Unique worker identifier
+            heartbeat_interval (float, optional): Seconds between lease renewals,
+                                                  defaults to a third of the lease
+            checkpoints (CheckpointStore, optional): Store recording completed units
+            enricher (Enricher, optional): Film details stage, backed by a cache
+                                           shared by the workers of a host
+            film_writer (BatchWriter, optional): Stores fetched film details,
+                                                 defaults to the film repository
+                                                 with the default writer
+            freshness_writer (Callable, optional): Records dates whose units
+                                                   are all done, defaults to
+                                                   the freshness repository
+                                                   with the default writer
+        """
+        if writer is None:
+            from models.repository import FilmRepository, FreshnessRepository, MovieWriter
+            writer = MovieWriter()
+            film_writer = film_writer or FilmRepository.upsert_films
+            freshness_writer = freshness_writer or FreshnessRepository.mark_refreshed
+
+        self.queue = queue
+        self.registry = registry or get_registry()
+        self.pipeline = ScrapePipeline(
+            writer, on_unit_done=checkpoints.record_async if checkpoints else None,
+            enricher=enricher, film_writer=film_writer)
+        self.freshness_writer = freshness_writer
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.heartbeat_interval = heartbeat_interval or queue.lease_seconds / 3
+
+    async def run(self, max_units: Optional[int] = None, poll_interval: float = 5.0,
+                  exit_when_idle: bool = False) -> int:
+        """
+        Lease and process units until stopped
+
+        Args:
+            max_units (int, optional): Stop after processing this many units
+            poll_interval (float): Seconds to wait when the queue is empty
+            exit_when_idle (bool): Stop as soon as the queue has no work
+
+        Returns:
+            int: Number of units completed
+        """
+        completed = 0
+        processed = 0
+        logger.info(f"Worker {self.worker_id} started")
+
+        try:
+            while max_units is None or processed < max_units:
+                leased = await asyncio.to_thread(self.queue.lease, self.worker_id)
+                if leased is None:
+                    if exit_when_idle:
+                        break
+                    await asyncio.sleep(poll_interval)
+                    continue
+
+                processed += 1
+                if await self.process(leased):
+                    completed += 1
+        finally:
+            # Browsers stay pooled across units and are released on exit
+            self.registry.close()
+
+        logger.info(
+            f"Worker {self.worker_id} stopped after {processed} units ({completed} completed)")
+        return completed
+
+    async def process(self, leased: LeasedUnit) -> bool:
+        """
+        Scrape and store a leased unit while renewing its lease
+
+        Args:
+            leased (LeasedUnit): Unit leased from the queue
+
+        Returns:
+            bool: True if the unit was completed
+        """
+        unit = leased.unit
+        logger.info(
+            f"Worker {self.worker_id} processing {unit.key} (attempt {leased.attempts})")
+        run = asyncio.create_task(self._run_unit(leased))
+        heartbeat = asyncio.create_task(self._heartbeat(leased, run))
+
+        try:
+            await run
+            error = None
+            if self.pipeline.failed_units:
+                error = "scraper raised while processing the unit"
+            elif self.pipeline.write_errors:
+                error = "failed to store scraped movies"
+        except asyncio.CancelledError:
+            if not heartbeat.done() or heartbeat.cancelled():
+                raise
+            # Cancelled by the heartbeat: the unit now belongs to another worker
+            logger.warning(f"Abandoned {unit.key} after losing its lease")
+            return False
+        except Exception as e:
+            logger.error(f"Error processing {unit.key}: {e}", exc_info=True)
+            error = str(e)
+        finally:
+            heartbeat.cancel()
+
+        if error is None:
+            if await asyncio.to_thread(self.queue.complete, leased):
+                await self._mark_refreshed(unit)
+                return True
+            logger.warning(f"Lease on {unit.key} was lost before completion")
+            return False
+
+        await asyncio.to_thread(self.queue.fail, leased, error)
+        return False
+
+    async def _mark_refreshed(self, unit) -> None:
+        """
+        Record the unit's date as refreshed once all its units are done
+
+        Lets the API stop refreshing the date on demand (see api.refresh),
+        like ScraperService runs do.
+        """
+        try:
+            if not await asyncio.to_thread(self.queue.date_done, unit.scraper, unit.date):
+                return
+            self.registry.mark_refreshed(unit.scraper, unit.date)
+            if self.freshness_writer:
+                await self.freshness_writer([unit.date])
+        except Exception as e:
+            logger.error(f"Error recording freshness of {unit.date}: {e}")
+
+    async def _run_unit(self, leased: LeasedUnit) -> None:
+        """Scrape and store the movies of a leased unit"""
+        scraper = self.registry.get(leased.unit.scraper)
+        await self.pipeline.run_units([(scraper, [leased.unit])])
+
+    async def _heartbeat(self, leased: LeasedUnit, run: asyncio.Task) -> None:
+        """
+        Renew the lease periodically while the unit is being scraped
+
+        When the lease is lost another worker may already be scraping the
+        unit, so the run is cancelled rather than left to write concurrently.
+        """
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if not await asyncio.to_thread(self.queue.heartbeat, leased):
+                logger.warning(
+                    f"Worker {self.worker_id} lost the lease on {leased.unit.key}")
+                run.cancel()
+                return
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Distributed scrape worker")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH,
+                        help="SQLite queue file shared by all workers")
+    parser.add_argument("--lease-seconds", type=float, default=300.0)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    publish = commands.add_parser("publish", help="Publish units for the next days")
+    publish.add_argument("--days", type=int, default=7)
+
+    work = commands.add_parser("work", help="Lease and scrape units")
+    work.add_argument("--worker-id")
+    work.add_argument("--max-units", type=int)
+    work.add_argument("--exit-when-idle", action="store_true")
+
+    commands.add_parser("stats", help="Show the number of units per status")
+    commands.add_parser("requeue", help="Return expired leases to the queue")
+
+    args = parser.parse_args()
+    queue = WorkQueue(args.queue, lease_seconds=args.lease_seconds)
+
+    if args.command == "publish":
+        from scraper.scraper_service import ScraperService
+        published = asyncio.run(ScraperService().publish_units(queue, args.days))
+        print(f"Published {published} units")
+    elif args.command == "work":
+        worker = ScrapeWorker(queue, worker_id=args.worker_id,
+                              checkpoints=CheckpointStore(), enricher=Enricher())
+        asyncio.run(worker.run(max_units=args.max_units,
+                               exit_when_idle=args.exit_when_idle))
+    elif args.command == "requeue":
+        print(f"Requeued {queue.requeue_expired()} units")
+    print(queue.stats())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from models.memory import MemoryClient, MemoryQuery
+
+
+class FakeQuery(MemoryQuery):
+    """MemoryQuery recording its select clause and execution"""
+
+    def select(self, columns="*"):
+        self.client.selects.append((self.table, columns))
+        return super().select(columns)
+
+    def execute(self):
+        self.client.calls.append((self.table, self.operation))
+        self.client.threads.add(threading.get_ident())
+        return super().execute()
+
+
+class FakeClient(MemoryClient):
+    """In-memory stand-in for the Supabase client recording every query"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+        # Select clauses by table, to check column projection
+        self.selects = []
+        # Threads that ran queries, to check blocking calls stay off the event loop
+        self.threads = set()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr("models.repository.get_client", lambda: client)
+    return client
@@ -0,0 +1,31 @@
+import asyncio
+
+from benchmarks.api_load import Traffic, make_dates, percentiles, run_load, seed_database, summarize
+from models.memory import MemoryClient
+
+
+def test_percentiles():
+    values = [float(i) for i in range(1, 101)]
+
+    assert percentiles(values)["p50"] == 50.5
+    assert percentiles(values)["p99"] > percentiles(values)["p95"] > 90
+    assert percentiles([3.0]) == {"p50": 3.0, "p95": 3.0, "p99": 3.0}
+
+
+def test_load_runs_against_the_seeded_app(monkeypatch):
+    monkeypatch.setattr("models.supabase._client", None)
+    dates = make_dates(2)
+    client = MemoryClient()
+    seed_database(client, dates, theaters=2, movies=3)
+    from api.main import app
+
+    traffic = Traffic(dates, {"movies": 1, "original": 1, "theaters": 1})
+    closed = asyncio.run(run_load(app, traffic, concurrency=4, requests=30))
+    opened = asyncio.run(run_load(app, traffic, requests=20, rate=1000))
+
+    assert len(client.tables["theaters"]) == 2
+    assert len(closed["results"]) == 30 and len(opened["results"]) == 20
+    assert {status for _, status, _, _ in closed["results"] + opened["results"]} == {200}
+    summary = summarize(closed["results"], closed["seconds"])
+    assert summary["all"]["errors"] == 0
+    assert sum(summary[route]["requests"] for route in ("movies", "original", "theaters")) == 30
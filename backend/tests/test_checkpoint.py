@@ -0,0 +1,139 @@
+import asyncio
+
+from models.repository import FreshnessRepository, MovieRepository
+from scraper.base_scraper import BaseScraper
+from scraper.checkpoint import CheckpointStore
+from scraper.pipeline import UnitResult
+from scraper.scraper_service import ScraperService
+from scraper.units import ScrapeUnit
+
+
+class CinemaChainScraper(BaseScraper):
+    """Scraper with one unit per cinema that can fail on chosen cinemas"""
+
+    def __init__(self, cinemas, broken=()):
+        super().__init__("https://example.invalid")
+        self.name = "chain"
+        self.cinemas = cinemas
+        self.broken = set(broken)
+        self.scraped = []
+
+    def get_movies_for_date(self, date):
+        return []
+
+    def list_units(self, date):
+        return [ScrapeUnit(scraper=self.name, date=date, cinema=c) for c in self.cinemas]
+
+    def scrape_unit(self, unit):
+        self.scraped.append(unit.cinema)
+        if unit.cinema in self.broken:
+            raise RuntimeError("process died")
+        yield {"title": "Dune", "showtimes": [{"theater": unit.cinema, "time": "20:00"}]}
+
+
+class SingleScraperRegistry:
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.refreshed = []
+
+    def due_scrapers(self, date_str, force=False):
+        return [self.scraper]
+
+    def mark_refreshed(self, name, date_str):
+        self.refreshed.append((name, date_str))
+
+
+def test_filter_stale_skips_recent_units(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite3"))
+    done = ScrapeUnit(scraper="chain", date="2024-05-01", cinema="a")
+    todo = ScrapeUnit(scraper="chain", date="2024-05-01", cinema="b")
+
+    store.record(UnitResult(unit=done, movies=3, original_showtimes=1, result_hash="abc"))
+
+    assert store.filter_stale([done, todo], max_age_minutes=60) == [todo]
+    assert store.filter_stale([done, todo], max_age_minutes=0) == [done, todo]
+    assert store.get(done)["result_hash"] == "abc"
+
+
+def test_resume_only_scrapes_remaining_units(tmp_path, monkeypatch):
+    async def writer(batch, replaced=None):
+        return batch
+
+    monkeypatch.setattr(MovieRepository, "insert_or_update_movies", writer)
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite3"))
+
+    interrupted = CinemaChainScraper(["a", "b", "c"], broken=["c"])
+    service = ScraperService(SingleScraperRegistry(interrupted), checkpoints=store)
+    asyncio.run(service.scrape_all_cinemas("2024-05-01"))
+
+    resumed = CinemaChainScraper(["a", "b", "c"])
+    service = ScraperService(SingleScraperRegistry(resumed), checkpoints=store)
+    asyncio.run(service.scrape_all_cinemas("2024-05-01", resume=True))
+
+    assert sorted(interrupted.scraped) == ["a", "b", "c"]
+    assert resumed.scraped == ["c"]
+
+
+def test_run_orders_units_by_date_then_original_language_history(tmp_path, monkeypatch):
+    async def writer(batch, replaced=None):
+        return batch
+
+    monkeypatch.setattr(MovieRepository, "insert_or_update_movies", writer)
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite3"))
+    unit = ScrapeUnit(scraper="chain", date="2024-04-30", cinema="b")
+    store.record(UnitResult(unit=unit, movies=5, original_showtimes=9, result_hash="x"))
+
+    scraper = CinemaChainScraper(["a", "b"])
+    service = ScraperService(SingleScraperRegistry(scraper), checkpoints=store)
+    result = asyncio.run(service.run(["2024-05-02", "2024-05-01"]))
+
+    assert [r.unit.key for r in result.completed] == [
+        ("chain", "b", "2024-05-01"), ("chain", "a", "2024-05-01"),
+        ("chain", "b", "2024-05-02"), ("chain", "a", "2024-05-02"),
+    ]
+    assert result.deferred == []
+
+
+def test_only_successful_scrapes_count_as_refreshed(tmp_path, monkeypatch):
+    async def writer(batch, replaced=None):
+        return batch
+
+    fresh = []
+
+    async def mark_refreshed(dates):
+        fresh.extend(dates)
+
+    monkeypatch.setattr(MovieRepository, "insert_or_update_movies", writer)
+    monkeypatch.setattr(FreshnessRepository, "mark_refreshed", mark_refreshed)
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite3"))
+
+    for scraper in (CinemaChainScraper([]), CinemaChainScraper(["a", "b"], broken=["b"])):
+        registry = SingleScraperRegistry(scraper)
+        asyncio.run(ScraperService(registry, checkpoints=store).run(["2024-05-01"]))
+        assert registry.refreshed == []
+        assert fresh == []
+
+    registry = SingleScraperRegistry(CinemaChainScraper(["a"]))
+    asyncio.run(ScraperService(registry, checkpoints=store).run(["2024-05-01"]))
+    assert registry.refreshed == [("chain", "2024-05-01")]
+    assert fresh == ["2024-05-01"]
+
+
+def test_runs_report_progress_and_changed_dates(tmp_path, monkeypatch):
+    async def writer(batch, replaced=None):
+        return batch
+
+    monkeypatch.setattr(MovieRepository, "insert_or_update_movies", writer)
+    events = []
+    registry = SingleScraperRegistry(CinemaChainScraper(["a", "b"], broken=["b"]))
+    service = ScraperService(registry, checkpoints=CheckpointStore(str(tmp_path / "c.sqlite3")),
+                             progress=lambda name, data: events.append((name, data)))
+
+    asyncio.run(service.run(["2024-05-01"]))
+
+    assert [(name, data.get("status")) for name, data in events] == [
+        ("scrape", "started"), ("scrape", "unit_done"), ("scrape", "finished"), ("data", None)]
+    assert events[1][1]["unit"] == ["chain", "a", "2024-05-01"]
+    assert events[2][1]["failed"] == 1
+    assert events[3][1]["date"] == "2024-05-01"
+
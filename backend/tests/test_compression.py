@@ -0,0 +1,85 @@
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import asyncio
+import gzip
+import json
+
+from api import compression
+from api.compression import CompressionMiddleware, negotiate_encoding
+
+
+def make_app():
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/big")
+    async def big():
+        return ORJSONResponse([{"title": f"Movie {i}", "showtimes": []} for i in range(100)])
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            yield b"data: 1\n\n" * 100
+            yield b"data: 2\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+
+def get(app, path, accept_encoding):
+    """Run a GET request through the ASGI app, returning status headers and body"""
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()  # The client never disconnects
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+             "query_string": b"", "root_path": "", "server": ("test", 80),
+             "client": ("test", 1234),
+             "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(app(scope, receive, send))
+
+    headers = {name.decode(): value.decode() for name, value in messages[0]["headers"]}
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return headers, body
+
+
+def test_encoding_follows_accept_encoding(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0.5") == "gzip"
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("*") == "br"
+
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("br, gzip") == "gzip"
+
+
+def test_only_complete_large_bodies_are_compressed():
+    app = make_app()
+
+    headers, body = get(app, "/big", "gzip")
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert headers["content-length"] == str(len(body))
+    assert json.loads(gzip.decompress(body))[99]["title"] == "Movie 99"
+
+    for headers, _ in (get(app, "/small", "gzip"), get(app, "/big", "identity")):
+        assert "content-encoding" not in headers
+        assert headers["vary"] == "Accept-Encoding"
+
+    headers, body = get(app, "/stream", "gzip")
+    assert "content-encoding" not in headers
+    assert body.endswith(b"data: 2\n\n")
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+
+from scraper.base_scraper import BaseScraper
+from scraper.enrichment import EnrichmentCache, Enricher
+from scraper.pipeline import ScrapePipeline
+from scraper.units import ScrapeUnit
+
+
+class ChainScraper(BaseScraper):
+    """Scraper listing the same film at several cinemas and counting film page fetches"""
+
+    def __init__(self, cinemas):
+        super().__init__("https://example.invalid")
+        self.name = "chain"
+        self.cinemas = cinemas
+        self.fetches = []
+        self.lock = threading.Lock()
+
+    def get_movies_for_date(self, date):
+        return []
+
+    def list_units(self, date):
+        return [ScrapeUnit(scraper=self.name, date=date, cinema=c) for c in self.cinemas]
+
+    def scrape_unit(self, unit):
+        yield {"title": "Dune", "url": "https://example.invalid/film/dune", "duration": None,
+               "showtimes": [{"theater": unit.cinema, "time": "20:00"}]}
+        yield {"title": "Alien", "url": "https://example.invalid/film/alien",
+               "showtimes": [{"theater": unit.cinema, "time": "22:00"}]}
+
+    def get_film_details(self, url):
+        with self.lock:
+            self.fetches.append(url)
+        return {"duration": 120, "director": "Someone", "cast": "ignored"}
+
+
+def run_pipeline(scraper, enricher, dates, films=None):
+    stored = []
+
+    async def writer(batch, replaced=None):
+        stored.extend(batch)
+
+    async def film_writer(batch):
+        if films is not None:
+            films.extend(batch)
+
+    async def run():
+        pipeline = ScrapePipeline(writer, batch_size=2, enricher=enricher,
+                                  film_writer=film_writer)
+        for date in dates:
+            await pipeline.run([scraper], date)
+
+    asyncio.run(run())
+    return stored
+
+
+def test_film_pages_are_fetched_once_per_url(tmp_path):
+    scraper = ChainScraper(["a", "b", "c"])
+    enricher = Enricher(EnrichmentCache(str(tmp_path / "cache.sqlite3")))
+
+    films = []
+    stored = run_pipeline(scraper, enricher, ["2024-05-01", "2024-05-02"], films)
+
+    assert sorted(scraper.fetches) == ["https://example.invalid/film/alien",
+                                       "https://example.invalid/film/dune"]
+    # Fetched details are backfilled on the films, later batches read the cache
+    assert {film["title"] for film in films} == {"Alien", "Dune"}
+    assert all(film["duration"] == 120 and "cast" not in film for film in films)
+    later = [movie for movie in stored if movie["date"] == "2024-05-02"]
+    assert later and all(movie["duration"] == 120 and movie["director"] == "Someone"
+                         for movie in later)
+    assert all("cast" not in movie for movie in stored)
+
+
+def test_batches_are_written_before_film_pages_are_fetched(tmp_path):
+    written = threading.Event()
+
+    class SlowPagesScraper(ChainScraper):
+        def get_film_details(self, url):
+            # Would time out if the writer waited for the film pages
+            if not written.wait(5):
+                raise TimeoutError(url)
+            return super().get_film_details(url)
+
+    scraper = SlowPagesScraper(["a"])
+    films = []
+    enricher = Enricher(EnrichmentCache(str(tmp_path / "cache.sqlite3")))
+
+    async def writer(batch, replaced=None):
+        written.set()
+
+    async def film_writer(batch):
+        films.extend(batch)
+
+    pipeline = ScrapePipeline(writer, enricher=enricher, film_writer=film_writer)
+    asyncio.run(pipeline.run([scraper], "2024-05-01"))
+
+    assert {film["title"] for film in films} == {"Alien", "Dune"}
+
+
+def test_cache_persists_until_ttl(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    run_pipeline(ChainScraper(["a"]), Enricher(EnrichmentCache(path)), ["2024-05-01"])
+
+    cached = ChainScraper(["a"])
+    run_pipeline(cached, Enricher(EnrichmentCache(path)), ["2024-05-01"])
+    expired = ChainScraper(["a"])
+    run_pipeline(expired, Enricher(EnrichmentCache(path, ttl_hours=0)), ["2024-05-01"])
+
+    assert cached.fetches == []
+    assert len(expired.fetches) == 2
@@ -0,0 +1,70 @@
+import asyncio
+
+from api.events import EventBus
+
+
+async def take(stream, count):
+    events = []
+    async for event in stream:
+        events.append(event)
+        if len(events) == count:
+            break
+    return events
+
+
+def test_subscribers_get_new_events_and_replay_missed_ones():
+    async def run():
+        bus = EventBus(history=3)
+        subscriber = asyncio.create_task(take(bus.subscribe(), 2))
+        await asyncio.sleep(0)
+        bus.publish("scrape", {"status": "started"})
+        bus.publish("data", {"date": "2024-05-01"})
+        live = await subscriber
+
+        replayed = await take(bus.subscribe(last_event_id=1), 1)
+        for i in range(5):
+            bus.publish("data", {"date": f"2024-05-0{i + 2}"})
+        reset = await take(bus.subscribe(last_event_id=1), 1)
+        restarted = await take(bus.subscribe(last_event_id=999), 1)
+        return live, replayed, reset, restarted
+
+    live, replayed, reset, restarted = asyncio.run(run())
+
+    assert [(e.id, e.name) for e in live] == [(1, "scrape"), (2, "data")]
+    assert live[1].encode() == b'id: 2\nevent: data\ndata: {"date": "2024-05-01"}\n\n'
+    assert [(e.id, e.data) for e in replayed] == [(2, {"date": "2024-05-01"})]
+    assert [(e.id, e.name) for e in reset] == [(7, "reset")]
+    assert [e.name for e in restarted] == ["reset"]
+
+
+def test_replays_larger_than_the_buffer_are_resets():
+    async def run():
+        bus = EventBus(history=10, queue_size=2)
+        for i in range(4):
+            bus.publish("data", {"date": str(i)})
+        replayed = await take(bus.subscribe(last_event_id=2), 2)
+        reset = await take(bus.subscribe(last_event_id=1), 1)
+        return replayed, reset
+
+    replayed, reset = asyncio.run(run())
+
+    assert [e.id for e in replayed] == [3, 4]
+    assert [(e.id, e.name) for e in reset] == [(4, "reset")]
+
+
+def test_subscribers_that_fall_behind_are_disconnected():
+    async def run():
+        bus = EventBus(queue_size=2)
+        stream = bus.subscribe()
+        first = asyncio.create_task(stream.__anext__())
+        await asyncio.sleep(0)
+        for i in range(5):
+            bus.publish("data", {"date": str(i)})
+        received = [await first] + [event async for event in stream]
+        return bus, received
+
+    bus, received = asyncio.run(run())
+
+    # What did not fit in the buffer is left for the replay on reconnection
+    assert [e.data["date"] for e in received] == ["1"]
+    assert bus.subscribers == 0
@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import pytest
+
+from api import main
+from models.fields import ALL_MOVIE_FIELDS, parse_movie_fields, parse_theater_fields
+from models.repository import MovieRepository, TheaterRepository
+
+
+def test_fields_render_column_projection():
+    fields = parse_movie_fields("title, image_url,showtimes.time,showtimes.theater,title")
+
+    assert fields.movie_select() == "id, title, films(image_url), showtimes(time, theater)"
+    assert fields.showtime_select() == "time, theater, movies!inner(id, title, films(image_url))"
+    assert parse_movie_fields("title").movie_select() == "id, title"
+    assert parse_movie_fields("showtimes,showtimes.room").showtimes == ("*",)
+    assert parse_movie_fields(None) is ALL_MOVIE_FIELDS
+    assert parse_theater_fields("name,city") == "id, name, city"
+    assert parse_theater_fields("") == "*"
+
+
+@pytest.mark.parametrize("fields", ["cast", "showtimes.price", "films"])
+def test_unknown_fields_are_rejected(fields):
+    with pytest.raises(ValueError):
+        parse_movie_fields(fields)
+
+
+def test_movies_and_showtimes_are_read_in_one_projected_query(fake_client):
+    fake_client.tables["films"] = [{"id": 1, "title": "Dune", "image_url": "dune.jpg"}]
+    fake_client.tables["movies"] = [
+        {"id": 1, "title": "Dune", "date": "2024-05-01", "film_id": 1},
+        {"id": 2, "title": "Alien", "date": "2024-05-02", "film_id": None},
+    ]
+    fake_client.tables["showtimes"] = [{"id": 10, "movie_id": 1, "time": "20:00"}]
+    fields = parse_movie_fields("title,image_url,showtimes.time")
+
+    movies = asyncio.run(MovieRepository.get_movies_with_showtimes("2024-05-01", fields))
+
+    assert fake_client.calls == [("movies", "select")]
+    assert fake_client.selects == [("movies", "id, title, films(image_url), showtimes(time)")]
+    assert movies == [{"id": 1, "title": "Dune", "image_url": "dune.jpg",
+                       "showtimes": [{"time": "20:00"}]}]
+
+
+def test_theater_showtimes_leave_out_unrequested_showtimes(fake_client):
+    fake_client.tables["movies"] = [{"id": 1, "title": "Dune", "date": "2024-05-01"}]
+    fake_client.tables["showtimes"] = [
+        {"id": 10, "theater_id": 7, "movie_id": 1, "start_minute": 1200}]
+
+    movies = asyncio.run(TheaterRepository.get_theater_showtimes(
+        7, "2024-05-01", parse_movie_fields("title")))
+
+    assert fake_client.selects == [("showtimes", "id, movies!inner(id, title)")]
+    assert movies == [{"id": 1, "title": "Dune"}]
+
+
+def test_original_language_filter_works_without_the_language_field(monkeypatch):
+    requested = []
+
+    async def get_movies_with_showtimes(date, fields):
+        requested.append(fields.showtimes)
+        return [
+            {"id": 1, "title": "Dune", "showtimes": [
+                {"time": "18:00", "is_original_language": False},
+                {"time": "21:00", "is_original_language": True}]},
+            {"id": 2, "title": "Alien", "showtimes": [
+                {"time": "20:00", "is_original_language": False}]},
+        ]
+
+    monkeypatch.setattr(MovieRepository, "get_movies_with_showtimes", get_movies_with_showtimes)
+
+    response = asyncio.run(main.get_original_language_movies("2024-05-01", "title,showtimes.time"))
+
+    assert requested == [("time", "is_original_language")]
+    assert json.loads(response.body) == [
+        {"id": 1, "title": "Dune", "showtimes": [{"time": "21:00"}]}]
@@ -0,0 +1,7 @@
+from benchmarks.import_time import FORBIDDEN_MODULES, measure_once
+
+
+def test_api_import_does_not_load_scraper_machinery():
+    _, modules, _ = measure_once("api.main")
+
+    assert [name for name in FORBIDDEN_MODULES if name in modules] == []
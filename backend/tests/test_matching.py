@@ -0,0 +1,45 @@
+from scraper.matching import MovieIndex, merge_movies, normalize_title
+
+
+def showtime(theater, time, **extra):
+    return {"theater": theater, "time": time, "room": "1", **extra}
+
+
+def test_normalize_title_ignores_spelling_variants():
+    variants = ["Dune - Parte Due", "DUNE: PARTE DUE (V.O.)", "Dune parte due [VOS]",
+                "Dune – Parte Due - 3D", " dune, parte due (versione originale sottotitolata)"]
+
+    assert {normalize_title(v) for v in variants} == {"dune parte due"}
+    assert normalize_title("Amélie") == normalize_title("Amelie")
+    assert normalize_title("Alien") != normalize_title("Aliens")
+
+
+def test_merge_matches_titles_across_scrapers_and_drops_repeated_showtimes():
+    movies = [
+        {"title": "Il Gladiatore II", "original_title": "Gladiator II", "date": "2024-05-01",
+         "description": None, "showtimes": [showtime("UCI Bicocca", "20:00")]},
+        {"title": "Il gladiatore II", "date": "2024-05-01",
+         "showtimes": [showtime("UCI Bicocca", "20:00"), showtime("UCI Bicocca", "22:30")]},
+        {"title": "GLADIATOR II (V.O.)", "date": "2024-05-01", "description": "Rome",
+         "showtimes": [showtime("Spazio Cinema", "21:00", is_original_language=True)]},
+        {"title": "Gladiator II", "date": "2024-05-02",
+         "showtimes": [showtime("Spazio Cinema", "21:00")]},
+    ]
+
+    merged = merge_movies(movies)
+
+    assert [(m["date"], m["title"]) for m in merged] == [
+        ("2024-05-01", "Il Gladiatore II"), ("2024-05-02", "Il Gladiatore II")]
+    assert [s["time"] for s in merged[0]["showtimes"]] == ["20:00", "22:30", "21:00"]
+    assert merged[0]["description"] == "Rome"
+    assert movies[0]["showtimes"] == [showtime("UCI Bicocca", "20:00")]
+
+
+def test_index_keeps_canonical_titles_across_batches():
+    index = MovieIndex()
+    index.merge([{"title": "Dune - Parte Due", "date": "2024-05-01", "showtimes": []}])
+
+    later = index.merge([{"title": "DUNE: PARTE DUE", "date": "2024-05-02", "showtimes": []}])
+
+    assert later[0]["title"] == "Dune - Parte Due"
+    assert len(index) == 1
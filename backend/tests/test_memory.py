@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from models.memory import MemoryClient, QueryError
+from models.repository import MovieRepository, TheaterRepository
+
+
+@pytest.fixture
+def memory_client(monkeypatch):
+    client = MemoryClient()
+    monkeypatch.setattr("models.supabase._client", client)
+    return client
+
+
+def make_movie(title, date, theater="UCI Bicocca", times=("20:30", "18:00")):
+    ref = {"source": "uci", "external_id": theater.lower(), "name": theater}
+    return {
+        "title": title,
+        "date": date,
+        "genres": ["Drama"],
+        "showtimes": [{"time": time, "time_text": time, "start_minute": int(time[:2]) * 60,
+                       "theater": theater, "theater_ref": ref} for time in times],
+    }
+
+
+def test_repository_round_trip(memory_client):
+    asyncio.run(MovieRepository.insert_or_update_movies([
+        make_movie("Dune", "2024-05-01"),
+        make_movie("Alien", "2024-05-01"),
+        make_movie("Dune", "2024-05-02"),
+    ]))
+
+    movies = asyncio.run(MovieRepository.get_movies_with_showtimes("2024-05-01"))
+
+    assert [movie["title"] for movie in movies] == ["Alien", "Dune"]
+    assert movies[0]["genres"] == ["Drama"]
+    assert {s["time"] for s in movies[1]["showtimes"]} == {"20:30", "18:00"}
+    assert len(memory_client.tables["films"]) == 2
+
+
+def test_inner_embed_filters_on_embedded_columns(memory_client):
+    asyncio.run(MovieRepository.insert_or_update_movies([
+        make_movie("Dune", "2024-05-01"), make_movie("Dune", "2024-05-02", times=("21:00",))]))
+
+    showtimes = asyncio.run(MovieRepository.get_showtimes_for_date("2024-05-01"))
+
+    assert [s["time"] for s in showtimes] == ["18:00", "20:30"]
+    assert all(s["movie"]["date"] == "2024-05-01" for s in showtimes)
+    theater_id = asyncio.run(TheaterRepository.get_all_theaters())[0]["id"]
+    movies = asyncio.run(TheaterRepository.get_theater_showtimes(theater_id, "2024-05-02"))
+    assert [s["time"] for movie in movies for s in movie["showtimes"]] == ["21:00"]
+
+
+def test_upsert_updates_on_the_conflict_target(memory_client):
+    table = memory_client.table("date_freshness")
+    table.upsert([{"date": "2024-05-01", "refreshed_at": "a"}], on_conflict="date").execute()
+    rows = memory_client.table("date_freshness").upsert(
+        [{"date": "2024-05-01", "refreshed_at": "b"}], on_conflict="date").execute().data
+
+    assert rows[0]["refreshed_at"] == "b"
+    assert len(memory_client.tables["date_freshness"]) == 1
+
+
+def test_indexes_follow_writes(memory_client):
+    memory_client.table("movies").insert([{"title": "Dune", "date": "2024-05-01"}]).execute()
+    assert len(memory_client.table("movies").select("id").eq("date", "2024-05-01").execute().data) == 1
+
+    memory_client.table("movies").insert([{"title": "Alien", "date": "2024-05-01"}]).execute()
+    memory_client.table("movies").update({"date": "2024-05-02"}).eq("title", "Dune").execute()
+    rows = memory_client.table("movies").select("title").eq("date", "2024-05-01").execute().data
+
+    assert rows == [{"title": "Alien"}]
+
+
+def test_single_and_unknown_relationships_raise(memory_client):
+    with pytest.raises(QueryError):
+        memory_client.table("movies").select("*").eq("id", 1).single().execute()
+    with pytest.raises(QueryError):
+        memory_client.table("movies").insert({"title": "Dune"}).execute()
+        memory_client.table("movies").select("*, theaters(name)").execute()
@@ -0,0 +1,146 @@
+from fastapi import FastAPI, HTTPException
+import asyncio
+
+import pytest
+
+from api.metrics import RequestMetricsMiddleware
+from monitoring import metrics
+from monitoring.metrics import Counter, Histogram, Registry
+from scraper.base_scraper import BaseScraper, DriverPool
+from scraper.pipeline import ScrapePipeline
+
+
+def test_render_uses_the_prometheus_text_format():
+    registry = Registry()
+    pages = Counter("pages_total", "Pages loaded", ["scraper"], registry=registry)
+    latency = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0), registry=registry)
+
+    pages.inc(scraper='say "hi"')
+    pages.inc(2, scraper='say "hi"')
+    for value in (0.05, 0.5, 5):
+        latency.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP pages_total Pages loaded",
+        "# TYPE pages_total counter",
+        'pages_total{scraper="say \\"hi\\""} 3',
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 5.55",
+        "latency_seconds_count 3",
+    ]
+
+
+def test_labels_must_match_the_metric():
+    counter = Counter("things_total", "Things", ["kind"], registry=None)
+
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+    with pytest.raises(ValueError):
+        counter.inc(-1, kind="x")
+
+
+def test_db_calls_are_timed_per_method():
+    class Repository:
+        @staticmethod
+        @metrics.db_call
+        async def load():
+            return 42
+
+    method = Repository.load.__qualname__
+    before = metrics.DB_CALL_SECONDS.count(method=method)
+
+    assert asyncio.run(Repository.load()) == 42
+    assert method.endswith("Repository.load")
+    assert metrics.DB_CALL_SECONDS.count(method=method) == before + 1
+
+
+def get(app, path):
+    """Run a GET request through the ASGI app, returning the status"""
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+             "query_string": b"", "root_path": "", "server": ("test", 80),
+             "client": ("test", 1234), "headers": []}
+    asyncio.run(app(scope, receive, send))
+    return messages[0]["status"]
+
+
+def test_requests_are_labelled_with_the_route_template():
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware, routes=app.routes)
+
+    @app.get("/metrics-test/{item}")
+    async def item(item: str):
+        if item == "missing":
+            raise HTTPException(status_code=404)
+        return {"item": item}
+
+    def count(route, status):
+        return metrics.HTTP_REQUEST_SECONDS.count(method="GET", route=route, status=status)
+
+    ok = count("/metrics-test/{item}", 200)
+    not_found = count("/metrics-test/{item}", 404)
+    unmatched = count("unmatched", 404)
+
+    assert get(app, "/metrics-test/a") == 200
+    assert get(app, "/metrics-test/b") == 200
+    assert get(app, "/metrics-test/missing") == 404
+    assert get(app, "/nowhere") == 404
+
+    assert count("/metrics-test/{item}", 200) == ok + 2
+    assert count("/metrics-test/{item}", 404) == not_found + 1
+    assert count("unmatched", 404) == unmatched + 1
+
+
+def test_driver_pool_gauges_follow_borrows():
+    pool = DriverPool(object, size=2, name="metrics-test")
+
+    def drivers(state):
+        return metrics.DRIVER_POOL_DRIVERS.value(scraper="metrics-test", state=state)
+
+    with pool.driver():
+        with pool.driver():
+            assert (drivers("busy"), drivers("idle")) == (2, 0)
+        assert (drivers("busy"), drivers("idle")) == (1, 1)
+    assert (drivers("busy"), drivers("idle")) == (0, 2)
+
+
+class FakeScraper(BaseScraper):
+    def __init__(self):
+        super().__init__("https://example.invalid")
+        self.name = "metrics-test"
+
+    def get_movies_for_date(self, date):
+        return [{"title": f"Movie {i}", "date": date,
+                 "showtimes": [{"time": "20:00", "theater": "A"},
+                               {"time": "22:00", "theater": "A"}]}
+                for i in range(3)]
+
+
+def test_pipeline_counts_movies_and_showtimes():
+    async def writer(batch):
+        pass
+
+    movies = metrics.SCRAPED_MOVIES.value(scraper="metrics-test")
+    showtimes = metrics.SCRAPED_SHOWTIMES.value(scraper="metrics-test")
+
+    asyncio.run(ScrapePipeline(writer, queue_size=1, batch_size=2).run([FakeScraper()], "2024-05-01"))
+
+    assert metrics.SCRAPED_MOVIES.value(scraper="metrics-test") == movies + 3
+    assert metrics.SCRAPED_SHOWTIMES.value(scraper="metrics-test") == showtimes + 6
+    assert metrics.SCRAPE_QUEUE_DEPTH.value() == 0
+    assert "movieobserver_scraped_movies_total{scraper=\"metrics-test\"}" in metrics.REGISTRY.render()
@@ -0,0 +1,148 @@
+import sqlite3
+
+import pytest
+
+from models.migrations import MIGRATIONS, connect, latest_version, migration_sql
+
+
+def index_names(runner):
+    rows = runner.connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+    return {row[0] for row in rows}
+
+
+def test_apply_creates_schema_and_is_idempotent(tmp_path):
+    runner = connect(f"sqlite:///{tmp_path / 'db.sqlite3'}")
+
+    applied = runner.apply()
+    assert [m.version for m in applied] == [m.version for m in MIGRATIONS]
+    assert {"movies_date_title_key", "idx_showtimes_movie_theater"} <= index_names(runner)
+
+    assert runner.apply() == []
+    assert runner.pending() == []
+    assert max(runner.applied_versions()) == latest_version()
+
+
+def test_unique_key_removes_and_prevents_duplicates(tmp_path):
+    runner = connect(f"sqlite:///{tmp_path / 'db.sqlite3'}")
+    runner.apply(target=1)
+    conn = runner.connection
+    conn.execute("INSERT INTO movies (title, date) VALUES ('Dune', '2024-05-01')")
+    conn.execute("INSERT INTO movies (title, date) VALUES ('Dune', '2024-05-01')")
+
+    runner.apply()
+
+    assert conn.execute("SELECT COUNT(*) FROM movies").fetchone()[0] == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO movies (title, date) VALUES ('Dune', '2024-05-01')")
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    runner = connect(f"sqlite:///{tmp_path / 'db.sqlite3'}")
+    runner.apply()
+    conn = runner.connection
+
+    movies_plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM movies WHERE date = ? ORDER BY title",
+        ("2024-05-01",)).fetchall()
+    showtimes_plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM showtimes WHERE movie_id = ?", (1,)).fetchall()
+
+    assert "movies_date_title_key" in str(movies_plan)
+    assert "idx_showtimes_movie_theater" in str(showtimes_plan)
+
+
+def test_printed_sql_only_contains_newer_migrations():
+    sql = migration_sql(after=1)
+
+    assert "CREATE TABLE IF NOT EXISTS movies" not in sql
+    assert "movies_date_title_key" in sql
+
+
+def test_films_migration_moves_metadata_out_of_movies(tmp_path):
+    runner = connect(f"sqlite:///{tmp_path / 'db.sqlite3'}")
+    runner.apply(target=2)
+    conn = runner.connection
+    conn.execute("INSERT INTO movies (title, date, description) VALUES ('Dune', '2024-05-01', 'old')")
+    conn.execute("INSERT INTO movies (title, date, description) VALUES ('Dune ', '2024-05-02', 'new')")
+
+    runner.apply()
+
+    films = conn.execute("SELECT id, key, description FROM films").fetchall()
+    assert [(key, description) for _, key, description in films] == [("dune", "new")]
+    film_ids = conn.execute("SELECT DISTINCT film_id FROM movies").fetchall()
+    assert film_ids == [(films[0][0],)]
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(movies)")}
+    assert "description" not in columns
+
+
+def test_theater_migration_links_showtimes_by_name(tmp_path):
+    runner = connect(f"sqlite:///{tmp_path / 'db.sqlite3'}")
+    runner.apply(target=3)
+    conn = runner.connection
+    conn.execute("INSERT INTO theaters (name, city) VALUES ('Anteo', 'Milano')")
+    conn.execute("INSERT INTO movies (title, date) VALUES ('Dune', '2024-05-01')")
+    conn.execute("INSERT INTO showtimes (movie_id, time, theater) VALUES (1, '20:00', 'Anteo')")
+
+    runner.apply()
+
+    assert conn.execute("SELECT theater_id FROM showtimes").fetchall() == [(1,)]
+    conn.execute("INSERT INTO theaters (name, source, external_id) VALUES ('UCI', 'uci', 'x')")
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO theaters (name, source, external_id) VALUES ('UCI', 'uci', 'x')")
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM showtimes WHERE theater_id = ?", (1,)).fetchall()
+    assert "idx_showtimes_theater_movie" in str(plan)
+
+
+def test_start_minute_migration_backfills_showtimes(tmp_path):
+    runner = connect(f"sqlite:///{tmp_path / 'db.sqlite3'}")
+    runner.apply(target=5)
+    conn = runner.connection
+    conn.execute("INSERT INTO movies (title, date) VALUES ('Dune', '2024-05-01')")
+    conn.execute("INSERT INTO showtimes (movie_id, time, theater) VALUES (1, '20:30', 'Anteo')")
+    conn.execute("INSERT INTO showtimes (movie_id, time, theater) VALUES (1, '00:15', 'Anteo')")
+
+    runner.apply()
+
+    rows = conn.execute("SELECT time_text, start_minute FROM showtimes ORDER BY id").fetchall()
+    assert rows == [("20:30", 1230), ("00:15", 1455)]
+
+
+def test_film_key_migration_merges_spelling_variants(tmp_path):
+    runner = connect(f"sqlite:///{tmp_path / 'db.sqlite3'}")
+    runner.apply(target=6)
+    conn = runner.connection
+    conn.execute("INSERT INTO films (key, title) VALUES ('dune - parte due', 'Dune - Parte Due')")
+    conn.execute("INSERT INTO films (key, title) VALUES ('dune: parte due', 'DUNE: PARTE DUE')")
+    conn.execute("INSERT INTO movies (title, date, film_id) VALUES ('Dune - Parte Due', '2024-05-01', 1)")
+    conn.execute("INSERT INTO movies (title, date, film_id) VALUES ('DUNE: PARTE DUE', '2024-05-01', 2)")
+    conn.execute("INSERT INTO showtimes (movie_id, time, theater) VALUES (1, '18:00', 'A')")
+    conn.execute("INSERT INTO showtimes (movie_id, time, theater) VALUES (2, '21:00', 'B')")
+
+    runner.apply()
+
+    assert conn.execute("SELECT id, key, title FROM films").fetchall() == [
+        (1, "dune parte due", "Dune - Parte Due")]
+    assert conn.execute("SELECT id, title FROM movies").fetchall() == [(1, "Dune - Parte Due")]
+    assert conn.execute("SELECT movie_id FROM showtimes").fetchall() == [(1,), (1,)]
+    assert "Data step" in migration_sql(after=6)
+
+
+def test_sql_editor_script_leaves_data_steps_pending(monkeypatch, capsys):
+    import asyncio
+
+    from models.memory import MemoryClient
+    from models.supabase import init_database
+
+    client = MemoryClient()
+    client.table("schema_migrations").insert(
+        [{"version": m.version, "name": m.name} for m in MIGRATIONS if m.version < 7]).execute()
+    monkeypatch.setattr("models.supabase._client", client)
+
+    asyncio.run(init_database())
+
+    output = capsys.readouterr().out
+    assert "VALUES (7," not in output
+    assert "VALUES (8," in output
+    assert "python -m models.migrations" in output.split("---------------------------------")[-1]
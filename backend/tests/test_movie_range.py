@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from api import main
+from models.fields import parse_movie_fields
+from models.repository import MovieRepository
+
+
+def test_range_is_read_in_one_query_and_grouped_by_date(fake_client):
+    fake_client.tables["movies"] = [
+        {"id": 1, "title": "Dune", "date": "2024-05-03"},
+        {"id": 2, "title": "Alien", "date": "2024-05-01"},
+        {"id": 3, "title": "Babe", "date": "2024-05-01"},
+        {"id": 4, "title": "Cars", "date": "2024-05-09"},
+    ]
+
+    by_date = asyncio.run(MovieRepository.get_movies_for_range(
+        "2024-05-01", "2024-05-03", parse_movie_fields("title")))
+
+    assert fake_client.calls == [("movies", "select")]
+    assert fake_client.selects == [("movies", "id, title, date")]
+    assert {date: [m["title"] for m in movies] for date, movies in by_date.items()} == {
+        "2024-05-01": ["Alien", "Babe"], "2024-05-02": [], "2024-05-03": ["Dune"]}
+
+
+@pytest.mark.parametrize("start, end", [
+    ("2024-05-01", None), ("2024-05-01", "tomorrow"),
+    ("2024-05-03", "2024-05-01"), ("2024-05-01", "2024-06-30"),
+])
+def test_bad_or_long_ranges_are_rejected(start, end):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.get_all_movies(None, start, end))
+
+    assert error.value.status_code == 400
+
+
+def test_range_endpoint_returns_movies_by_date(monkeypatch):
+    async def get_movies_for_range(start, end, fields):
+        return {"2024-05-01": [{"id": 1, "title": "Dune"}], "2024-05-02": []}
+
+    monkeypatch.setattr(MovieRepository, "get_movies_for_range", get_movies_for_range)
+
+    response = asyncio.run(main.get_all_movies(None, "2024-05-01", "2024-05-02"))
+
+    assert json.loads(response.body) == {"2024-05-01": [{"id": 1, "title": "Dune"}],
+                                         "2024-05-02": []}
@@ -0,0 +1,176 @@
+import asyncio
+import time
+
+from scraper.base_scraper import BaseScraper
+from scraper.pipeline import ScrapePipeline
+from scraper.records import MovieRecord
+from scraper.units import ScrapeUnit
+
+
+class FakeScraper(BaseScraper):
+    """Scraper yielding a fixed list of movies without touching the network"""
+
+    def __init__(self, movies):
+        super().__init__("https://example.invalid")
+        self.movies = movies
+
+    def get_movies_for_date(self, date):
+        return [dict(movie) for movie in self.movies]
+
+
+def make_movie(title, theater, time):
+    return {
+        "title": title,
+        "date": "2000-01-01",
+        "showtimes": [{"time": time, "theater": theater}],
+    }
+
+
+def test_pipeline_writes_all_movies_in_batches():
+    batches = []
+
+    async def writer(batch):
+        batches.append(batch)
+
+    scrapers = [
+        FakeScraper([make_movie(f"Movie {i}", "A", "20:00") for i in range(7)]),
+        FakeScraper([make_movie(f"Other {i}", "B", "21:00") for i in range(5)]),
+    ]
+    pipeline = ScrapePipeline(writer, queue_size=2, batch_size=3)
+
+    written = asyncio.run(pipeline.run(scrapers, "2024-05-01"))
+
+    assert written == 12
+    assert all(len(batch) <= 3 for batch in batches)
+    stored = [movie for batch in batches for movie in batch]
+    assert {movie["date"] for movie in stored} == {"2024-05-01"}
+
+
+def test_pipeline_merges_repeated_titles_within_a_batch():
+    batches = []
+
+    async def writer(batch):
+        batches.append(batch)
+
+    scrapers = [FakeScraper([
+        make_movie("Dune", "A", "20:00"),
+        make_movie("Dune", "B", "22:00"),
+    ])]
+
+    asyncio.run(ScrapePipeline(writer).run(scrapers, "2024-05-01"))
+
+    assert len(batches) == 1
+    assert sorted(s["theater"] for s in batches[0][0]["showtimes"]) == ["A", "B"]
+
+
+def test_pipeline_titles_do_not_outlive_a_run():
+    async def writer(batch):
+        pass
+
+    pipeline = ScrapePipeline(writer)
+    asyncio.run(pipeline.run([FakeScraper([make_movie("Dune", "A", "20:00")])], "2024-05-01"))
+    asyncio.run(pipeline.run([FakeScraper([make_movie("Alien", "A", "20:00")])], "2024-05-02"))
+
+    assert len(pipeline.titles) == 1
+
+
+def test_pipeline_reports_units_after_their_movies_are_stored():
+    events = []
+
+    async def writer(batch):
+        events.extend(("stored", movie["title"]) for movie in batch)
+
+    async def on_unit_done(result):
+        events.append(("done", result.movies))
+
+    scrapers = [FakeScraper([make_movie("Dune", "A", "20:00"),
+                             make_movie("Alien", "A", "22:00")])]
+    pipeline = ScrapePipeline(writer, batch_size=10, on_unit_done=on_unit_done)
+
+    asyncio.run(pipeline.run(scrapers, "2024-05-01"))
+
+    assert events == [("stored", "Dune"), ("stored", "Alien"), ("done", 2)]
+    assert len(pipeline.completed_units[0].result_hash) == 64
+
+
+def test_pipeline_survives_failing_scraper():
+    stored = []
+
+    async def writer(batch):
+        stored.extend(batch)
+
+    class BrokenScraper(FakeScraper):
+        def get_movies_for_date(self, date):
+            raise RuntimeError("site down")
+
+    scrapers = [BrokenScraper([]), FakeScraper([make_movie("Dune", "A", "20:00")])]
+
+    written = asyncio.run(ScrapePipeline(writer).run(scrapers, "2024-05-01"))
+
+    assert written == 1
+    assert stored[0]["title"] == "Dune"
+
+
+def test_pipeline_defers_units_past_the_time_budget():
+    class SlowScraper(FakeScraper):
+        def scrape_unit(self, unit):
+            time.sleep(0.2)
+            yield make_movie(f"Movie {unit.cinema}", unit.cinema, "20:00")
+
+    async def writer(batch):
+        pass
+
+    scraper = SlowScraper([])
+    units = [ScrapeUnit(scraper="slow", date="2024-05-01", cinema=str(i)) for i in range(6)]
+    pipeline = ScrapePipeline(writer)
+
+    asyncio.run(pipeline.run_units([(scraper, units)], budget_seconds=0.5))
+
+    completed = [result.unit for result in pipeline.completed_units]
+    assert 1 <= len(completed) < 6
+    assert completed + pipeline.deferred_units == units
+
+
+def test_abandoned_units_failing_later_are_not_scrape_errors(caplog):
+    class HangingScraper(FakeScraper):
+        def scrape_unit(self, unit):
+            time.sleep(0.3)
+            # e.g. the browser was quit while the run was shutting down
+            raise RuntimeError("session deleted")
+            yield
+
+    async def writer(batch):
+        pass
+
+    units = [ScrapeUnit(scraper="hanging", date="2024-05-01", cinema="a")]
+    pipeline = ScrapePipeline(writer)
+
+    # asyncio.run waits for the abandoned worker thread before returning
+    asyncio.run(pipeline.run_units([(HangingScraper([]), units)], budget_seconds=0.1))
+
+    assert pipeline.deferred_units == units
+    assert pipeline.failed_units == set()
+    assert not [r for r in caplog.records if r.levelname == "ERROR"]
+
+
+def test_each_movie_is_converted_to_a_dict_once(monkeypatch):
+    calls = []
+    to_dict = MovieRecord.to_dict
+
+    def counting_to_dict(self):
+        calls.append(self.title)
+        return to_dict(self)
+
+    monkeypatch.setattr(MovieRecord, "to_dict", counting_to_dict)
+    stored = []
+
+    async def writer(batch):
+        stored.extend(batch)
+
+    scraper = FakeScraper([make_movie(f"Movie {i}", "A", "20:00") for i in range(5)])
+    pipeline = ScrapePipeline(writer, batch_size=2)
+    asyncio.run(pipeline.run([scraper], "2024-05-01"))
+
+    assert len(stored) == 5
+    assert sorted(calls) == [f"Movie {i}" for i in range(5)]
+    assert pipeline.completed_units[0].result_hash
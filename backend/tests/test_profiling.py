@@ -0,0 +1,115 @@
+from fastapi import FastAPI
+import asyncio
+import os
+import pstats
+import time
+
+from api.profiling import ProfilingMiddleware
+from models.repository import FreshnessRepository, MovieRepository
+from monitoring.profiling import SamplingProfiler, profile
+from scraper.base_scraper import BaseScraper
+from scraper.checkpoint import CheckpointStore
+from scraper.scraper_service import ScraperService
+from scraper.units import ScrapeUnit
+
+
+def busy_parse(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampler_folds_stacks_by_stage():
+    sampler = SamplingProfiler(interval=0.001, stages={"busy_parse": "parse"})
+    sampler.start()
+    busy_parse(0.1)
+    sampler.stop()
+
+    assert "parse" in sampler.samples
+    stack, count = sampler.folded("parse").splitlines()[0].rsplit(" ", 1)
+    assert stack.startswith("MainThread;")
+    assert stack.split(";")[-1].startswith("busy_parse (test_profiling.py:")
+    assert int(count) > 0
+
+
+def test_cprofile_writes_pstats(tmp_path):
+    with profile(str(tmp_path), "unit", "cprofile"):
+        busy_parse(0.01)
+
+    [path] = os.listdir(tmp_path)
+    assert path.startswith("unit-") and path.endswith(".prof")
+    stats = pstats.Stats(str(tmp_path / path))
+    assert any(name == "busy_parse" for _, _, name in stats.stats)
+
+
+class SlowScraper(BaseScraper):
+    def __init__(self):
+        super().__init__("https://example.invalid")
+        self.name = "slow"
+
+    def get_movies_for_date(self, date):
+        return []
+
+    def list_units(self, date):
+        return [ScrapeUnit(scraper=self.name, date=date, cinema="a")]
+
+    def scrape_unit(self, unit):
+        busy_parse(0.1)
+        yield {"title": "Dune", "showtimes": [{"theater": "A", "time": "20:00"}]}
+
+
+class Registry:
+    def due_scrapers(self, date_str, force=False):
+        return [SlowScraper()]
+
+    def mark_refreshed(self, name, date_str):
+        pass
+
+
+def test_scrape_runs_are_profiled_per_stage(tmp_path, monkeypatch):
+    async def writer(batch, replaced=None):
+        return batch
+
+    async def mark_refreshed(dates):
+        pass
+
+    monkeypatch.setattr(MovieRepository, "insert_or_update_movies", writer)
+    monkeypatch.setattr(FreshnessRepository, "mark_refreshed", mark_refreshed)
+    service = ScraperService(Registry(), checkpoints=CheckpointStore(str(tmp_path / "c.sqlite3")),
+                             profile_dir=str(tmp_path / "profiles"))
+
+    asyncio.run(service.run(["2024-05-01"]))
+
+    files = sorted(os.listdir(tmp_path / "profiles"))
+    assert any(name.startswith("scrape-2024-05-01-") and name.endswith(".scrape.folded")
+               for name in files)
+    [run] = [name for name in files if name.count(".") == 1]
+    assert "busy_parse" in (tmp_path / "profiles" / run).read_text()
+
+
+def test_sampled_requests_are_profiled(tmp_path):
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        busy_parse(0.05)
+        return {}
+
+    middleware = ProfilingMiddleware(app, str(tmp_path), sample_rate=1.0)
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        return requests.pop()
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": "GET", "scheme": "http", "path": "/slow", "raw_path": b"/slow",
+             "query_string": b"", "root_path": "", "server": ("test", 80),
+             "client": ("test", 1234), "headers": []}
+    asyncio.run(middleware(scope, receive, send))
+
+    [path] = os.listdir(tmp_path)
+    assert path.startswith("request-GET-_slow-") and path.endswith(".folded")
+    assert "busy_parse" in (tmp_path / path).read_text()
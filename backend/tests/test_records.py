@@ -0,0 +1,29 @@
+from scraper.records import MovieRecord, ShowtimeRecord, as_record, validate_movies
+
+
+def test_legacy_dicts_map_to_record_fields():
+    record = as_record({"title": "Dune", "poster_url": "p.jpg", "synopsis": "Arrakis",
+                        "theater_id": "ignored",
+                        "showtimes": [{"time": "20:00", "theater": "A", "theater_screen": "x"}]})
+
+    assert record.image_url == "p.jpg"
+    assert record.description == "Arrakis"
+    assert record.showtimes[0].to_dict()["room"] is None
+    assert not hasattr(record, "__dict__")
+
+
+def test_batch_validation_coerces_and_drops_invalid_movies():
+    records = [
+        MovieRecord(title="Dune", date="2024-05-01", duration="155", showtimes=[
+            ShowtimeRecord(time="20:00", theater="A", is_original_language=True)]),
+        MovieRecord(title="Broken", date="2024-05-01", showtimes=[
+            ShowtimeRecord(time="21:00", theater=None)]),
+        MovieRecord(title="Alien", date="2024-05-01"),
+    ]
+
+    movies = validate_movies([record.to_dict() for record in records])
+
+    assert [m["title"] for m in movies] == ["Dune", "Alien"]
+    assert movies[0]["duration"] == 155
+    assert movies[0]["showtimes"][0]["is_original_language"] is True
+    assert "created_at" not in movies[0]
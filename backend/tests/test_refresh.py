@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from api.refresh import FRESH, MISSING, STALE, RefreshCoordinator
+
+TODAY = datetime.now().strftime("%Y-%m-%d")
+TOMORROW = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def test_stale_and_missing_dates_are_refreshed_once():
+    loads = []
+    refreshes = []
+    scraped = {TODAY: datetime.now(timezone.utc) - timedelta(hours=12)}
+
+    async def loader(dates):
+        loads.append(dates)
+        return {date: scraped[date] for date in dates if date in scraped}
+
+    async def refresher(date):
+        refreshes.append(date)
+        await asyncio.sleep(0.01)
+        scraped[date] = datetime.now(timezone.utc)
+
+    async def run():
+        coordinator = RefreshCoordinator(loader, refresher, stale_after=3600)
+        # A burst of reads while the refreshes run
+        states = await asyncio.gather(*(coordinator.check([TODAY, TOMORROW]) for _ in range(10)))
+        await asyncio.sleep(0.05)
+        # Retried too soon, and fresh again anyway
+        after = await coordinator.check([TODAY, TOMORROW])
+        cached = await coordinator.check([TODAY])
+        return states, after, cached
+
+    states, after, cached = asyncio.run(run())
+
+    assert all(s == {TODAY: STALE, TOMORROW: MISSING} for s in states)
+    assert sorted(refreshes) == sorted([TODAY, TOMORROW])
+    assert after == {TODAY: FRESH, TOMORROW: FRESH}
+    assert cached == {TODAY: FRESH}
+    # Fresh dates are remembered without querying again
+    assert len(loads) == 11
+
+
+def test_dates_outside_the_window_are_not_refreshed():
+    refreshes = []
+
+    async def loader(dates):
+        raise AssertionError("no lookup expected")
+
+    async def refresher(date):
+        refreshes.append(date)
+
+    past = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    far = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+    coordinator = RefreshCoordinator(loader, refresher)
+
+    states = asyncio.run(coordinator.check([past, far, "not-a-date"]))
+
+    assert states == {}
+    assert refreshes == []
@@ -0,0 +1,91 @@
+import json
+import sys
+from datetime import datetime, timedelta
+
+from scraper.base_scraper import DriverPool
+from scraper.registry import ScraperConfig, ScraperRegistry
+
+TODAY = datetime.now().strftime("%Y-%m-%d")
+
+
+def make_registry(**overrides):
+    entry = {
+        "name": "example",
+        "class": "scraper.cinema_scraper.CinemaScraper",
+        "base_url": "https://cinema.invalid",
+        "concurrency": 3,
+        "requests_per_minute": 120,
+        "timeout": 5,
+        **overrides,
+    }
+    return ScraperRegistry([ScraperConfig.model_validate(entry)])
+
+
+def test_registry_loads_config_file(tmp_path):
+    path = tmp_path / "scrapers.json"
+    path.write_text(json.dumps({"scrapers": [
+        {"name": "example", "class": "scraper.cinema_scraper.CinemaScraper"},
+        {"name": "off", "class": "scraper.missing.Scraper", "enabled": False},
+    ]}))
+
+    registry = ScraperRegistry.from_file(str(path))
+
+    assert [c.name for c in registry.enabled_configs()] == ["example"]
+
+
+def test_disabled_scrapers_are_never_imported():
+    registry = make_registry(**{"class": "scraper.does_not_exist.Scraper", "enabled": False})
+
+    assert registry.enabled_scrapers() == []
+    assert "scraper.does_not_exist" not in sys.modules
+
+
+def test_budgets_are_applied_to_instances():
+    scraper = make_registry().get("example")
+
+    assert scraper.name == "example"
+    assert scraper.base_url == "https://cinema.invalid"
+    assert scraper.concurrency == 3
+    assert scraper.timeout == 5
+    assert scraper.rate_limiter.interval == 0.5
+
+
+def test_due_scrapers_respects_refresh_interval_and_horizon():
+    registry = make_registry(refresh_interval_minutes=60, days_ahead=2)
+    far = (datetime.now() + timedelta(days=5)).strftime("%Y-%m-%d")
+
+    assert len(registry.due_scrapers(TODAY)) == 1
+    assert registry.due_scrapers(far) == []
+
+    registry.mark_refreshed("example", TODAY)
+    assert registry.due_scrapers(TODAY) == []
+    assert len(registry.due_scrapers(TODAY, force=True)) == 1
+
+
+def test_horizon_is_the_largest_days_ahead():
+    registry = ScraperRegistry([
+        ScraperConfig.model_validate({"name": "a", "class": "x.A", "days_ahead": 7}),
+        ScraperConfig.model_validate({"name": "b", "class": "x.B", "days_ahead": 3}),
+        ScraperConfig.model_validate({"name": "c", "class": "x.C", "enabled": False}),
+    ])
+
+    assert registry.horizon() == 7
+    assert make_registry().horizon() is None
+
+
+def test_drivers_returned_after_the_pool_closed_are_quit():
+    class Driver:
+        def __init__(self):
+            self.quit_called = False
+
+        def quit(self):
+            self.quit_called = True
+
+    pool = DriverPool(Driver, size=2)
+    with pool.driver() as borrowed:
+        with pool.driver() as idle:
+            pass
+        pool.close()
+        assert idle.quit_called and not borrowed.quit_called
+
+    assert borrowed.quit_called
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+
+from models.repository import FilmRepository, MovieRepository, MovieWriter, TheaterRepository
+from scraper.pipeline import ScrapePipeline
+from scraper.units import ScrapeUnit
+
+
+def make_movie(date, description="A desert planet", theater="A"):
+    return {
+        "title": "Dune",
+        "date": date,
+        "description": description,
+        "showtimes": [{"time": "20:00", "theater": theater}],
+    }
+
+
+def test_films_are_stored_once_across_dates(fake_client):
+    asyncio.run(MovieRepository.insert_or_update_movies(
+        [make_movie("2024-05-01"), make_movie("2024-05-02")]))
+
+    films = fake_client.tables["films"]
+    movies = fake_client.tables["movies"]
+    assert len(films) == 1
+    assert films[0]["description"] == "A desert planet"
+    assert [m["film_id"] for m in movies] == [films[0]["id"]] * 2
+    assert all("description" not in m for m in movies)
+
+
+def test_batch_writes_run_off_the_event_loop(fake_client):
+    async def store():
+        await MovieRepository.insert_or_update_movies([make_movie("2024-05-01")])
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(store())
+
+    assert fake_client.threads and loop_thread not in fake_client.threads
+
+
+def test_unchanged_metadata_is_not_rewritten(fake_client):
+    asyncio.run(MovieRepository.insert_or_update_movies([make_movie("2024-05-01")]))
+    fake_client.calls.clear()
+
+    asyncio.run(MovieRepository.insert_or_update_movies([make_movie("2024-05-01")]))
+    writes = [c for c in fake_client.calls if c[1] in ("insert", "upsert") and c[0] != "showtimes"]
+    assert writes == []
+
+    # A scrape missing a field keeps the stored value
+    asyncio.run(MovieRepository.insert_or_update_movies(
+        [make_movie("2024-05-01", description=None)]))
+    assert fake_client.tables["films"][0]["description"] == "A desert planet"
+
+    asyncio.run(MovieRepository.insert_or_update_movies(
+        [make_movie("2024-05-01", description="Arrakis")]))
+    assert ("films", "upsert") in fake_client.calls
+    assert fake_client.tables["films"][0]["description"] == "Arrakis"
+
+
+def theater_ref(external_id="bicocca", name="UCI Bicocca"):
+    return {"source": "uci", "external_id": external_id, "name": name,
+            "city": None, "address": None, "website": None}
+
+
+def test_showtimes_reference_upserted_theaters(fake_client):
+    movie = make_movie("2024-05-01", theater="UCI Bicocca")
+    movie["showtimes"][0]["theater_ref"] = theater_ref()
+
+    asyncio.run(MovieRepository.insert_or_update_movies([movie]))
+    fake_client.calls.clear()
+    asyncio.run(MovieRepository.insert_or_update_movies([movie]))
+
+    theaters = fake_client.tables["theaters"]
+    showtimes = fake_client.tables["showtimes"]
+    assert [(t["source"], t["external_id"]) for t in theaters] == [("uci", "bicocca")]
+    assert [s["theater_id"] for s in showtimes] == [theaters[0]["id"]]
+    assert "theater_ref" not in showtimes[0]
+    assert ("theaters", "upsert") not in fake_client.calls
+    assert ("theaters", "insert") not in fake_client.calls
+
+
+def test_theater_showtimes_are_grouped_by_movie(fake_client):
+    fake_client.tables["films"] = [
+        {"id": 1, "title": "Dune", "description": "Arrakis"}, {"id": 2, "title": "Alien"}]
+    fake_client.tables["movies"] = [
+        {"id": 1, "title": "Dune", "date": "2024-05-01", "film_id": 1},
+        {"id": 2, "title": "Alien", "date": "2024-05-01", "film_id": 2},
+    ]
+    fake_client.tables["showtimes"] = [
+        {"id": 10, "theater_id": 7, "movie_id": 1, "time": "22:00", "start_minute": 1320},
+        {"id": 11, "theater_id": 7, "movie_id": 1, "time": "18:00", "start_minute": 1080},
+        {"id": 12, "theater_id": 7, "movie_id": 2, "time": "20:00", "start_minute": 1200},
+        {"id": 13, "theater_id": 8, "movie_id": 2, "time": "20:00", "start_minute": 1200},
+        {"id": 14, "theater_id": 7, "movie_id": 1, "time": "00:30", "start_minute": 1470},
+    ]
+
+    movies = asyncio.run(TheaterRepository.get_theater_showtimes(7, "2024-05-01"))
+
+    assert fake_client.calls == [("showtimes", "select")]
+    assert [m["title"] for m in movies] == ["Alien", "Dune"]
+    assert [s["time"] for s in movies[1]["showtimes"]] == ["18:00", "22:00", "00:30"]
+    assert movies[1]["description"] == "Arrakis"
+
+
+def test_films_stored_concurrently_are_upserted_on_their_key(fake_client):
+    asyncio.run(MovieRepository.insert_or_update_movies([make_movie("2024-05-01")]))
+    film_id = fake_client.tables["films"][0]["id"]
+
+    # Another worker stored the film after this worker looked it up
+    select = fake_client.table
+
+    def table(name):
+        query = select(name)
+        if name == "films":
+            query.in_ = lambda column, values: query.eq("key", None)
+        return query
+
+    fake_client.table = table
+    films = asyncio.run(FilmRepository.upsert_films([make_movie("2024-05-02")]))
+
+    assert [film["id"] for film in films.values()] == [film_id]
+    assert len(fake_client.tables["films"]) == 1
+
+
+def test_showtimes_split_over_batches_are_all_kept(fake_client):
+    class SplitScraper:
+        name = "uci"
+        concurrency = 1
+
+        def __init__(self, times):
+            self.times = times
+
+        def scrape_unit(self, unit):
+            for title, time, original in self.times:
+                yield {"title": title, "showtimes": [
+                    {"time": time, "theater": "UCI Bicocca", "is_original_language": original}]}
+
+    unit = ScrapeUnit(scraper="uci", date="2024-05-01", cinema="bicocca")
+    pipeline = ScrapePipeline(MovieWriter(), batch_size=1)
+
+    asyncio.run(pipeline.run_units([(SplitScraper(
+        [("Dune", "18:00", False), ("Dune (V.O.)", "21:00", True)]), [unit])]))
+    assert sorted((s["time"], s["is_original_language"])
+                  for s in fake_client.tables["showtimes"]) == [("18:00", False), ("21:00", True)]
+
+    # The next run replaces them
+    asyncio.run(pipeline.run_units([(SplitScraper([("Dune", "19:00", False)]), [unit])]))
+    assert [s["time"] for s in fake_client.tables["showtimes"]] == ["19:00"]
+
+
+def test_spelling_variants_share_the_stored_film_and_title(fake_client):
+    first = {"title": "Dune - Parte Due (V.O.)", "date": "2024-05-01",
+             "showtimes": [{"time": "18:00", "theater": "A"}]}
+    asyncio.run(MovieRepository.insert_or_update_movies([first]))
+
+    # Another worker, with its own in-memory title index, sees other spellings
+    later = [
+        {"title": "DUNE: PARTE DUE", "date": "2024-05-01",
+         "showtimes": [{"time": "21:00", "theater": "B"}]},
+        {"title": "Dune parte due", "date": "2024-05-02",
+         "showtimes": [{"time": "20:00", "theater": "A"}]},
+    ]
+    asyncio.run(MovieRepository.insert_or_update_movies(later))
+
+    films = fake_client.tables["films"]
+    assert [(f["key"], f["title"]) for f in films] == [("dune parte due", "Dune - Parte Due")]
+    assert sorted((m["date"], m["title"]) for m in fake_client.tables["movies"]) == [
+        ("2024-05-01", "Dune - Parte Due"), ("2024-05-02", "Dune - Parte Due")]
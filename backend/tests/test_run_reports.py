@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from api import main
+from models.repository import FreshnessRepository, MovieRepository
+from scraper.base_scraper import BaseScraper
+from scraper.checkpoint import CheckpointStore
+from scraper.pipeline import ScrapePipeline
+from scraper.report import COMPLETED, FAILED, PARTIAL, RunReport
+from scraper.scraper_service import ScraperService
+from scraper.units import ScrapeUnit
+
+
+class ReportingScraper(BaseScraper):
+    """Scraper recording one page per cinema, failing on chosen cinemas"""
+
+    def __init__(self, cinemas, broken=()):
+        super().__init__("https://example.invalid")
+        self.name = "chain"
+        self.cinemas = cinemas
+        self.broken = set(broken)
+
+    def get_movies_for_date(self, date):
+        return []
+
+    def list_units(self, date):
+        return [ScrapeUnit(scraper=self.name, date=date, cinema=c) for c in self.cinemas]
+
+    def scrape_unit(self, unit):
+        if unit.cinema in self.broken:
+            self.record_page("selenium", None)
+            raise RuntimeError("page did not load")
+        self.record_stage("render", 0.5)
+        self.record_page("selenium", "<html>è</html>")
+        self.record_stage("parse", 0.25)
+        for title in ("Dune", "Alien"):
+            yield {"title": title, "showtimes": [{"theater": unit.cinema, "time": "20:00"}]}
+
+
+def test_units_are_reported_with_their_stages():
+    async def writer(batch):
+        await asyncio.sleep(0.01)
+
+    scraper = ReportingScraper(["a", "b", "c"], broken=["c"])
+    report = RunReport(["2024-05-01"])
+    pipeline = ScrapePipeline(writer, batch_size=10)
+
+    written = asyncio.run(pipeline.run_units(
+        [(scraper, scraper.list_units("2024-05-01"))], report=report))
+    report.finish(written)
+
+    a = report.units[("chain", "a", "2024-05-01")]
+    assert a.status == COMPLETED
+    assert (a.pages, a.bytes, a.errors, a.movies, a.rows_written) == (1, 14, 0, 2, 2)
+    assert (a.stages["render"], a.stages["parse"]) == (0.5, 0.25)
+    assert a.stages["store"] > 0
+    c = report.units[("chain", "c", "2024-05-01")]
+    assert (c.status, c.errors, c.error) == (FAILED, 2, "page did not load")
+    assert report.status == PARTIAL
+
+    totals = report.scrapers()["chain"]
+    assert (totals["units"], totals["failed"], totals["pages"], totals["rows_written"]) == (3, 1, 3, 4)
+    assert totals["stages"]["render"] == 1.0
+
+
+def test_runs_store_their_report(tmp_path, fake_client, monkeypatch):
+    async def writer(batch, replaced=None):
+        return batch
+
+    async def mark_refreshed(dates):
+        pass
+
+    class Registry:
+        def due_scrapers(self, date_str, force=False):
+            return [ReportingScraper(["a"])]
+
+        def mark_refreshed(self, name, date_str):
+            pass
+
+    monkeypatch.setattr(MovieRepository, "insert_or_update_movies", writer)
+    monkeypatch.setattr(FreshnessRepository, "mark_refreshed", mark_refreshed)
+    service = ScraperService(Registry(), checkpoints=CheckpointStore(str(tmp_path / "c.sqlite3")))
+
+    result = asyncio.run(service.run(["2024-05-01"]))
+
+    [run] = fake_client.tables["scrape_runs"]
+    assert result.report.status == COMPLETED
+    assert (run["status"], run["dates"], run["written"], run["pages"]) == (
+        COMPLETED, ["2024-05-01"], 2, 1)
+    assert run["report"]["units"][0]["cinema"] == "a"
+    # Stored as JSON
+    json.dumps(run)
+
+
+def test_run_endpoints_list_summaries_and_serve_reports(fake_client):
+    fake_client.tables["scrape_runs"] = [
+        {"id": 1, "started_at": "2024-05-01T06:00:00", "status": COMPLETED, "report": {}},
+        {"id": 2, "started_at": "2024-05-02T06:00:00", "status": PARTIAL, "report": {}},
+    ]
+
+    runs = json.loads(asyncio.run(main.get_scrape_runs(limit=1)).body)
+    assert [run["id"] for run in runs] == [2]
+    assert "report" not in fake_client.selects[0][1]
+
+    run = json.loads(asyncio.run(main.get_scrape_run(1)).body)
+    assert run["status"] == COMPLETED
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.get_scrape_run(3))
+    assert error.value.status_code == 404
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.get_scrape_runs(limit=0))
+    assert error.value.status_code == 400
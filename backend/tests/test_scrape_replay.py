@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from benchmarks.scrape_replay import ReplayDriver, ReplayServer, build_site, run_benchmark
+
+
+def make_dates(days):
+    today = datetime.now()
+    return [(today + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+
+
+def test_calendar_click_loads_the_dated_page():
+    dates = make_dates(2)
+    server = ReplayServer(build_site(1, dates, movies=2, page_kb=1))
+    server.start()
+    try:
+        driver = ReplayDriver()
+        driver.get(f"{server.url}/uci/cinema/uci-cinemas-1")
+        day = [button for button in driver.find_elements("css selector", ".calendar-day")
+               if int(button.text) == int(dates[1][-2:])][0]
+        day.click()
+    finally:
+        server.stop()
+
+    assert driver.current_url.endswith(f"?date={dates[1]}")
+
+
+def test_full_scrape_runs_offline(monkeypatch):
+    monkeypatch.setattr("models.supabase._client", None)
+    dates = make_dates(1)
+    pages = build_site(1, dates, movies=3, page_kb=1)
+
+    outcome = run_benchmark(pages, dates, ["city-1"])
+
+    report = outcome["report"]
+    assert report.status == "completed"
+    assert {unit.scraper for unit in report.units.values()} == {"uci", "spaziocinema"}
+    assert outcome["written"] == 6
+    # The UCI page load includes a second request, for the clicked calendar day
+    assert sum(outcome["pages"].values()) + 1 == outcome["requests"]
+    assert len(outcome["database"].tables["movies"]) > 0
+    assert outcome["database"].tables["scrape_runs"][0]["status"] == "completed"
@@ -0,0 +1,66 @@
+import asyncio
+
+from api.showtime_index import DateShowtimes, ShowtimeIndex
+
+
+def showtime(minute, title, original=False):
+    return {"start_minute": minute, "is_original_language": original,
+            "movie": {"title": title}}
+
+
+def test_window_returns_showtimes_starting_in_range():
+    index = DateShowtimes([
+        showtime(1290, "Late"), showtime(1200, "Dune", original=True),
+        showtime(1230, "Alien"), showtime(1470, "Night", original=True),
+        showtime(None, "Untimed"),
+    ])
+
+    assert [s["movie"]["title"] for s in index.window(1200, 1290)] == ["Dune", "Alien"]
+    assert [s["movie"]["title"] for s in index.window(1200, 1500, original=True)] == ["Dune", "Night"]
+    assert [s["movie"]["title"] for s in index.window(1200, 1500, original=False)] == ["Alien", "Late"]
+    assert index.window(600, 700) == []
+    assert len(index) == 4
+
+
+def test_index_loads_each_date_once_until_invalidated():
+    loads = []
+
+    async def loader(date):
+        loads.append(date)
+        await asyncio.sleep(0)
+        return [showtime(1200, "Dune")]
+
+    async def run():
+        index = ShowtimeIndex(loader)
+        first = await asyncio.gather(*(index.window("2024-05-01", 0, 1440) for _ in range(5)))
+        index.invalidate("2024-05-01")
+        await index.window("2024-05-01", 0, 1440)
+        return first
+
+    results = asyncio.run(run())
+
+    assert all(len(r) == 1 for r in results)
+    assert loads == ["2024-05-01", "2024-05-01"]
+
+
+def test_index_rejects_bad_dates_and_evicts_old_ones():
+    async def loader(date):
+        return [showtime(1200, "Dune")]
+
+    async def run():
+        index = ShowtimeIndex(loader, max_dates=2)
+        try:
+            await index.get("../../etc")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("invalid date accepted")
+        for day in range(1, 5):
+            await index.get(f"2024-05-0{day}")
+        return index
+
+    index = asyncio.run(run())
+
+    assert sorted(index._dates) == ["2024-05-03", "2024-05-04"]
+    assert sorted(index._locks) == ["2024-05-03", "2024-05-04"]
+
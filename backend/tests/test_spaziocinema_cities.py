@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+
+from scraper.base_scraper import DriverPool
+from scraper.pipeline import ScrapePipeline
+from scraper.spaziocinema_scraper import SpaziocinemaInfoScraper
+
+PAGE = """
+<div class="movie-list">
+  <div class="movie-card">
+    <h3 class="movie-title"><a href="/film/dune">Dune</a></h3>
+    <div class="movie-times"><span class="time">20:00</span></div>
+  </div>
+</div>
+"""
+
+
+class OfflineSpazioScraper(SpaziocinemaInfoScraper):
+    """Spazio Cinema scraper serving a fixed page and tracking parallel fetches"""
+
+    def __init__(self, cities):
+        super().__init__(cities=cities)
+        self.configure("spaziocinema", concurrency=len(cities))
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def get_page_with_selenium(self, url):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return PAGE
+
+
+def test_cities_are_scraped_concurrently_and_tagged():
+    stored = []
+
+    async def writer(batch):
+        stored.extend(batch)
+
+    scraper = OfflineSpazioScraper(["milano", "torino", "roma"])
+    asyncio.run(ScrapePipeline(writer).run([scraper], "2024-05-01"))
+
+    assert scraper.max_active > 1
+    showtimes = [s for movie in stored for s in movie["showtimes"]]
+    assert sorted(s["theater"] for s in showtimes) == [
+        "Spazio Cinema Milano", "Spazio Cinema Roma", "Spazio Cinema Torino"]
+    assert sorted(s["theater_ref"]["city"] for s in showtimes) == ["Milano", "Roma", "Torino"]
+    assert scraper.cities == ["milano", "torino", "roma"]
+
+
+def test_driver_pool_reuses_a_bounded_number_of_drivers():
+    class Driver:
+        quit_calls = 0
+
+        def quit(self):
+            Driver.quit_calls += 1
+
+    created = []
+
+    def factory():
+        created.append(Driver())
+        return created[-1]
+
+    pool = DriverPool(factory, size=2)
+
+    def borrow():
+        for _ in range(5):
+            with pool.driver():
+                time.sleep(0.01)
+
+    threads = [threading.Thread(target=borrow) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+
+    assert len(created) == 2
+    assert Driver.quit_calls == 2
+
+
+def test_unfetched_pages_fail_the_unit_instead_of_completing_it():
+    class DownScraper(OfflineSpazioScraper):
+        def get_page_with_selenium(self, url):
+            return PAGE if "milano" in url else None
+
+    async def writer(batch):
+        pass
+
+    pipeline = ScrapePipeline(writer)
+    asyncio.run(pipeline.run([DownScraper(["milano", "torino"])], "2024-05-01"))
+
+    assert [r.unit.cinema for r in pipeline.completed_units] == ["milano"]
+    assert pipeline.failed_units == {("spaziocinema", "torino", "2024-05-01")}
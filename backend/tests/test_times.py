@@ -0,0 +1,22 @@
+from scraper.records import ShowtimeRecord, validate_movies
+from scraper.times import format_minute, parse_minute
+
+
+def test_times_parse_into_minutes_of_the_cinema_day():
+    assert parse_minute("20:30") == 20 * 60 + 30
+    assert parse_minute("ore 9.15 V.O.") == 9 * 60 + 15
+    assert parse_minute("21h05") == 21 * 60 + 5
+    assert parse_minute("00:30") == 24 * 60 + 30
+    assert parse_minute("Sala 3") is None
+    assert format_minute(parse_minute("00:30")) == "00:30"
+
+
+def test_records_keep_the_raw_text_and_drop_untimed_showtimes():
+    timed = ShowtimeRecord(time="ore 20.30", theater="A")
+    untimed = ShowtimeRecord(time="sold out", theater="A")
+
+    assert (timed.time, timed.time_text, timed.start_minute) == ("20:30", "ore 20.30", 1230)
+
+    movies = validate_movies([{"title": "Dune", "date": "2024-05-01",
+                               "showtimes": [timed.to_dict(), untimed.to_dict()]}])
+    assert [s["time"] for s in movies[0]["showtimes"]] == ["20:30"]
@@ -0,0 +1,99 @@
+from fastapi import FastAPI
+import asyncio
+import logging
+import time
+
+from api.timing import ServerTimingMiddleware
+from monitoring.loop_lag import LoopLagMonitor
+from monitoring.metrics import db_call
+
+
+class Repository:
+    @staticmethod
+    @db_call
+    async def get_one(movie_id):
+        await asyncio.sleep(0)
+        return {"id": movie_id}
+
+    @staticmethod
+    @db_call
+    async def get_many(ids):
+        # Nested repository calls are accounted to the outer one
+        return [await Repository.get_one(movie_id) for movie_id in ids]
+
+
+def make_app(warn_db_calls=0):
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware, warn_db_calls=warn_db_calls)
+
+    @app.get("/n-plus-one")
+    async def n_plus_one():
+        return [await Repository.get_one(movie_id) for movie_id in range(5)]
+
+    @app.get("/batched")
+    async def batched():
+        return await Repository.get_many(range(5))
+
+    return app
+
+
+def server_timing(app, path):
+    """Run a GET request through the ASGI app, returning its Server-Timing header"""
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+             "query_string": b"", "root_path": "", "server": ("test", 80),
+             "client": ("test", 1234), "headers": []}
+    asyncio.run(app(scope, receive, send))
+    return dict(messages[0]["headers"])[b"server-timing"].decode()
+
+
+def test_server_timing_counts_repository_calls_per_request():
+    app = make_app()
+
+    assert '"5 calls"' in server_timing(app, "/n-plus-one")
+    assert '"1 calls"' in server_timing(app, "/batched")
+    assert server_timing(app, "/batched").startswith("db;dur=")
+
+
+def test_requests_with_many_repository_calls_are_logged(caplog):
+    app = make_app(warn_db_calls=3)
+
+    with caplog.at_level(logging.WARNING, logger="api.timing"):
+        server_timing(app, "/batched")
+        assert caplog.records == []
+        server_timing(app, "/n-plus-one")
+
+    assert "GET /n-plus-one made 5 repository calls" in caplog.text
+
+
+def test_loop_lag_monitor_logs_the_blocking_stack(caplog):
+    def blocking_call():
+        time.sleep(0.3)
+
+    async def handler():
+        monitor = LoopLagMonitor(threshold=0.05)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.1)
+            blocking_call()
+            await asyncio.sleep(0.05)
+        finally:
+            monitor.stop()
+
+    with caplog.at_level(logging.WARNING, logger="monitoring.loop_lag"):
+        asyncio.run(handler())
+
+    stalls = [r for r in caplog.records if "Event loop blocked" in r.getMessage()]
+    assert len(stalls) == 1
+    assert "blocking_call" in stalls[0].getMessage()
@@ -0,0 +1,169 @@
+import asyncio
+import multiprocessing
+import time
+
+from scraper.base_scraper import BaseScraper
+from scraper.units import ScrapeUnit
+from scraper.work_queue import WorkQueue
+from scraper.worker import ScrapeWorker
+
+
+def make_units(count):
+    return [ScrapeUnit(scraper="fake", date="2024-05-01", cinema=f"cinema-{i}",
+                       meta={"name": f"Cinema {i}"})
+            for i in range(count)]
+
+
+def drain(path):
+    """Lease and complete units until the queue is empty (run in a subprocess)"""
+    queue = WorkQueue(path)
+    leased_ids = []
+    while True:
+        leased = queue.lease(f"worker-{multiprocessing.current_process().pid}")
+        if leased is None:
+            return leased_ids
+        leased_ids.append(leased.id)
+        queue.complete(leased)
+
+
+def test_units_are_leased_once_across_processes(tmp_path):
+    path = str(tmp_path / "queue.sqlite3")
+    queue = WorkQueue(path)
+    assert queue.publish(make_units(40)) == 40
+
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        results = pool.map(drain, [path] * 4)
+
+    leased = [unit_id for ids in results for unit_id in ids]
+    assert sorted(leased) == sorted(set(leased))
+    assert len(leased) == 40
+    assert queue.stats()["done"] == 40
+
+
+def test_expired_lease_is_handed_out_again(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite3"))
+    queue.publish(make_units(1))
+
+    first = queue.lease("a", lease_seconds=-1)
+    second = queue.lease("b")
+
+    assert second.id == first.id
+    assert second.attempts == 2
+    assert not queue.heartbeat(first)
+    assert not queue.complete(first)
+    assert queue.complete(second)
+
+
+def test_failed_units_are_retried_until_max_attempts(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite3"), max_attempts=2)
+    queue.publish(make_units(1))
+
+    queue.fail(queue.lease("a"), "boom")
+    assert queue.stats()["pending"] == 1
+
+    queue.fail(queue.lease("a"), "boom")
+    assert queue.stats()["failed"] == 1
+    assert queue.lease("a") is None
+
+    # Publishing again resets finished and failed units
+    assert queue.publish(make_units(1)) == 1
+    assert queue.stats()["pending"] == 1
+
+
+class FakeScraper(BaseScraper):
+    def __init__(self):
+        super().__init__("https://example.invalid")
+        self.name = "fake"
+
+    def get_movies_for_date(self, date):
+        return []
+
+    def scrape_unit(self, unit):
+        if unit.cinema == "cinema-2":
+            raise RuntimeError("page changed")
+        yield {"title": f"Movie at {unit.meta['name']}", "showtimes": []}
+
+
+class FakeRegistry:
+    def __init__(self):
+        self.scraper = FakeScraper()
+        self.refreshed = []
+
+    def get(self, name):
+        return self.scraper
+
+    def mark_refreshed(self, name, date_str):
+        self.refreshed.append((name, date_str))
+
+    def close(self):
+        self.scraper.close()
+
+
+def test_worker_completes_units_and_fails_broken_ones(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite3"))
+    queue.publish(make_units(3))
+    stored = []
+
+    async def writer(batch):
+        stored.extend(batch)
+
+    worker = ScrapeWorker(queue, registry=FakeRegistry(), writer=writer, worker_id="w1")
+    completed = asyncio.run(worker.run(max_units=3, exit_when_idle=True))
+
+    assert completed == 2
+    assert sorted(m["title"] for m in stored) == ["Movie at Cinema 0", "Movie at Cinema 1"]
+    assert queue.stats() == {"pending": 1, "leased": 0, "done": 2, "failed": 0}
+
+
+def test_worker_marks_dates_fresh_once_all_their_units_are_done(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite3"))
+    units = make_units(3)
+    units[2] = ScrapeUnit(scraper="fake", date="2024-05-02", cinema="cinema-2",
+                          meta={"name": "Cinema 2"})
+    queue.publish(units + [ScrapeUnit(scraper="fake", date="2024-05-02", cinema="cinema-3",
+                                      meta={"name": "Cinema 3"})])
+    registry = FakeRegistry()
+    fresh = []
+
+    async def writer(batch):
+        pass
+
+    async def freshness_writer(dates):
+        fresh.extend(dates)
+
+    worker = ScrapeWorker(queue, registry=registry, writer=writer, worker_id="w1",
+                          freshness_writer=freshness_writer)
+    asyncio.run(worker.run(max_units=4, exit_when_idle=True))
+
+    # cinema-2 fails, so 2024-05-02 stays stale until its retry succeeds
+    assert fresh == ["2024-05-01"]
+    assert registry.refreshed == [("fake", "2024-05-01")]
+    assert queue.date_done("fake", "2024-05-01") and not queue.date_done("fake", "2024-05-02")
+
+
+def test_worker_stops_a_unit_whose_lease_was_lost(tmp_path):
+    class EndlessScraper(FakeScraper):
+        def scrape_unit(self, unit):
+            for i in range(200):
+                time.sleep(0.01)
+                yield {"title": f"Movie {i}", "showtimes": []}
+
+    queue = WorkQueue(str(tmp_path / "queue.sqlite3"))
+    queue.publish(make_units(1))
+    queue.heartbeat = lambda leased: False
+    stored = []
+
+    async def writer(batch):
+        stored.extend(batch)
+
+    registry = FakeRegistry()
+    registry.scraper = EndlessScraper()
+    worker = ScrapeWorker(queue, registry=registry, writer=writer, worker_id="w1",
+                          heartbeat_interval=0.1)
+
+    started = time.monotonic()
+    assert asyncio.run(worker.process(queue.lease("w1"))) is False
+
+    assert time.monotonic() - started < 1
+    assert len(stored) < 200
+    assert queue.stats()["leased"] == 1
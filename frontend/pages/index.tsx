@@ -4,32 +4,34 @@ import { format, addDays } from "date-fns";
 import DateSelector from "../components/DateSelector";
 import MovieList from "../components/MovieList";
 import FilterOptions from "../components/FilterOptions";
-import { getMovies, getOriginalLanguageMovies } from "../utils/api";
+import { getMoviesRange, subscribeToDataChanges } from "../utils/api";
 import type { Movie } from "../types/theater";
 
 export default function Home() {
   const [selectedDate, setSelectedDate] = useState<Date>(new Date());
   const [showOriginalOnly, setShowOriginalOnly] = useState<boolean>(false);
-  const [movies, setMovies] = useState<Movie[]>([]);
+  const [moviesByDate, setMoviesByDate] = useState<Record<string, Movie[]>>({});
   const [loading, setLoading] = useState<boolean>(true);
   const [error, setError] = useState<string | null>(null);
+  // Bumped when the server reports changed showtimes for the week
+  const [version, setVersion] = useState<number>(0);
 
   // Generate dates for the next 7 days
   const nextDays = Array.from({ length: 7 }, (_, i) => addDays(new Date(), i));
 
-  // Fetch movies for the selected date
+  // Fetch the whole week in one request; switching dates needs no request
   useEffect(() => {
     const fetchMovies = async () => {
       setLoading(true);
       setError(null);
 
       try {
-        const dateStr = format(selectedDate, "yyyy-MM-dd");
-        const movies = showOriginalOnly
-          ? await getOriginalLanguageMovies(dateStr)
-          : await getMovies(dateStr);
-
-        setMovies(movies);
+        setMoviesByDate(
+          await getMoviesRange(
+            format(nextDays[0], "yyyy-MM-dd"),
+            format(nextDays[nextDays.length - 1], "yyyy-MM-dd"),
+          ),
+        );
       } catch (err) {
         setError("Error loading movies. Please try again later.");
         console.error("Error fetching movies:", err);
@@ -39,7 +41,30 @@ export default function Home() {
     };
 
     fetchMovies();
-  }, [selectedDate, showOriginalOnly]);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [version]);
+
+  // Refetch only when new showtimes were stored, instead of polling
+  useEffect(() => {
+    const weekDates = nextDays.map((date) => format(date, "yyyy-MM-dd"));
+    return subscribeToDataChanges((date) => {
+      if (date === null || weekDates.includes(date)) {
+        setVersion((v) => v + 1);
+      }
+    });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, []);
+
+  const dayMovies = moviesByDate[format(selectedDate, "yyyy-MM-dd")] || [];
+  // Same filter as /movies/original: only original language showtimes
+  const movies = showOriginalOnly
+    ? dayMovies
+        .map((movie) => ({
+          ...movie,
+          showtimes: movie.showtimes.filter((s) => s.is_original_language),
+        }))
+        .filter((movie) => movie.showtimes.length > 0)
+    : dayMovies;
 
   return (
     <>
@@ -10,9 +10,16 @@ const api = axios.create({
   },
 });
 
+// Fields shown by MovieCard, so list views skip the columns they never display
+export const MOVIE_CARD_FIELDS = [
+  'title', 'original_title', 'date', 'image_url', 'description', 'duration', 'genres', 'rating',
+  'showtimes.time', 'showtimes.theater', 'showtimes.room', 'showtimes.is_original_language',
+  'showtimes.is_3d', 'showtimes.booking_url',
+].join(',');
+
 export const getMovies = async (date: string): Promise<Movie[]> => {
   try {
-    const response = await api.get(`/movies/${date}`);
+    const response = await api.get(`/movies/${date}`, { params: { fields: MOVIE_CARD_FIELDS } });
     return response.data;
   } catch (error) {
     console.error('Error fetching movies:', error);
@@ -20,9 +27,40 @@ export const getMovies = async (date: string): Promise<Movie[]> => {
   }
 };
 
+// Movies of every date from `from` to `to` (YYYY-MM-DD, at most 14 days) in one request
+export const getMoviesRange = async (
+  from: string,
+  to: string,
+): Promise<Record<string, Movie[]>> => {
+  try {
+    const response = await api.get('/movies', {
+      params: { from, to, fields: MOVIE_CARD_FIELDS },
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching movies range:', error);
+    throw error;
+  }
+};
+
+// Calls onChange with the date whose showtimes changed, or null when every
+// date must be refetched; returns a function closing the stream
+export const subscribeToDataChanges = (
+  onChange: (date: string | null) => void,
+): (() => void) => {
+  const source = new EventSource(`${API_URL}/events`);
+  source.addEventListener('data', (event) => {
+    onChange(JSON.parse((event as MessageEvent).data).date);
+  });
+  source.addEventListener('reset', () => onChange(null));
+  return () => source.close();
+};
+
 export const getOriginalLanguageMovies = async (date: string): Promise<Movie[]> => {
   try {
-    const response = await api.get(`/movies/original/${date}`);
+    const response = await api.get(`/movies/original/${date}`, {
+      params: { fields: MOVIE_CARD_FIELDS },
+    });
     return response.data;
   } catch (error) {
     console.error('Error fetching original language movies:', error);